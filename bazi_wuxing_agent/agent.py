@@ -6,6 +6,7 @@ from typing import Dict, Any, List, Tuple
 from datetime import datetime
 
 from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.json_extractor import extract_json_object
 
 
 class BaziWuxingAgent:
@@ -19,8 +20,10 @@ class BaziWuxingAgent:
       - wuxing: list[str] up to 6 elements
     """
 
-    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json") -> None:
-        self.llm_manager = LLMConfigManager(config_path=llm_config_path)
+    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json",
+                 llm_manager: LLMConfigManager = None) -> None:
+        # Reuse a shared manager when given (see diary_agent.core.service_container)
+        self.llm_manager = llm_manager or LLMConfigManager(config_path=llm_config_path)
         if prompt_path is None:
             prompt_path = Path(__file__).parent / "prompt.json"
         self.prompt = json.loads(Path(prompt_path).read_text(encoding="utf-8"))
@@ -47,11 +50,11 @@ class BaziWuxingAgent:
 
         print(f"🔮 BaZi Agent - LLM response: {text}")
 
-        try:
-            data = json.loads(text)
+        data = extract_json_object(text)
+        if data is not None:
             print(f"🔮 BaZi Agent - Parsed JSON: {data}")
-        except Exception as e:
-            print(f"🔮 BaZi Agent - JSON parse failed: {e}")
+        else:
+            print("🔮 BaZi Agent - JSON parse failed")
             data = {"bazi": [], "wuxing": []}
 
         bazi = data.get("bazi") or []
@@ -12,10 +12,11 @@ import asyncio
 import logging
 import random
 import uuid
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, asdict
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
 # Add the project root to the path
@@ -27,6 +28,10 @@ from diary_agent.utils.data_models import PromptConfig, EventData, DiaryEntry, D
 from diary_agent.agents.interactive_agent import InteractiveAgent
 from diary_agent.agents.dialogue_agent import DialogueAgent
 from diary_agent.agents.neglect_agent import NeglectAgent
+from diary_agent.utils.batch_runner import BatchRunConfig, iter_bounded
+from diary_agent.utils.response_stream import (
+    NDJSON_MIMETYPE, SSE_MIMETYPE, STREAM_HEADERS, iterate_async, wants_sse
+)
 
 # Configure logging
 logging.basicConfig(
@@ -147,6 +152,11 @@ class CompleteDiaryAgentManager:
         
         # Initialize agents
         self.agents = self._initialize_agents()
+        
+        # Fan-out and timeouts for streamed batches
+        self.batch_config = BatchRunConfig.from_dict(
+            self.llm_config_manager.performance_settings.get("batch_processing")
+        )
     
     def _initialize_prompt_configs(self) -> Dict[str, PromptConfig]:
         """Initialize prompt configurations for all event types."""
@@ -541,6 +551,20 @@ async def generate_diary():
             error=str(e)
         ).__dict__), 500
 
+def diary_entry_data(diary_entry: DiaryEntry) -> Dict[str, Any]:
+    """Convert a diary entry to its response format."""
+    return {
+        "entry_id": diary_entry.entry_id,
+        "event_type": diary_entry.event_type,
+        "event_name": diary_entry.event_name,
+        "title": diary_entry.title,
+        "content": diary_entry.content,
+        "emotion_tags": [tag.value for tag in diary_entry.emotion_tags] if diary_entry.emotion_tags else [],
+        "timestamp": diary_entry.timestamp.isoformat(),
+        "agent_type": diary_entry.agent_type,
+        "llm_provider": diary_entry.llm_provider
+    }
+
 @app.route('/api/diary/batch', methods=['POST'])
 async def generate_batch_diary():
     """Generate multiple diary entries with complete workflow."""
@@ -609,19 +633,7 @@ async def generate_batch_diary():
                 })
         
         # Convert to response format
-        diary_data = []
-        for diary_entry in diary_entries:
-            diary_data.append({
-                "entry_id": diary_entry.entry_id,
-                "event_type": diary_entry.event_type,
-                "event_name": diary_entry.event_name,
-                "title": diary_entry.title,
-                "content": diary_entry.content,
-                "emotion_tags": [tag.value for tag in diary_entry.emotion_tags] if diary_entry.emotion_tags else [],
-                "timestamp": diary_entry.timestamp.isoformat(),
-                "agent_type": diary_entry.agent_type,
-                "llm_provider": diary_entry.llm_provider
-            })
+        diary_data = [diary_entry_data(diary_entry) for diary_entry in diary_entries]
         
         return jsonify(APIResponse(
             success=True,
@@ -642,6 +654,104 @@ async def generate_batch_diary():
             error=str(e)
         ).__dict__), 500
 
+@app.route('/api/diary/batch/stream', methods=['POST'])
+def generate_batch_diary_stream():
+    """
+    Streaming variant of /api/diary/batch.
+    
+    Daily quota decisions are made up front in input order; the diaries are
+    then generated concurrently and each is emitted as soon as it is ready,
+    followed by a summary record. NDJSON by default; SSE when the client
+    sends Accept: text/event-stream or format=sse.
+    """
+    try:
+        request_data = request.get_json()
+        
+        if not request_data or not isinstance(request_data.get('events'), list):
+            return jsonify(APIResponse(
+                success=False,
+                message="Request must contain an events list",
+                error="Invalid events format"
+            ).__dict__), 400
+        
+        events = request_data['events']
+        required_fields = ['event_type', 'event_name', 'event_details']
+        for i, event_data in enumerate(events):
+            for field in required_fields:
+                if not isinstance(event_data, dict) or field not in event_data:
+                    return jsonify(APIResponse(
+                        success=False,
+                        message=f"Missing required field '{field}' in event {i}",
+                        error="Invalid event data"
+                    ).__dict__), 400
+        
+        date = datetime.now().strftime("%Y-%m-%d")
+        triggers = []
+        skipped_events = []
+        for i, event_data in enumerate(events):
+            event_trigger = EventTrigger(
+                event_type=event_data['event_type'],
+                event_name=event_data['event_name'],
+                event_details=event_data['event_details'],
+                user_id=event_data.get('user_id', 1),
+                timestamp=event_data.get('timestamp', datetime.now().isoformat())
+            )
+            if diary_manager.should_write_diary_for_event(event_trigger.event_type, date):
+                triggers.append((i, event_trigger))
+            else:
+                skipped_events.append({
+                    "event_index": i,
+                    "event_type": event_trigger.event_type,
+                    "reason": "Daily quota reached or event type already written today"
+                })
+        
+        sse = wants_sse(request.headers.get('Accept'), request_data.get('format'))
+    except Exception as e:
+        logger.error(f"Error in generate_batch_diary_stream endpoint: {e}")
+        return jsonify(APIResponse(
+            success=False,
+            message="Internal server error",
+            error=str(e)
+        ).__dict__), 500
+    
+    async def records():
+        started = time.monotonic()
+        for skipped in skipped_events:
+            yield {"type": "skipped", **skipped}
+        
+        generated = 0
+        jobs = [lambda trigger=trigger: diary_manager.generate_diary_entry(trigger) for _, trigger in triggers]
+        async for position, outcome in iter_bounded(jobs, diary_manager.batch_config):
+            event_index, event_trigger = triggers[position]
+            if outcome.ok and outcome.value:
+                generated += 1
+                yield {"type": "diary", "event_index": event_index, "diary_entry": diary_entry_data(outcome.value)}
+            else:
+                yield {
+                    "type": "failed",
+                    "event_index": event_index,
+                    "event_type": event_trigger.event_type,
+                    "status": outcome.status if not outcome.ok else "generation_failed",
+                    "reason": outcome.error or "Diary generation failed"
+                }
+        
+        yield {
+            "type": "summary",
+            "success": True,
+            "message": f"Processed {len(events)} events, generated {generated} diary entries",
+            "total_generated": generated,
+            "total_requested": len(events),
+            "total_skipped": len(skipped_events),
+            "elapsed": round(time.monotonic() - started, 3),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return Response(
+        iterate_async(records, sse),
+        mimetype=SSE_MIMETYPE if sse else NDJSON_MIMETYPE,
+        headers=STREAM_HEADERS
+    )
+
 @app.route('/api/diary/daily-status', methods=['GET'])
 def get_daily_status():
     """Get current daily diary status."""
@@ -817,6 +927,7 @@ def run_complete_api_server(host='0.0.0.0', port=5002, debug=False):
     print("  POST /api/diary/daily-plan          - Create daily diary plan (00:00 task)")
     print("  POST /api/diary/generate             - Generate single diary entry")
     print("  POST /api/diary/batch               - Generate multiple diary entries")
+    print("  POST /api/diary/batch/stream        - Stream batch diary entries (NDJSON/SSE)")
     print("  GET  /api/diary/daily-status        - Get daily diary status")
     print("  GET  /api/diary/event-types         - Get supported event types")
     print("  POST /api/diary/workflow-test       - Test complete workflow")
@@ -17,12 +17,23 @@ from diary_agent.utils.data_models import (
 )
 from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
 from diary_agent.utils.validators import DiaryEntryValidator
-from diary_agent.utils.formatters import DiaryEntryFormatter
+from diary_agent.utils.formatters import DiaryEntryFormatter, DiaryFormatter
 from diary_agent.utils.error_handler import (
     ErrorHandler, ErrorCategory, ErrorContext, with_error_handling, global_error_handler
 )
 from diary_agent.utils.logger import get_component_logger, diary_logger
 from diary_agent.utils.graceful_degradation import with_graceful_degradation
+from diary_agent.utils.context_serializer import ContextSerializer, ContextBudgetConfig
+from diary_agent.utils.token_estimator import estimate_tokens
+from diary_agent.utils.prompt_templates import CompiledTemplate, template_registry
+from diary_agent.utils.structured_output import schema_from_output_format
+from diary_agent.utils.json_extractor import extract_json_object
+
+
+# Fields every generated diary must contain (see _parse_generated_content)
+DIARY_OUTPUT_FORMAT = {"title": "string", "content": "string", "emotion_tags": "list"}
+# Looser shape accepted by _fallback_parse_content before line-based parsing
+_MINIMAL_DIARY_SCHEMA = {"type": "object", "required": ["title", "content"]}
 
 
 class BaseSubAgent(ABC):
@@ -53,6 +64,20 @@ class BaseSubAgent(ABC):
         self.formatter = DiaryEntryFormatter()
         self.logger = get_component_logger(f"agent_{agent_type}")
         self.error_handler = global_error_handler
+        
+        # Context dicts are rendered compactly within performance_settings.context_budget
+        performance_settings = getattr(llm_manager, "performance_settings", None)
+        if not isinstance(performance_settings, dict):
+            performance_settings = {}
+        self.context_serializer = ContextSerializer(
+            ContextBudgetConfig.from_dict(performance_settings.get("context_budget"))
+        )
+        self.last_prompt_tokens = 0
+        
+        # Parse and validate the user prompt template once; agents with the same template share it
+        self._template: Optional[CompiledTemplate] = None
+        if isinstance(getattr(prompt_config, "user_prompt_template", None), str):
+            self._get_compiled_template()
     
     @abstractmethod
     async def process_event(self, event_data: EventData) -> DiaryEntry:
@@ -141,9 +166,13 @@ class BaseSubAgent(ABC):
         
         try:
             # Generate content using LLM with failover
+            # The prompt asks for a JSON object: providers constrain output to the diary
+            # schema where supported, and streaming can stop at the closing brace
             generated_text = await self.llm_manager.generate_text_with_failover(
                 prompt=user_prompt,
-                system_prompt=system_prompt
+                system_prompt=system_prompt,
+                response_format="json",
+                response_schema=self._get_response_schema()
             )
             
             # Debug: Log the generated text
@@ -164,7 +193,8 @@ class BaseSubAgent(ABC):
                 metadata={
                     "event_name": event_data.event_name,
                     "content_length": len(content_dict.get("content", "")),
-                    "title_length": len(content_dict.get("title", ""))
+                    "title_length": len(content_dict.get("title", "")),
+                    "prompt_tokens": self.last_prompt_tokens
                 }
             )
             
@@ -210,11 +240,10 @@ class BaseSubAgent(ABC):
         Returns:
             Formatted user prompt
         """
-        template_vars = {
-            "event_name": event_data.event_name,
-            "event_type": event_data.event_type,
-            "timestamp": event_data.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-            "user_id": event_data.user_id,
+        template = self._get_compiled_template()
+        
+        # Render only the context dicts the template uses, as compact text instead of Python reprs
+        context_sections = {
             "user_profile": context_data.user_profile,
             "event_details": context_data.event_details,
             "environmental_context": context_data.environmental_context,
@@ -222,18 +251,55 @@ class BaseSubAgent(ABC):
             "emotional_context": context_data.emotional_context,
             "temporal_context": context_data.temporal_context
         }
+        sections, context_tokens = self.context_serializer.serialize_sections({
+            name: value for name, value in context_sections.items() if template.uses(name)
+        })
+        
+        template_vars = {
+            "event_name": event_data.event_name,
+            "event_type": event_data.event_type,
+            "timestamp": event_data.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "user_id": event_data.user_id,
+            **sections
+        }
+        
+        # Provide richer template variables to encourage specificity
+        if template.uses("now_date") or template.uses("now_time"):
+            now = datetime.now()
+            template_vars["now_date"] = now.strftime("%Y年%m月%d日")
+            template_vars["now_time"] = now.strftime("%H:%M")
         
         try:
-            # Provide richer template variables to encourage specificity
-            enriched_vars = {
-                **template_vars,
-                "now_date": datetime.now().strftime("%Y年%m月%d日"),
-                "now_time": datetime.now().strftime("%H:%M"),
-            }
-            return self.prompt_config.user_prompt_template.format(**enriched_vars)
-        except KeyError as e:
+            prompt = template.render(template_vars)
+        except (KeyError, ValueError) as e:
             # If template variable is missing, use a simpler format
-            return f"Generate a diary entry for event: {event_data.event_name} at {event_data.timestamp}"    
+            prompt = f"Generate a diary entry for event: {event_data.event_name} at {event_data.timestamp}"
+        
+        self.last_prompt_tokens = estimate_tokens(prompt)
+        self.logger.debug(
+            f"Prepared prompt for {event_data.event_name}: ~{self.last_prompt_tokens} tokens "
+            f"({context_tokens} from context)"
+        )
+        return prompt
+    
+    def _get_response_schema(self) -> Dict[str, Any]:
+        """
+        JSON schema for the diary object: the prompt's output_format plus the diary fields.
+        
+        Only the diary fields are required. Other output_format keys are often
+        descriptive (or not asked for by the template), so they stay optional.
+        """
+        output_format = self.prompt_config.output_format
+        if not isinstance(output_format, dict):
+            output_format = {}
+        return schema_from_output_format({**output_format, **DIARY_OUTPUT_FORMAT}, required=DIARY_OUTPUT_FORMAT)
+    
+    def _get_compiled_template(self) -> CompiledTemplate:
+        """Get the compiled user prompt template, recompiling if the prompt config changed."""
+        template = self.prompt_config.user_prompt_template
+        if self._template is None or self._template.template != template:
+            self._template = template_registry.compile(template)
+        return self._template
     
     async def _parse_generated_content(self, generated_text: str) -> Dict[str, Any]:
         """
@@ -245,19 +311,13 @@ class BaseSubAgent(ABC):
         Returns:
             Parsed content dictionary
         """
-        try:
-            # Try to parse as JSON first
-            content_dict = json.loads(generated_text)
-            
-            # Validate required fields
-            if not all(key in content_dict for key in ["title", "content", "emotion_tags"]):
-                raise ValueError("Missing required fields in generated content")
-            
+        # Strict schema first: the prompt's output_format plus the diary fields
+        content_dict = extract_json_object(generated_text, self._get_response_schema())
+        if content_dict is not None:
             return content_dict
-            
-        except (json.JSONDecodeError, ValueError):
-            # Fallback: extract content using simple parsing
-            return await self._fallback_parse_content(generated_text)
+        
+        # Fallback: extract content using simple parsing
+        return await self._fallback_parse_content(generated_text)
     
     async def _fallback_parse_content(self, generated_text: str) -> Dict[str, Any]:
         """
@@ -272,17 +332,10 @@ class BaseSubAgent(ABC):
         # Clean the text first
         cleaned_text = generated_text.strip()
         
-        # Try to extract JSON-like structure
-        if '"title"' in cleaned_text and '"content"' in cleaned_text:
-            try:
-                # Extract JSON part if it exists
-                start_idx = cleaned_text.find('{')
-                end_idx = cleaned_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_part = cleaned_text[start_idx:end_idx]
-                    return json.loads(json_part)
-            except:
-                pass
+        # Accept any object carrying a title and content
+        content_dict = extract_json_object(cleaned_text, _MINIMAL_DIARY_SCHEMA)
+        if content_dict is not None:
+            return content_dict
         
         # Fallback to line-based parsing
         lines = cleaned_text.split('\n')
@@ -302,25 +355,9 @@ class BaseSubAgent(ABC):
                 title = line
                 break
         
-        # If no title found, use LLM to generate a title from content
+        # If no title found, take one from the content itself (no second LLM call)
         if not title:
-            try:
-                # Use LLM to generate a title from the content
-                title_prompt = f"请为以下日记内容生成一个简洁的标题（不超过10个字）：\n{cleaned_text[:200]}..."
-                title_response = await self.llm_manager.generate_text_with_failover(
-                    prompt=title_prompt,
-                    system_prompt="你是一个专业的标题生成助手。请根据日记内容生成简洁、有吸引力的中文标题。"
-                )
-                # Clean the title response
-                title = title_response.strip().replace('"', '').replace("'", '').replace('\n', ' ').strip()
-                # Limit title length
-                if len(title) > 15:
-                    title = title[:15] + "..."
-                if not title:
-                    title = "美好时光"
-            except Exception as e:
-                self.logger.warning(f"Failed to generate title with LLM: {e}")
-                title = "美好时光"
+            title = DiaryFormatter.extract_title(cleaned_text)
         
         # Extract content (all text, but clean it up)
         content = cleaned_text
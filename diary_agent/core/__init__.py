@@ -2,8 +2,16 @@
 Core components for the diary agent system.
 """
 
+import importlib
+
 from .llm_manager import LLMConfigManager, LLMProviderError, LLMConfigurationError
-from .condition import ConditionChecker, ConditionType, TriggerCondition
+
+# Condition checking pulls in Pillow, so it is imported on first access
+_LAZY_EXPORTS = {
+    'ConditionChecker': '.condition',
+    'ConditionType': '.condition',
+    'TriggerCondition': '.condition'
+}
 
 __all__ = [
     'LLMConfigManager',
@@ -12,4 +20,13 @@ __all__ = [
     'ConditionChecker',
     'ConditionType',
     'TriggerCondition'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -7,15 +7,18 @@ for diary generation based on events, time, and image inputs.
 
 import logging
 from datetime import datetime, time
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, TYPE_CHECKING
 from dataclasses import dataclass
 from enum import Enum
 import json
 import os
-from PIL import Image
 import io
 import base64
 
+if TYPE_CHECKING:
+    # Pillow is only needed for image-based conditions; imported on first use
+    from PIL import Image
+
 try:
     from ..utils.data_models import EventData, DailyQuota, ClaimedEvent
 except ImportError:
@@ -391,7 +394,7 @@ class ConditionChecker:
             self.logger.error(f"Error processing image for events: {e}")
             return None
     
-    def _convert_to_pil_image(self, image_data: Any) -> Optional[Image.Image]:
+    def _convert_to_pil_image(self, image_data: Any) -> Optional["Image.Image"]:
         """
         Convert various image data formats to PIL Image.
         
@@ -402,6 +405,8 @@ class ConditionChecker:
             PIL Image object or None if conversion fails
         """
         try:
+            from PIL import Image
+            
             if isinstance(image_data, str):
                 # Assume base64 encoded image
                 image_bytes = base64.b64decode(image_data)
@@ -21,6 +21,7 @@ import logging
 
 from ..utils.data_models import LLMConfig, PromptConfig
 from ..utils.validators import ConfigValidator
+from ..utils.prompt_templates import template_registry
 
 logger = logging.getLogger(__name__)
 
@@ -267,6 +268,10 @@ class ConfigManager:
             
             # Additional validation
             if self.validator.validate_prompt_config(prompt_config):
+                # Compile the template now so placeholder errors surface at load time
+                template_errors = template_registry.validate(prompt_config)
+                if template_errors:
+                    logger.warning(f"Prompt template issues in {agent_name}: {'; '.join(template_errors)}")
                 self._prompt_configs[agent_name] = prompt_config
             else:
                 logger.error(f"Invalid prompt configuration: {agent_name}")
@@ -445,9 +445,21 @@ class DairyAgentController:
         if self.database_manager:
             self.database_manager.close()
         
+        # Release pooled LLM provider connections
+        await self._close_llm_manager()
+        
         self.health_status["system_status"] = "stopped"
         self.logger.info("Diary generation system stopped")
     
+    async def _close_llm_manager(self):
+        """Close the LLM manager's pooled provider sessions."""
+        if not self.llm_manager:
+            return
+        try:
+            await self.llm_manager.close()
+        except Exception as e:
+            self.logger.warning(f"Failed to close LLM manager sessions: {str(e)}")
+    
     async def process_event(self, event_data: EventData) -> Optional[DiaryEntry]:
         """
         Process a single event through the complete workflow.
@@ -1070,6 +1082,13 @@ async def run_system_with_monitoring(controller: DairyAgentController,
             
             self.logger.info("Starting diary agent system...")
             
+            # Load local models before the first event arrives and keep them resident
+            if self.llm_manager:
+                try:
+                    await self.llm_manager.start()
+                except Exception as e:
+                    self.logger.warning(f"LLM warm-up failed: {str(e)}")
+            
             # Start daily scheduler
             self.daily_scheduler_task = asyncio.create_task(self._daily_scheduler_loop())
             
@@ -1294,6 +1313,8 @@ async def run_system_with_monitoring(controller: DairyAgentController,
             if self.database_manager:
                 await self.database_manager.close()
             
+            await self._close_llm_manager()
+            
             # Stop monitoring systems
             stop_all_monitoring()
             
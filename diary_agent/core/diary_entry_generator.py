@@ -15,6 +15,7 @@ from diary_agent.utils.data_models import (
 )
 from diary_agent.utils.validators import DiaryEntryValidator, ContentValidator
 from diary_agent.utils.formatters import DiaryFormatter
+from diary_agent.utils.micro_batcher import batch_requests
 from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
 from diary_agent.agents.base_agent import BaseSubAgent, AgentRegistry
 
@@ -116,6 +117,9 @@ class DiaryEntryGenerator:
         """
         Generate multiple diary entries concurrently.
         
+        LLM requests made here may be packed into shared provider calls when
+        micro-batching is enabled in the LLM configuration.
+        
         Args:
             event_list: List of events to generate diaries for
             max_concurrent: Maximum concurrent generations
@@ -134,8 +138,9 @@ class DiaryEntryGenerator:
                     return None
         
         # Generate entries concurrently
-        tasks = [generate_with_semaphore(event) for event in event_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        with batch_requests():
+            tasks = [generate_with_semaphore(event) for event in event_list]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Filter successful results
         successful_entries = [
@@ -9,9 +9,9 @@ import asyncio
 import aiohttp
 import time
 import random
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Callable, AsyncIterator
 from pathlib import Path
-from dataclasses import asdict
+from dataclasses import asdict, replace
 from datetime import datetime
 
 try:
@@ -22,6 +22,22 @@ try:
     )
     from ..utils.logger import get_component_logger, diary_logger
     from ..utils.graceful_degradation import with_graceful_degradation, register_component_health_check
+    from ..utils.connection_pool import ProviderSessionPool, ConnectionPoolConfig
+    from ..utils.llm_cache import LLMResponseCache, ResponseCacheConfig
+    from ..utils.single_flight import SingleFlight, SingleFlightConfig
+    from ..utils.rate_limiter import ProviderRateLimiter, RateLimitConfig, RateLimitExceededError, queue_wait_seconds
+    from ..utils.token_estimator import estimate_tokens
+    from ..utils.provider_router import ProviderRouter, RoutingConfig
+    from ..utils.hedging import HedgeBudget, HedgingConfig
+    from ..utils.stream_parser import StreamingConfig, IncrementalJSONParser, iter_sse_data, iter_ndjson
+    from ..utils.response_adapters import ResponseAdapter, RequestTemplate, get_adapter, resolve_api_format
+    from ..utils.llm_telemetry import LLMTelemetry, TelemetryConfig, AttemptMetrics, create_trace_config
+    from ..utils.ollama_warmup import OllamaWarmupConfig, is_ollama_provider, model_resident
+    from ..utils.micro_batcher import (
+        MicroBatcher, BatchingConfig, batching_requested, pack_prompts, split_batch_response
+    )
+    from ..utils.structured_output import StructuredOutputConfig, JSON_OBJECT_SCHEMA, schema_key
+    from ..utils import fast_json
 except ImportError:
     # Fallback for direct execution
     import sys
@@ -34,6 +50,22 @@ except ImportError:
     )
     from utils.logger import get_component_logger, diary_logger
     from utils.graceful_degradation import with_graceful_degradation, register_component_health_check
+    from utils.connection_pool import ProviderSessionPool, ConnectionPoolConfig
+    from utils.llm_cache import LLMResponseCache, ResponseCacheConfig
+    from utils.single_flight import SingleFlight, SingleFlightConfig
+    from utils.rate_limiter import ProviderRateLimiter, RateLimitConfig, RateLimitExceededError, queue_wait_seconds
+    from utils.token_estimator import estimate_tokens
+    from utils.provider_router import ProviderRouter, RoutingConfig
+    from utils.hedging import HedgeBudget, HedgingConfig
+    from utils.stream_parser import StreamingConfig, IncrementalJSONParser, iter_sse_data, iter_ndjson
+    from utils.response_adapters import ResponseAdapter, RequestTemplate, get_adapter, resolve_api_format
+    from utils.llm_telemetry import LLMTelemetry, TelemetryConfig, AttemptMetrics, create_trace_config
+    from utils.ollama_warmup import OllamaWarmupConfig, is_ollama_provider, model_resident
+    from utils.micro_batcher import (
+        MicroBatcher, BatchingConfig, batching_requested, pack_prompts, split_batch_response
+    )
+    from utils.structured_output import StructuredOutputConfig, JSON_OBJECT_SCHEMA, schema_key
+    from utils import fast_json
 
 
 class LLMProviderError(Exception):
@@ -49,24 +81,47 @@ class LLMConfigurationError(Exception):
 class APIClient:
     """Base API client for LLM providers."""
     
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, session_pool: Optional[ProviderSessionPool] = None):
         self.config = config
+        self.session_pool = session_pool
         self.session: Optional[aiohttp.ClientSession] = None
+        self._owns_session = False
+        # Timings and token usage of the most recent request
+        self.last_metrics: Optional[AttemptMetrics] = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.config.timeout)
-        )
+        if self.session_pool is not None:
+            # Borrow the provider's long-lived pooled session
+            self.session = self.session_pool.get_session(
+                self.config.provider_name, self.config.timeout
+            )
+        else:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+                json_serialize=fast_json.dumps,
+                trace_configs=[create_trace_config()]
+            )
+            self._owns_session = True
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+        self.session = None
     
     async def generate_text(self, prompt: str, system_prompt: str = "") -> str:
         """Generate text using the LLM provider."""
         raise NotImplementedError("Subclasses must implement generate_text")
     
+    async def stream_text(self, prompt: str, system_prompt: str = "") -> AsyncIterator[str]:
+        """
+        Stream generated text in chunks.
+        
+        Providers without a streaming implementation yield the full response once.
+        Closing the iterator early closes the connection, which stops generation.
+        """
+        yield await self.generate_text(prompt, system_prompt)
+    
     def _prepare_headers(self) -> Dict[str, str]:
         """Prepare headers for API requests."""
         return {
@@ -75,172 +130,150 @@ class APIClient:
         }
 
 
-class QwenAPIClient(APIClient):
-    """API client for Qwen provider."""
+class ChatAPIClient(APIClient):
+    """
+    HTTP client shared by all chat/generation providers.
+    
+    Protocol differences live in a ResponseAdapter, and the static headers and
+    payload fields come prebuilt in a RequestTemplate, so a request only adds
+    the messages.
+    """
+    
+    provider_label: Optional[str] = None  # name used in error messages
+    
+    def __init__(self, config: LLMConfig, session_pool: Optional[ProviderSessionPool] = None,
+                 adapter: Optional[ResponseAdapter] = None,
+                 template: Optional[RequestTemplate] = None):
+        super().__init__(config, session_pool)
+        self.adapter = adapter or get_adapter(resolve_api_format(config) or "openai")
+        self.template = template or self.adapter.build_template(config)
+        self.label = self.provider_label or config.provider_name
     
     async def generate_text(self, prompt: str, system_prompt: str = "") -> str:
-        """Generate text using Qwen API."""
+        """Generate text in a single request."""
         if not self.session:
             raise LLMProviderError("Session not initialized")
         
-        payload = {
-            "model": self.config.model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt} if system_prompt else None,
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature
-        }
-        
-        # Remove None values
-        payload["messages"] = [msg for msg in payload["messages"] if msg is not None]
+        payload = self.adapter.build_payload(self.template, prompt, system_prompt, stream=False)
+        metrics = self.last_metrics = AttemptMetrics()
         
         try:
             async with self.session.post(
                 self.config.api_endpoint,
-                headers=self._prepare_headers(),
-                json=payload
+                headers=self.template.headers,
+                json=payload,
+                trace_request_ctx=metrics
             ) as response:
+                if metrics.ttfb is None:
+                    metrics.ttfb = metrics.elapsed()
                 if response.status != 200:
                     error_text = await response.text()
-                    raise LLMProviderError(f"Qwen API error {response.status}: {error_text}")
+                    raise LLMProviderError(f"{self.label} API error {response.status}: {error_text}")
                 
-                result = await response.json()
-                return result["choices"][0]["message"]["content"].strip()
+                result = await response.json(loads=fast_json.loads)
+                metrics.total = metrics.elapsed()
+                metrics.apply_usage(self.adapter.parse_usage(result))
+                return self.adapter.parse_response(result)
                 
         except aiohttp.ClientError as e:
-            raise LLMProviderError(f"Qwen API client error: {str(e)}")
-        except KeyError as e:
-            raise LLMProviderError(f"Qwen API response format error: {str(e)}")
-
-
-class DeepSeekAPIClient(APIClient):
-    """API client for DeepSeek provider."""
+            raise LLMProviderError(f"{self.label} API client error: {str(e)}")
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise LLMProviderError(f"{self.label} API response format error: {str(e)}")
     
-    async def generate_text(self, prompt: str, system_prompt: str = "") -> str:
-        """Generate text using DeepSeek API."""
+    async def stream_text(self, prompt: str, system_prompt: str = "") -> AsyncIterator[str]:
+        """Stream text deltas as server-sent events or NDJSON, per the adapter."""
         if not self.session:
             raise LLMProviderError("Session not initialized")
         
-        payload = {
-            "model": self.config.model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt} if system_prompt else None,
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature
-        }
-        
-        # Remove None values
-        payload["messages"] = [msg for msg in payload["messages"] if msg is not None]
+        payload = self.adapter.build_payload(self.template, prompt, system_prompt, stream=True)
+        metrics = self.last_metrics = AttemptMetrics()
         
         try:
             async with self.session.post(
                 self.config.api_endpoint,
-                headers=self._prepare_headers(),
-                json=payload
+                headers=self.template.stream_headers,
+                json=payload,
+                trace_request_ctx=metrics
             ) as response:
+                if metrics.ttfb is None:
+                    metrics.ttfb = metrics.elapsed()
                 if response.status != 200:
                     error_text = await response.text()
-                    raise LLMProviderError(f"DeepSeek API error {response.status}: {error_text}")
+                    raise LLMProviderError(f"{self.label} API error {response.status}: {error_text}")
                 
-                result = await response.json()
-                return result["choices"][0]["message"]["content"].strip()
+                if self.adapter.stream_format == "ndjson":
+                    events = iter_ndjson(response.content)
+                else:
+                    events = (fast_json.loads(data) async for data in iter_sse_data(response.content))
+                
+                async for event in events:
+                    delta, done = self.adapter.parse_stream_event(event)
+                    metrics.apply_usage(self.adapter.parse_usage(event))
+                    if delta:
+                        yield delta
+                    if done:
+                        return
                 
         except aiohttp.ClientError as e:
-            raise LLMProviderError(f"DeepSeek API client error: {str(e)}")
-        except KeyError as e:
-            raise LLMProviderError(f"DeepSeek API response format error: {str(e)}")
-
-
-class ZhipuAPIClient(APIClient):
-    """API client for Zhipu provider."""
+            raise LLMProviderError(f"{self.label} API client error: {str(e)}")
+        except ValueError as e:
+            # Covers malformed stream lines and in-band provider errors
+            raise LLMProviderError(f"{self.label} API stream error: {str(e)}")
+        finally:
+            # Also reached when the caller closes the stream early
+            metrics.total = metrics.elapsed()
     
-    async def generate_text(self, prompt: str, system_prompt: str = "") -> str:
-        """Generate text using Zhipu API."""
+    async def preload(self) -> bool:
+        """Load the model into memory without generating. Returns False if the protocol cannot preload."""
         if not self.session:
             raise LLMProviderError("Session not initialized")
         
-        payload = {
-            "model": self.config.model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt} if system_prompt else None,
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature
-        }
-        
-        # Remove None values
-        payload["messages"] = [msg for msg in payload["messages"] if msg is not None]
+        payload = self.adapter.build_preload_payload(self.template)
+        if payload is None:
+            return False
         
         try:
             async with self.session.post(
                 self.config.api_endpoint,
-                headers=self._prepare_headers(),
+                headers=self.template.headers,
                 json=payload
             ) as response:
                 if response.status != 200:
                     error_text = await response.text()
-                    raise LLMProviderError(f"Zhipu API error {response.status}: {error_text}")
-                
-                result = await response.json()
-                return result["choices"][0]["message"]["content"].strip()
-                
+                    raise LLMProviderError(f"{self.label} preload error {response.status}: {error_text}")
+                await response.read()
+                return True
         except aiohttp.ClientError as e:
-            raise LLMProviderError(f"Zhipu API client error: {str(e)}")
-        except KeyError as e:
-            raise LLMProviderError(f"Zhipu API response format error: {str(e)}")
+            raise LLMProviderError(f"{self.label} API client error: {str(e)}")
 
 
-class OllamaAPIClient(APIClient):
-    """API client for Ollama local provider."""
-    
-    def _prepare_headers(self) -> Dict[str, str]:
-        """Prepare headers for Ollama API requests (no auth needed)."""
-        return {
-            "Content-Type": "application/json"
-        }
-    
-    async def generate_text(self, prompt: str, system_prompt: str = "") -> str:
-        """Generate text using Ollama API."""
-        if not self.session:
-            raise LLMProviderError("Session not initialized")
-        
-        # Combine system and user prompts for Ollama
-        full_prompt = prompt
-        if system_prompt:
-            full_prompt = f"{system_prompt}\n\nUser: {prompt}\nAssistant:"
-        
-        payload = {
-            "model": self.config.model_name,
-            "prompt": full_prompt,
-            "options": {
-                "num_predict": self.config.max_tokens,
-                "temperature": self.config.temperature
-            },
-            "stream": False
-        }
-        
-        try:
-            async with self.session.post(
-                self.config.api_endpoint,
-                headers=self._prepare_headers(),
-                json=payload
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise LLMProviderError(f"Ollama API error {response.status}: {error_text}")
-                
-                result = await response.json()
-                return result["response"].strip()
-                
-        except aiohttp.ClientError as e:
-            raise LLMProviderError(f"Ollama API client error: {str(e)}")
-        except KeyError as e:
-            raise LLMProviderError(f"Ollama API response format error: {str(e)}")
+class QwenAPIClient(ChatAPIClient):
+    """API client for Qwen provider."""
+    provider_label = "Qwen"
+
+
+class DeepSeekAPIClient(ChatAPIClient):
+    """API client for DeepSeek provider."""
+    provider_label = "DeepSeek"
+
+
+class ZhipuAPIClient(ChatAPIClient):
+    """API client for Zhipu provider."""
+    provider_label = "Zhipu"
+
+
+class OllamaAPIClient(ChatAPIClient):
+    """API client for Ollama local provider (/api/generate or /api/chat)."""
+    provider_label = "Ollama"
+
+
+# Named client classes kept for existing providers; anything else with a
+# known api_format uses ChatAPIClient directly
+_CLIENT_CLASSES = {
+    "qwen": QwenAPIClient,
+    "deepseek": DeepSeekAPIClient,
+    "zhipu": ZhipuAPIClient,
+}
 
 
 class LLMConfigManager:
@@ -259,6 +292,51 @@ class LLMConfigManager:
         self.auto_switch_rules = {}
         self.performance_settings = {}
         
+        # Pooled HTTP sessions shared by all API clients, created lazily per provider
+        self.session_pool: Optional[ProviderSessionPool] = None
+        
+        # Optional content-addressed response cache (disabled unless configured)
+        self.response_cache: Optional[LLMResponseCache] = None
+        
+        # Coalesces concurrent identical requests into one upstream call
+        self.single_flight: Optional[SingleFlight] = None
+        
+        # Prebuilt headers and payload skeletons per provider (and max_tokens, for batched
+        # calls, and output schema, for structured JSON requests)
+        self._request_templates: Dict[Tuple[str, int, Optional[str]], Tuple[tuple, RequestTemplate]] = {}
+        
+        # Per-provider concurrency and rate limits
+        self.rate_limiters: Dict[str, ProviderRateLimiter] = {}
+        
+        # Orders providers per request by observed latency and error rate
+        self.router: Optional[ProviderRouter] = None
+        
+        # Opt-in hedging: a backup request to the next provider when the first is slow
+        self.hedging_config = HedgingConfig()
+        self.hedge_budget: Optional[HedgeBudget] = None
+        
+        # Streamed generation for JSON responses, stopping once the object is closed
+        self.streaming_config = StreamingConfig()
+        
+        # JSON mode / schema-constrained decoding for JSON responses
+        self.structured_output_config = StructuredOutputConfig()
+        self.streamed_requests = 0
+        self.stream_early_stops = 0
+        
+        # Opt-in micro-batching: packs concurrent JSON requests into one provider call
+        self.micro_batcher: Optional[MicroBatcher] = None
+        
+        # Per-provider latency histograms and token usage, per HTTP attempt
+        self.telemetry = LLMTelemetry()
+        
+        # Preloading and keep-warm pings for local Ollama models
+        self.warmup_config = OllamaWarmupConfig()
+        self._keep_warm_task: Optional[asyncio.Task] = None
+        self._last_request_at = time.monotonic()
+        self.warmups = 0
+        self.warmup_failures = 0
+        self.last_warmup: Optional[datetime] = None
+        
         # Setup circuit breakers for each provider
         self._setup_circuit_breakers()
         
@@ -284,14 +362,28 @@ class LLMConfigManager:
         """Setup health checks for LLM providers."""
         def check_llm_health():
             try:
-                # Simple health check - try to get current provider
                 current = self.get_current_provider()
-                return current is not None
+                if current is None:
+                    return False
+                # A local model that has been unloaded would make the next request pay the load time
+                if (self.warmup_config.enabled and self.warmup_config.check_resident
+                        and is_ollama_provider(current)):
+                    return model_resident(
+                        current.api_endpoint, current.model_name, self.warmup_config.health_check_timeout
+                    )
+                return True
             except Exception:
                 return False
         
         register_component_health_check("llm_manager", check_llm_health, interval=120)
     
+    def _sync_circuit_breaker_timeouts(self):
+        """Bound each provider's circuit breaker calls by that provider's request timeout."""
+        for llm_config in self.providers.values():
+            breaker = self.error_handler.get_circuit_breaker(f"llm_{llm_config.provider_name}")
+            if breaker.config.timeout != llm_config.timeout:
+                breaker.config = replace(breaker.config, timeout=llm_config.timeout)
+    
     def _load_configuration(self):
         """Load LLM provider configurations from file."""
         try:
@@ -323,6 +415,57 @@ class LLMConfigManager:
             self.auto_switch_rules = self.model_selection_config.get("auto_switch_rules", {})
             self.performance_settings = self.model_selection_config.get("performance_settings", {})
             
+            pool_config = ConnectionPoolConfig.from_dict(self.performance_settings.get("connection_pool"))
+            if self.session_pool is None:
+                self.session_pool = ProviderSessionPool(pool_config)
+            else:
+                self.session_pool.config = pool_config
+            
+            cache_config = ResponseCacheConfig.from_dict(self.performance_settings.get("response_cache"))
+            if self.response_cache is None or self.response_cache.config != cache_config:
+                if self.response_cache is not None:
+                    self.response_cache.close()
+                self.response_cache = LLMResponseCache(cache_config)
+            
+            single_flight_config = SingleFlightConfig.from_dict(self.performance_settings.get("single_flight"))
+            if self.single_flight is None:
+                self.single_flight = SingleFlight(single_flight_config)
+            else:
+                self.single_flight.config = single_flight_config
+            
+            self._setup_rate_limiters()
+            self._sync_circuit_breaker_timeouts()
+            
+            routing_config = RoutingConfig.from_dict(self.performance_settings.get("adaptive_routing"))
+            if self.router is None:
+                self.router = ProviderRouter(routing_config)
+            else:
+                self.router.config = routing_config
+            
+            hedging_config = HedgingConfig.from_dict(self.performance_settings.get("hedging"))
+            if self.hedge_budget is None or self.hedging_config != hedging_config:
+                self.hedge_budget = HedgeBudget(hedging_config.max_hedge_rate, hedging_config.budget_window)
+            self.hedging_config = hedging_config
+            
+            self.streaming_config = StreamingConfig.from_dict(self.performance_settings.get("streaming"))
+            self.structured_output_config = StructuredOutputConfig.from_dict(
+                self.performance_settings.get("structured_output")
+            )
+            
+            self.telemetry.config = TelemetryConfig.from_dict(self.performance_settings.get("telemetry"))
+            
+            self.warmup_config = OllamaWarmupConfig.from_dict(self.performance_settings.get("ollama_warmup"))
+            if self.warmup_config.enabled and self.warmup_config.keep_alive is not None:
+                for llm_config in self.providers.values():
+                    if llm_config.keep_alive is None and is_ollama_provider(llm_config):
+                        llm_config.keep_alive = self.warmup_config.keep_alive
+            
+            batching_config = BatchingConfig.from_dict(self.performance_settings.get("batching"))
+            if self.micro_batcher is None:
+                self.micro_batcher = MicroBatcher(batching_config, self._execute_batch)
+            else:
+                self.micro_batcher.config = batching_config
+            
             # Sort providers by priority if specified
             self._sort_providers_by_priority()
             
@@ -392,6 +535,31 @@ class LLMConfigManager:
         # Update provider order
         self.provider_order = [provider_name for provider_name, _ in provider_priorities]
     
+    def _setup_rate_limiters(self):
+        """Build per-provider rate limiters from performance_settings.rate_limits."""
+        rate_limit_settings = self.performance_settings.get("rate_limits", {})
+        default_settings = rate_limit_settings.get("default", {})
+        
+        rate_limiters = {}
+        for provider_name in self.providers:
+            provider_settings = {**default_settings, **rate_limit_settings.get(provider_name, {})}
+            limit_config = RateLimitConfig.from_dict(provider_settings)
+            
+            existing = self.rate_limiters.get(provider_name)
+            if existing is not None and existing.config == limit_config:
+                # Keep in-flight accounting across reloads when nothing changed
+                rate_limiters[provider_name] = existing
+            else:
+                rate_limiters[provider_name] = ProviderRateLimiter(provider_name, limit_config)
+        
+        self.rate_limiters = rate_limiters
+    
+    def _get_rate_limiter(self, provider_name: str) -> ProviderRateLimiter:
+        """Get the rate limiter for a provider, creating an unlimited one if needed."""
+        if provider_name not in self.rate_limiters:
+            self.rate_limiters[provider_name] = ProviderRateLimiter(provider_name)
+        return self.rate_limiters[provider_name]
+    
     def get_provider_config(self, provider_name: str) -> Optional[LLMConfig]:
         """Get configuration for a specific provider."""
         return self.providers.get(provider_name)
@@ -404,121 +572,441 @@ class LLMConfigManager:
         current_provider_name = self.provider_order[self.current_provider_index]
         return self.providers.get(current_provider_name)
     
-    def _create_api_client(self, config: LLMConfig) -> APIClient:
-        """Create appropriate API client based on provider."""
+    def _create_api_client(self, config: LLMConfig,
+                           output_schema: Optional[Dict[str, Any]] = None) -> APIClient:
+        """
+        Create appropriate API client based on provider.
+        
+        With output_schema the client's requests ask for structured JSON output,
+        unless the provider has structured_output disabled.
+        """
         provider_name = config.provider_name.lower()
+        api_format = resolve_api_format(config)
+        if api_format is None:
+            raise LLMConfigurationError(f"Unsupported provider: {config.provider_name}")
+        try:
+            adapter = get_adapter(api_format)
+        except KeyError:
+            raise LLMConfigurationError(
+                f"Unsupported api_format '{api_format}' for provider {config.provider_name}"
+            )
         
-        if provider_name == "qwen":
-            return QwenAPIClient(config)
-        elif provider_name == "deepseek":
-            return DeepSeekAPIClient(config)
-        elif provider_name == "zhipu":
-            return ZhipuAPIClient(config)
-        elif "ollama" in provider_name:
-            return OllamaAPIClient(config)
+        if "ollama" in provider_name:
+            client_class = OllamaAPIClient
         else:
-            raise LLMConfigurationError(f"Unsupported provider: {config.provider_name}")
+            client_class = _CLIENT_CLASSES.get(provider_name, ChatAPIClient)
+        if config.structured_output is False:
+            output_schema = None
+        return client_class(
+            config, self.session_pool, adapter, self._get_request_template(config, adapter, output_schema)
+        )
+    
+    def _get_request_template(self, config: LLMConfig, adapter: ResponseAdapter,
+                              output_schema: Optional[Dict[str, Any]] = None) -> RequestTemplate:
+        """Get the prebuilt request template for a provider, rebuilding it if the config changed."""
+        fingerprint = (
+            adapter, config.api_key, config.model_name, config.max_tokens, config.temperature,
+            config.keep_alive
+        )
+        template_key = (config.provider_name, config.max_tokens, schema_key(output_schema))
+        cached = self._request_templates.get(template_key)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, adapter.build_template(config, output_schema))
+            self._request_templates[template_key] = cached
+        return cached[1]
     
     @with_graceful_degradation("llm_api")
-    async def generate_text_with_failover(self, prompt: str, system_prompt: str = "") -> str:
-        """Generate text with automatic failover between providers."""
-        start_time = datetime.now()
-        last_error = None
+    async def generate_text_with_failover(self, prompt: str, system_prompt: str = "",
+                                          use_cache: bool = True,
+                                          capability: Optional[str] = None,
+                                          hedge: Optional[bool] = None,
+                                          response_format: Optional[str] = None,
+                                          on_field: Optional[Callable[[str, Any], Any]] = None,
+                                          batch: Optional[bool] = None,
+                                          response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text with automatic failover between providers.
         
-        self.logger.info(f"Starting LLM text generation with {len(self.provider_order)} providers available")
-        
-        # Try each provider in order
-        for attempt in range(len(self.provider_order)):
-            current_config = self.get_current_provider()
-            if not current_config:
-                error_context = ErrorContext(
-                    error_category=ErrorCategory.LLM_API_FAILURE,
-                    error_message="No providers available",
-                    component_name="llm_manager",
-                    timestamp=datetime.now()
-                )
-                self.error_handler.handle_error(
-                    LLMConfigurationError("No providers available"), 
-                    error_context
+        Args:
+            prompt: User prompt
+            system_prompt: System prompt
+            use_cache: Set to False for requests that must not reuse a cached
+                response (e.g. creative generation); such requests are also never
+                coalesced with concurrent identical ones
+            capability: Only route to providers declaring this capability
+            hedge: Send a backup request to the next provider if the first one is
+                slow; None uses the configured default
+            response_format: "json" when the caller expects a single JSON object;
+                providers are asked for structured output (JSON mode), and with
+                streaming enabled the response is streamed and reading stops once
+                the object is closed
+            on_field: Called with (key, value) for each top-level string field of a
+                streamed JSON response as soon as it is complete. Fields come from
+                the attempt in progress and may be superseded if it later fails.
+            batch: Allow packing this request with concurrent ones into a single
+                provider call (JSON responses only, when batching is enabled);
+                None follows batch_requests() in the calling context. Batched
+                items bypass the response cache.
+            response_schema: JSON schema of the expected object; providers with
+                schema-constrained decoding (Ollama) generate to it. Only used
+                with response_format="json".
+        """
+        self._last_request_at = time.monotonic()
+        if batch is None:
+            batch = batching_requested()
+        batch = (batch and response_format == "json" and on_field is None
+                 and self.micro_batcher is not None and self.micro_batcher.enabled)
+        
+        if (use_cache and on_field is None and self.single_flight is not None
+                and self.single_flight.enabled):
+            request_key = SingleFlight.make_key(
+                system_prompt, prompt, capability, response_format, schema_key(response_schema)
+            )
+            return await self.single_flight.do(
+                request_key,
+                lambda: self._generate_text(
+                    prompt, system_prompt, use_cache, capability, hedge, response_format,
+                    batch=batch, response_schema=response_schema
                 )
-                raise LLMConfigurationError("No providers available")
+            )
+        
+        return await self._generate_text(
+            prompt, system_prompt, use_cache, capability, hedge, response_format, on_field, batch,
+            response_schema
+        )
+    
+    async def _generate_text(self, prompt: str, system_prompt: str, use_cache: bool,
+                             capability: Optional[str] = None, hedge: Optional[bool] = None,
+                             response_format: Optional[str] = None,
+                             on_field: Optional[Callable[[str, Any], Any]] = None,
+                             batch: bool = False,
+                             response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """Serve a request from a micro-batch when possible, otherwise on its own."""
+        if batch:
+            group = (system_prompt, capability, schema_key(response_schema))
+            result = await self.micro_batcher.submit(group, prompt)
+            if result is not None:
+                return result
+        
+        return await self._generate_text_with_failover(
+            prompt, system_prompt, use_cache, capability, hedge, response_format, on_field,
+            response_schema=response_schema
+        )
+    
+    async def _execute_batch(self, group: Tuple[str, Optional[str], Optional[str]],
+                             prompts: List[str]) -> List[Optional[str]]:
+        """
+        Answer several prompts sharing a system prompt and schema with one packed request.
+        
+        The packed call gets max_tokens scaled by the number of items and is not
+        hedged, streamed or cached. Returns one JSON object text per prompt, None
+        where the item was missing or does not match the response schema.
+        """
+        system_prompt, capability, response_schema_key = group
+        response_schema = json.loads(response_schema_key) if response_schema_key else None
+        self.logger.info(f"Sending {len(prompts)} prompts as one batched request")
+        text = await self._generate_text_with_failover(
+            pack_prompts(prompts), system_prompt, use_cache=False, capability=capability,
+            hedge=False, max_tokens_scale=len(prompts)
+        )
+        return split_batch_response(text, len(prompts), response_schema)
+    
+    def _select_providers(self, capability: Optional[str] = None) -> List[str]:
+        """
+        Order the providers to try for one request.
+        
+        Candidates keep their static priority order (default provider first)
+        and are then ranked by the router's expected completion time.
+        """
+        candidates = list(self.provider_order)
+        if capability:
+            candidates = [
+                name for name in candidates
+                if capability in (getattr(self.providers[name], 'capabilities', None) or [])
+            ]
+        
+        if self.router is None:
+            return candidates
+        return self.router.rank(candidates)
+    
+    def _response_cache_key(self, config: LLMConfig, prompt: str, system_prompt: str,
+                            response_format: Optional[str] = None,
+                            response_schema: Optional[Dict[str, Any]] = None,
+                            max_tokens_scale: int = 1) -> str:
+        """Build the response cache key for a provider's config."""
+        return LLMResponseCache.make_key(
+            config.provider_name,
+            config.model_name,
+            config.temperature,
+            system_prompt,
+            prompt,
+            response_format,
+            schema_key(response_schema),
+            config.max_tokens * max_tokens_scale
+        )
+    
+    async def _generate_text_with_failover(self, prompt: str, system_prompt: str,
+                                           use_cache: bool, capability: Optional[str] = None,
+                                           hedge: Optional[bool] = None,
+                                           response_format: Optional[str] = None,
+                                           on_field: Optional[Callable[[str, Any], Any]] = None,
+                                           max_tokens_scale: int = 1,
+                                           response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """Run the provider failover loop for a single (uncoalesced) request."""
+        last_error = None
+        provider_names = self._select_providers(capability)
+        if hedge is None:
+            hedge = self.hedging_config.enabled
+        stream_json = response_format == "json" and self.streaming_config.enabled
+        output_schema = None
+        # OpenAI-style JSON mode rejects requests whose messages never mention JSON
+        if (response_format == "json" and self.structured_output_config.enabled
+                and "json" in f"{system_prompt}\n{prompt}".lower()):
+            use_schema = response_schema is not None and self.structured_output_config.use_schema
+            output_schema = response_schema if use_schema else JSON_OBJECT_SCHEMA
+        
+        self.logger.info(f"Starting LLM text generation with {len(provider_names)} providers available")
+        
+        if not provider_names:
+            error_context = ErrorContext(
+                error_category=ErrorCategory.LLM_API_FAILURE,
+                error_message="No providers available",
+                component_name="llm_manager",
+                timestamp=datetime.now()
+            )
+            self.error_handler.handle_error(
+                LLMConfigurationError("No providers available"), 
+                error_context
+            )
+            raise LLMConfigurationError("No providers available")
+        
+        use_response_cache = use_cache and self.response_cache is not None and self.response_cache.enabled
+        
+        # Try each provider in routed order
+        remaining = list(provider_names)
+        while remaining:
+            attempt = len(provider_names) - len(remaining)
+            provider_name = remaining.pop(0)
+            
+            if use_response_cache:
+                cached_result = self.response_cache.get(self._response_cache_key(
+                    self.providers[provider_name], prompt, system_prompt,
+                    response_format, response_schema, max_tokens_scale
+                ))
+                if cached_result is not None:
+                    self.logger.info(f"LLM response cache hit for {self.providers[provider_name].provider_name}")
+                    return cached_result
             
             try:
-                # Use circuit breaker for this provider
-                circuit_breaker = self.error_handler.get_circuit_breaker(f"llm_{current_config.provider_name}")
-                
-                result = await circuit_breaker.call(
-                    self._generate_with_retry, 
-                    current_config, 
-                    prompt, 
-                    system_prompt
-                )
-                
-                # Log successful generation
-                duration = (datetime.now() - start_time).total_seconds()
-                diary_logger.log_llm_api_call(
-                    provider=current_config.provider_name,
-                    model=current_config.model_name,
-                    tokens_used=len(result.split()),  # Approximate token count
-                    response_time=duration,
-                    status="success"
-                )
-                
-                self.logger.info(f"Successfully generated text using {current_config.provider_name}")
-                return result
-                
+                if hedge and remaining:
+                    provider_name, result = await self._hedged_attempt(
+                        provider_name, remaining, prompt, system_prompt, attempt,
+                        stream_json, on_field, output_schema
+                    )
+                else:
+                    result = await self._attempt_provider(
+                        provider_name, prompt, system_prompt, attempt,
+                        stream_json, on_field, max_tokens_scale, output_schema
+                    )
             except Exception as e:
                 last_error = e
-                
-                # Log the failure
-                duration = (datetime.now() - start_time).total_seconds()
-                diary_logger.log_llm_api_call(
-                    provider=current_config.provider_name,
-                    model=current_config.model_name,
-                    tokens_used=0,
-                    response_time=duration,
-                    status="failed"
-                )
-                
-                # Handle the error
-                error_context = ErrorContext(
-                    error_category=ErrorCategory.LLM_API_FAILURE,
-                    error_message=str(e),
-                    component_name="llm_manager",
-                    timestamp=datetime.now(),
-                    retry_count=attempt,
-                    metadata={"provider": current_config.provider_name}
+                continue
+            
+            if use_response_cache:
+                self.response_cache.set(
+                    self._response_cache_key(
+                        self.providers[provider_name], prompt, system_prompt,
+                        response_format, response_schema, max_tokens_scale
+                    ),
+                    result
                 )
-                
-                recovery_result = self.error_handler.handle_error(e, error_context)
-                
-                self.logger.warning(f"Provider {current_config.provider_name} failed: {str(e)}")
-                self._switch_to_next_provider()
+            return result
         
         # If all providers failed, raise the last error
         error_msg = f"All LLM providers failed. Last error: {str(last_error)}"
         self.logger.error(error_msg)
         raise LLMProviderError(error_msg)
     
-    async def _generate_with_retry(self, config: LLMConfig, prompt: str, system_prompt: str) -> str:
-        """Generate text with exponential backoff retry."""
+    async def _attempt_provider(self, provider_name: str, prompt: str, system_prompt: str,
+                                attempt: int, stream_json: bool = False,
+                                on_field: Optional[Callable[[str, Any], Any]] = None,
+                                max_tokens_scale: int = 1,
+                                output_schema: Optional[Dict[str, Any]] = None) -> str:
+        """Call one provider with retries, recording the outcome."""
+        current_config = self.providers[provider_name]
+        if max_tokens_scale > 1:
+            current_config = replace(current_config, max_tokens=current_config.max_tokens * max_tokens_scale)
+        attempt_started = time.monotonic()
+        # Time queued in the local rate limiter is not provider latency
+        queued_before = queue_wait_seconds()
+        try:
+            if stream_json:
+                result = await self._generate_with_retry(
+                    current_config, prompt, system_prompt, stream_json=True, on_field=on_field,
+                    output_schema=output_schema
+                )
+            elif output_schema is not None:
+                result = await self._generate_with_retry(
+                    current_config, prompt, system_prompt, output_schema=output_schema
+                )
+            else:
+                result = await self._generate_with_retry(current_config, prompt, system_prompt)
+            
+            if self.router is not None:
+                self.router.record(provider_name, self._provider_latency(attempt_started, queued_before), success=True)
+            # Remember the provider that served this request for get_current_provider()
+            self.current_provider_index = self.provider_order.index(provider_name)
+            
+            self.logger.info(f"Successfully generated text using {current_config.provider_name}")
+            return result
+            
+        except Exception as e:
+            # A full local queue says nothing about the provider's health
+            if self.router is not None and not isinstance(e, RateLimitExceededError):
+                self.router.record(provider_name, self._provider_latency(attempt_started, queued_before), success=False)
+            
+            # Log the failure with the time spent on this provider (including retries)
+            diary_logger.log_llm_api_call(
+                provider=current_config.provider_name,
+                model=current_config.model_name,
+                tokens_used=0,
+                response_time=time.monotonic() - attempt_started,
+                status="failed"
+            )
+            
+            # Handle the error
+            error_context = ErrorContext(
+                error_category=ErrorCategory.LLM_API_FAILURE,
+                error_message=str(e),
+                component_name="llm_manager",
+                timestamp=datetime.now(),
+                retry_count=attempt,
+                metadata={"provider": current_config.provider_name}
+            )
+            
+            # Only recorded: retries with backoff already happened in _generate_with_retry,
+            # and the next provider is tried without waiting
+            self.error_handler.handle_error(e, error_context)
+            
+            self.logger.warning(f"Provider {current_config.provider_name} failed: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _provider_latency(attempt_started: float, queued_before: float) -> float:
+        """Seconds since attempt_started, minus the time spent waiting for rate-limiter admission."""
+        queued = queue_wait_seconds() - queued_before
+        return max(0.0, time.monotonic() - attempt_started - queued)
+    
+    def _hedge_delay(self, provider_name: str) -> float:
+        """Seconds to wait on a provider before sending a hedged request."""
+        config = self.hedging_config
+        observed = None
+        if self.router is not None:
+            observed = self.router.latency_percentile(
+                provider_name, config.latency_percentile, config.min_samples
+            )
+        delay = observed if observed is not None else config.fallback_delay
+        return max(config.min_delay, delay)
+    
+    async def _hedged_attempt(self, primary: str, remaining: List[str], prompt: str,
+                              system_prompt: str, attempt: int,
+                              stream_json: bool = False,
+                              on_field: Optional[Callable[[str, Any], Any]] = None,
+                              output_schema: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """
+        Call the primary provider and, if it is slow, race it against the next one.
+        
+        The backup provider is taken from remaining only when a hedge is actually
+        sent. The first successful response wins and the other call is cancelled.
+        
+        Returns:
+            Tuple of (provider name that answered, generated text)
+        """
+        delay = self._hedge_delay(primary)
+        budget_slot = self.hedge_budget.record_request()
+        
+        tasks = {
+            asyncio.ensure_future(
+                self._attempt_provider(
+                    primary, prompt, system_prompt, attempt, stream_json, on_field,
+                    output_schema=output_schema
+                )
+            ): primary
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.hedge_budget.try_acquire(budget_slot):
+                secondary = remaining.pop(0)
+                self.logger.info(
+                    f"Provider {primary} slower than {delay:.2f}s, hedging with {secondary}"
+                )
+                tasks[asyncio.ensure_future(
+                    self._attempt_provider(
+                        secondary, prompt, system_prompt, attempt + 1, stream_json, on_field,
+                        output_schema=output_schema
+                    )
+                )] = secondary
+            
+            last_error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return tasks[task], task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+    
+    async def _generate_with_retry(self, config: LLMConfig, prompt: str, system_prompt: str,
+                                   stream_json: bool = False,
+                                   on_field: Optional[Callable[[str, Any], Any]] = None,
+                                   output_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text with exponential backoff retry.
+        
+        Each HTTP attempt goes through the provider's circuit breaker, so an open
+        breaker (or a timed-out attempt) ends the retry cycle immediately and the
+        caller fails over to the next provider. With stream_json the response is
+        streamed and parsed incrementally (see _stream_json_response); with
+        output_schema the provider is asked for structured JSON output.
+        """
         last_error = None
+        rate_limiter = self._get_rate_limiter(config.provider_name)
+        circuit_breaker = self.error_handler.get_circuit_breaker(f"llm_{config.provider_name}")
+        estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(prompt) + config.max_tokens
         
         for attempt in range(config.retry_attempts):
             try:
-                async with self._create_api_client(config) as client:
-                    result = await client.generate_text(prompt, system_prompt)
-                    
-                    # Log successful retry if this wasn't the first attempt
-                    if attempt > 0:
-                        diary_logger.log_error_recovery(
-                            component="llm_manager",
-                            error_category="llm_api_failure",
-                            recovery_action=f"retry_attempt_{attempt + 1}",
-                            success=True
+                # Waits (bounded) for a concurrency slot and rate budget; raises
+                # RateLimitExceededError so the caller fails over instead of retrying
+                async with rate_limiter.limit(estimated_tokens):
+                    if stream_json:
+                        result = await circuit_breaker.call_async(
+                            self._stream_json_response, config, prompt, system_prompt, on_field,
+                            output_schema=output_schema
                         )
-                    
-                    return result
+                    else:
+                        result = await circuit_breaker.call_async(
+                            self._call_provider, config, prompt, system_prompt,
+                            output_schema=output_schema
+                        )
+                
+                # Log successful retry if this wasn't the first attempt
+                if attempt > 0:
+                    diary_logger.log_error_recovery(
+                        component="llm_manager",
+                        error_category="llm_api_failure",
+                        recovery_action=f"retry_attempt_{attempt + 1}",
+                        success=True
+                    )
+                
+                return result
                     
             except LLMProviderError as e:
                 last_error = e
@@ -541,6 +1029,175 @@ class LLMConfigManager:
         self.logger.error(error_msg)
         raise LLMProviderError(error_msg)
     
+    async def _call_provider(self, config: LLMConfig, prompt: str, system_prompt: str,
+                             output_schema: Optional[Dict[str, Any]] = None) -> str:
+        """Make a single generation request to a provider."""
+        async with self._create_api_client(config, output_schema) as client:
+            try:
+                result = await client.generate_text(prompt, system_prompt)
+            except Exception:
+                self._record_attempt(config, client, prompt, system_prompt, None)
+                raise
+            self._record_attempt(config, client, prompt, system_prompt, result)
+            return result
+    
+    def _record_attempt(self, config: LLMConfig, client: APIClient, prompt: str, system_prompt: str,
+                        result: Optional[str]):
+        """
+        Record one HTTP attempt's timings and token usage; result None marks a failure.
+        
+        Providers that do not report usage get estimated token counts, flagged
+        as estimates in the telemetry.
+        """
+        metrics = getattr(client, "last_metrics", None)
+        if not isinstance(metrics, AttemptMetrics):
+            return
+        if result is None:
+            self.telemetry.record(config.provider_name, metrics, success=False)
+            return
+        
+        if not metrics.usage_reported:
+            if metrics.prompt_tokens is None:
+                metrics.prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(prompt)
+            metrics.completion_tokens = estimate_tokens(result)
+        self.telemetry.record(config.provider_name, metrics, max_tokens=config.max_tokens)
+        
+        diary_logger.log_llm_api_call(
+            provider=config.provider_name,
+            model=config.model_name,
+            tokens_used=(metrics.prompt_tokens or 0) + metrics.completion_tokens,
+            response_time=metrics.total if metrics.total is not None else metrics.elapsed(),
+            status="success"
+        )
+    
+    async def _stream_json_response(self, config: LLMConfig, prompt: str, system_prompt: str,
+                                    on_field: Optional[Callable[[str, Any], Any]] = None,
+                                    output_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Stream a response that should contain one JSON object.
+        
+        Top-level string fields are passed to on_field as they complete. Once the
+        object's closing brace arrives (if early_stop is set) the rest of the
+        stream is discarded: it is read only until the provider's usage or done
+        event, bounded by usage_drain_timeout, and then closed, which ends
+        generation on the provider. Returns the JSON object text, or the full
+        text if no complete object was found.
+        """
+        parser = IncrementalJSONParser()
+        chunks = []
+        self.streamed_requests += 1
+        
+        async with self._create_api_client(config, output_schema) as client:
+            stream = client.stream_text(prompt, system_prompt)
+            try:
+                async for delta in stream:
+                    chunks.append(delta)
+                    for key, value in parser.feed(delta):
+                        if on_field is not None:
+                            outcome = on_field(key, value)
+                            if asyncio.iscoroutine(outcome):
+                                await outcome
+                    if parser.complete and self.streaming_config.early_stop:
+                        self.stream_early_stops += 1
+                        self.logger.debug(f"JSON object complete, stopping {config.provider_name} stream early")
+                        await self._drain_stream_usage(stream, client)
+                        break
+            except Exception:
+                self._record_attempt(config, client, prompt, system_prompt, None)
+                raise
+            finally:
+                await stream.aclose()
+            
+            result = parser.document if parser.complete else "".join(chunks).strip()
+            self._record_attempt(config, client, prompt, system_prompt, result)
+            return result
+    
+    async def _drain_stream_usage(self, stream: AsyncIterator[str], client: APIClient):
+        """
+        Read the rest of a stream, discarding text, until usage is reported.
+        
+        Usage arrives after the text (OpenAI's final usage chunk, Ollama's done
+        event); without it the attempt would be recorded with estimated tokens.
+        """
+        metrics = getattr(client, "last_metrics", None)
+        timeout = self.streaming_config.usage_drain_timeout
+        if not isinstance(metrics, AttemptMetrics) or timeout <= 0:
+            return
+        deadline = time.monotonic() + timeout
+        while not metrics.usage_reported:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(stream.__anext__(), remaining)
+            except (StopAsyncIteration, asyncio.TimeoutError):
+                break
+    
+    async def start(self):
+        """
+        Warm up local models and start the keep-warm loop.
+        
+        Call once from the running event loop at application startup.
+        """
+        if not self.warmup_config.enabled:
+            return
+        if self.warmup_config.warm_up_on_start:
+            await self.warm_up()
+        if self._keep_warm_task is None and any(is_ollama_provider(c) for c in self.providers.values()):
+            self._last_request_at = time.monotonic()
+            self._keep_warm_task = asyncio.create_task(self._keep_warm_loop())
+    
+    async def warm_up(self) -> Dict[str, bool]:
+        """
+        Preload every enabled Ollama model with its keep_alive.
+        
+        Returns:
+            Dictionary mapping provider name to whether the preload succeeded
+        """
+        results = {}
+        for provider_name, config in self.providers.items():
+            if not is_ollama_provider(config):
+                continue
+            started = time.monotonic()
+            try:
+                async with self._create_api_client(config) as client:
+                    results[provider_name] = await client.preload()
+                self.logger.info(
+                    f"Warmed up {provider_name} ({config.model_name}) in {time.monotonic() - started:.2f}s"
+                )
+            except Exception as e:
+                results[provider_name] = False
+                self.logger.warning(f"Warm-up of {provider_name} failed: {str(e)}")
+        
+        if results:
+            self.warmups += 1
+            self.warmup_failures += sum(1 for ok in results.values() if not ok)
+            self.last_warmup = datetime.now()
+        return results
+    
+    async def _keep_warm_loop(self):
+        """Re-send preloads while traffic is expected so keep_alive never lapses."""
+        while True:
+            await asyncio.sleep(self.warmup_config.keep_warm_interval)
+            if not self.warmup_config.enabled:
+                continue
+            if time.monotonic() - self._last_request_at > self.warmup_config.traffic_window:
+                continue
+            try:
+                await self.warm_up()
+            except Exception as e:
+                self.logger.warning(f"Keep-warm ping failed: {str(e)}")
+    
+    async def close(self):
+        """Close pooled provider connections. Call on application shutdown."""
+        if self._keep_warm_task is not None:
+            self._keep_warm_task.cancel()
+            await asyncio.gather(self._keep_warm_task, return_exceptions=True)
+            self._keep_warm_task = None
+        if self.session_pool is not None:
+            await self.session_pool.close()
+            self.logger.info("Closed pooled LLM provider sessions")
+    
     def _switch_to_next_provider(self):
         """Switch to the next provider in the list."""
         if len(self.provider_order) > 1:
@@ -558,9 +1215,46 @@ class LLMConfigManager:
         return {
             "providers": list(self.providers.keys()),
             "current_provider": self.provider_order[self.current_provider_index] if self.provider_order else None,
-            "total_providers": len(self.providers)
+            "total_providers": len(self.providers),
+            "connection_pool": self.session_pool.get_pool_stats() if self.session_pool else {},
+            "response_cache": self.response_cache.get_cache_stats() if self.response_cache else {},
+            "single_flight": self.single_flight.get_stats() if self.single_flight else {},
+            "rate_limits": {name: limiter.get_stats() for name, limiter in self.rate_limiters.items()},
+            "routing": self.router.get_routing_stats() if self.router else {},
+            "circuit_breakers": {
+                name: self.error_handler.get_circuit_breaker(f"llm_{config.provider_name}").get_state()
+                for name, config in self.providers.items()
+            },
+            "batching": self.micro_batcher.get_stats() if self.micro_batcher else {},
+            "telemetry": self.telemetry.get_stats(),
+            "warmup": {
+                "enabled": self.warmup_config.enabled,
+                "keep_warm_running": self._keep_warm_task is not None and not self._keep_warm_task.done(),
+                "warmups": self.warmups,
+                "failures": self.warmup_failures,
+                "last_warmup": self.last_warmup.isoformat() if self.last_warmup else None
+            },
+            "structured_output": asdict(self.structured_output_config),
+            "streaming": {
+                "enabled": self.streaming_config.enabled,
+                "streamed_requests": self.streamed_requests,
+                "early_stops": self.stream_early_stops
+            },
+            "hedging": dict(
+                self.hedge_budget.get_stats() if self.hedge_budget else {},
+                enabled=self.hedging_config.enabled
+            )
         }
     
+    def get_provider_telemetry(self, provider_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get latency histograms (connect, TTFB, total) and token usage for a provider.
+        
+        Returns:
+            Telemetry dictionary, or None if the provider has not been called yet
+        """
+        return self.telemetry.get_provider_stats(provider_name)
+    
     def get_providers_by_capability(self, capability: str) -> List[LLMConfig]:
         """Get all providers that support a specific capability."""
         capable_providers = []
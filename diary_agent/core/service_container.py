@@ -0,0 +1,129 @@
+"""
+Process-wide service container.
+Owns the single LLMConfigManager (and with it the provider connection pool,
+caches and circuit breakers) plus a registry of agents built on first use, so
+every API entry point in a worker process shares them instead of each agent
+re-reading the configuration and opening its own sessions.
+"""
+
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+
+DEFAULT_LLM_CONFIG_PATH = "config/llm_configuration.json"
+
+# Factories for the standalone agents; imports are deferred so that only the
+# agents a process actually uses are loaded.
+
+
+def _build_llm_manager(container: "ServiceContainer"):
+    from .llm_manager import LLMConfigManager
+    return LLMConfigManager(config_path=container.llm_config_path)
+
+
+def _build_event_extraction_agent(container: "ServiceContainer"):
+    from event_agents.extraction.agent import EventExtractionAgent
+    return EventExtractionAgent(llm_manager=container.llm_manager)
+
+
+def _build_event_update_agent(container: "ServiceContainer"):
+    from event_agents.update.agent import EventUpdateAgent
+    return EventUpdateAgent(llm_manager=container.llm_manager)
+
+
+def _build_bazi_agent(container: "ServiceContainer"):
+    from bazi_wuxing_agent import BaziWuxingAgent
+    return BaziWuxingAgent(llm_manager=container.llm_manager)
+
+
+def _build_sensor_agent(container: "ServiceContainer"):
+    from sensor_event_agent.core.sensor_event_agent import SensorEventAgent
+    return SensorEventAgent(llm_manager=container.llm_manager)
+
+
+DEFAULT_FACTORIES: Dict[str, Callable[["ServiceContainer"], Any]] = {
+    "llm_manager": _build_llm_manager,
+    "event_extraction_agent": _build_event_extraction_agent,
+    "event_update_agent": _build_event_update_agent,
+    "bazi_agent": _build_bazi_agent,
+    "sensor_agent": _build_sensor_agent,
+}
+
+
+class ServiceContainer:
+    """Lazily built, process-wide services keyed by name."""
+
+    def __init__(self, llm_config_path: str = DEFAULT_LLM_CONFIG_PATH):
+        self.llm_config_path = llm_config_path
+        self.logger = logging.getLogger("service_container")
+        # Re-entrant: building a service may build its dependencies
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Callable[["ServiceContainer"], Any]] = dict(DEFAULT_FACTORIES)
+        self._instances: Dict[str, Any] = {}
+
+    def register(self, name: str, factory: Callable[["ServiceContainer"], Any]):
+        """Register (or replace) the factory for a service; built on first get()."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Get a service, building it on first use."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                factory = self._factories.get(name)
+                if factory is None:
+                    raise KeyError(f"Unknown service: {name}")
+                instance = factory(self)
+                self._instances[name] = instance
+                self.logger.info(f"Built service {name}")
+            return instance
+
+    def is_built(self, name: str) -> bool:
+        """Whether a service has been built yet."""
+        return name in self._instances
+
+    def built_services(self) -> List[str]:
+        """Names of the services built so far."""
+        return list(self._instances)
+
+    @property
+    def llm_manager(self):
+        """The shared LLMConfigManager."""
+        return self.get("llm_manager")
+
+    async def start(self):
+        """Warm up the shared LLM manager. Call from the running event loop at startup."""
+        await self.llm_manager.start()
+
+    async def close(self):
+        """Close the shared LLM manager's pooled sessions if it was built."""
+        manager = self._instances.get("llm_manager")
+        if manager is not None:
+            await manager.close()
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+
+def get_container() -> ServiceContainer:
+    """Get the process-wide container, creating it on first use."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer()
+    return _container
+
+
+def reset_container(container: Optional[ServiceContainer] = None):
+    """Replace the process-wide container (for tests)."""
+    global _container
+    with _container_lock:
+        _container = container
@@ -0,0 +1,30 @@
+"""
+Shared fixtures for diary agent tests.
+"""
+
+import pytest
+import json
+import os
+import tempfile
+
+
+@pytest.fixture
+def write_config():
+    """Write LLM configuration files and delete them after the test."""
+    paths = []
+
+    def _write(providers, performance_settings=None):
+        config_data = {
+            "providers": providers,
+            "model_selection": {"performance_settings": performance_settings or {}}
+        }
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+        paths.append(f.name)
+        return f.name
+
+    yield _write
+
+    for path in paths:
+        if os.path.exists(path):
+            os.unlink(path)
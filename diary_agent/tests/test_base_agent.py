@@ -226,6 +226,15 @@ class TestBaseSubAgent:
         assert content_dict["content"] == "测试内容"
         assert content_dict["emotion_tags"] == ["开心快乐"]
     
+    def test_response_schema_requires_only_diary_fields(self, mock_agent):
+        """Test extra output_format keys are optional properties, not required fields."""
+        mock_agent.prompt_config.output_format = {"title": "string", "emotion": "string"}
+        
+        schema = mock_agent._get_response_schema()
+        
+        assert schema["required"] == ["title", "content", "emotion_tags"]
+        assert schema["properties"]["emotion"] == {"type": "string"}
+    
     def test_parse_generated_content_fallback(self, mock_agent):
         """Test fallback parsing for non-JSON content."""
         text_content = "测试标题\n这是测试内容"
@@ -0,0 +1,114 @@
+"""
+Unit tests for bounded-concurrency batch execution.
+"""
+
+import pytest
+import asyncio
+
+from diary_agent.utils.batch_runner import (
+    BatchRunConfig, ItemOutcome, iter_bounded, run_bounded,
+    OK, ERROR, TIMEOUT, DEADLINE_EXCEEDED
+)
+
+
+def _sleeper(delay, value, tracker=None):
+    async def job():
+        if tracker is not None:
+            tracker["running"] += 1
+            tracker["peak"] = max(tracker["peak"], tracker["running"])
+        try:
+            await asyncio.sleep(delay)
+            return value
+        finally:
+            if tracker is not None:
+                tracker["running"] -= 1
+    return job
+
+
+class TestRunBounded:
+    """Test ordering, concurrency bounds, timeouts and the batch deadline."""
+
+    @pytest.mark.asyncio
+    async def test_results_in_input_order_and_concurrent(self):
+        """Test outcomes keep input order and jobs overlap up to the limit."""
+        tracker = {"running": 0, "peak": 0}
+        jobs = [_sleeper(delay, i, tracker) for i, delay in enumerate([0.05, 0.01, 0.03, 0.02, 0.01])]
+
+        started = asyncio.get_running_loop().time()
+        outcomes = await run_bounded(jobs, BatchRunConfig(max_concurrency=5))
+        elapsed = asyncio.get_running_loop().time() - started
+
+        assert [outcome.value for outcome in outcomes] == [0, 1, 2, 3, 4]
+        assert all(outcome.ok for outcome in outcomes)
+        assert tracker["peak"] == 5
+        assert elapsed < 0.1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test no more than max_concurrency jobs run at once."""
+        tracker = {"running": 0, "peak": 0}
+        jobs = [_sleeper(0.01, i, tracker) for i in range(8)]
+
+        await run_bounded(jobs, BatchRunConfig(max_concurrency=2))
+
+        assert tracker["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_and_item_timeouts_become_outcomes(self):
+        """Test a failing or slow job does not affect the others."""
+        async def failing():
+            raise RuntimeError("boom")
+
+        outcomes = await run_bounded(
+            [_sleeper(0, "a"), failing, _sleeper(1, "slow")],
+            BatchRunConfig(item_timeout=0.05, deadline=0)
+        )
+
+        assert [outcome.status for outcome in outcomes] == [OK, ERROR, TIMEOUT]
+        assert outcomes[1].error == "boom"
+
+    @pytest.mark.asyncio
+    async def test_deadline_keeps_partial_results(self):
+        """Test finished results survive the deadline and the rest are cancelled."""
+        cancelled = []
+
+        async def stuck():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        outcomes = await run_bounded(
+            [_sleeper(0, "fast"), stuck, stuck],
+            BatchRunConfig(max_concurrency=1, item_timeout=0, deadline=0.05)
+        )
+        await asyncio.sleep(0)
+
+        assert outcomes[0] == ItemOutcome(OK, "fast")
+        assert [outcome.status for outcome in outcomes[1:]] == [DEADLINE_EXCEEDED] * 2
+        # The third job was still queued, so only one job had started
+        assert cancelled == [True]
+
+    @pytest.mark.asyncio
+    async def test_iter_bounded_yields_in_completion_order(self):
+        """Test the iterator yields each job as soon as it finishes."""
+        jobs = [_sleeper(0.03, "slow"), _sleeper(0, "fast")]
+
+        order = [index async for index, _ in iter_bounded(jobs)]
+
+        assert order == [1, 0]
+
+
+class TestBatchRunConfig:
+    """Test per-request overrides stay within the configured bounds."""
+
+    def test_overrides_are_clamped(self):
+        """Test concurrency is capped and timeouts can only be shortened."""
+        config = BatchRunConfig.from_dict({"max_concurrency": 4, "item_timeout": 30, "deadline": 60, "unknown": 1})
+
+        assert config.with_overrides(max_concurrency=100).max_concurrency == 16
+        assert config.with_overrides(max_concurrency=0).max_concurrency == 1
+        assert config.with_overrides(item_timeout=90, deadline=10).item_timeout == 30
+        assert config.with_overrides(item_timeout=90, deadline=10).deadline == 10
+        assert config.with_overrides() == config
@@ -0,0 +1,129 @@
+"""
+Tests for compact, token-budgeted context rendering in sub-agent prompts.
+"""
+
+from datetime import datetime
+from unittest.mock import Mock
+
+from diary_agent.agents.base_agent import BaseSubAgent
+from diary_agent.utils.context_serializer import ContextSerializer, ContextBudgetConfig, serialize_context
+from diary_agent.utils.data_models import EventData, DiaryContextData, PromptConfig
+
+
+class TestContextSerializer:
+    """Test rendering of single values and dicts."""
+    
+    def test_drops_empty_fields_and_sorts_keys(self):
+        """Test empty values vanish and key order does not depend on insertion order."""
+        first = serialize_context({"role": "lively", "name": "小明", "notes": "", "tags": [], "extra": None})
+        second = serialize_context({"name": "小明", "extra": {}, "role": "lively"})
+    
+        assert first == second == "name: 小明; role: lively"
+    
+    def test_compact_values(self):
+        """Test floats, datetimes, booleans, nested dicts and long lists are rendered compactly."""
+        text = serialize_context({
+            "intensity": 0.7500,
+            "event_date": datetime(2025, 10, 1, 8, 30, 15),
+            "is_holiday": True,
+            "holiday": {"name": "国庆节", "days": 7},
+            "activities": ["a", "b", "c", "d", "e", "f", "g", "h"]
+        })
+    
+        assert "intensity: 0.75" in text
+        assert "event_date: 2025-10-01 08:30" in text
+        assert "is_holiday: 是" in text
+        assert "holiday: {days: 7, name: 国庆节}" in text
+        assert "activities: [a, b, c, d, e, f, …+2]" in text
+    
+    def test_truncates_long_and_low_value_fields(self):
+        """Test long strings are cut and low-value keys sort last with a tighter limit."""
+        serializer = ContextSerializer(ContextBudgetConfig(max_value_chars=10, max_low_value_chars=5))
+    
+        text = serializer.serialize({"timestamp": "2025-10-01 08:30:15", "description": "很" * 30, "mood": "好"})
+    
+        assert text == f"description: {'很' * 9}…; mood: 好; timestamp: 2025…"
+        assert serializer.get_stats()["fields_truncated"] == 2
+    
+    def test_empty_dict_uses_placeholder(self):
+        """Test an empty section renders as the placeholder rather than {}."""
+        assert serialize_context({}) == "无"
+    
+    def test_disabled_keeps_repr(self):
+        """Test disabling compaction restores the previous dict interpolation."""
+        assert serialize_context({"a": 1}, ContextBudgetConfig(enabled=False)) == "{'a': 1}"
+
+
+class TestSectionBudget:
+    """Test the token budget shared by all sections."""
+    
+    def test_largest_section_is_trimmed_first(self):
+        """Test fields are dropped from the end of the biggest section until the budget fits."""
+        serializer = ContextSerializer(ContextBudgetConfig(max_context_tokens=40))
+        big = {f"field_{i}": "节日" * 5 for i in range(10)}
+        small = {"mood": "开心"}
+    
+        rendered, tokens = serializer.serialize_sections({"social_context": big, "emotional_context": small})
+    
+        assert rendered["emotional_context"] == "mood: 开心"
+        assert rendered["social_context"].startswith("field_0: ")
+        assert "field_9" not in rendered["social_context"]
+        assert tokens <= 40
+        assert serializer.get_stats()["fields_dropped"] > 0
+    
+    def test_rendering_is_deterministic(self):
+        """Test equal contexts always render to identical text."""
+        serializer = ContextSerializer(ContextBudgetConfig(max_context_tokens=30))
+        context = {"b": "乙" * 10, "a": "甲" * 10, "c": ["x", "y"]}
+    
+        first = serializer.serialize_sections({"user_profile": context})
+        second = serializer.serialize_sections({"user_profile": dict(reversed(list(context.items())))})
+    
+        assert first == second
+
+
+class _PromptAgent(BaseSubAgent):
+
+    async def process_event(self, event_data):
+        pass
+    
+    def get_supported_events(self):
+        return []
+
+
+class TestPromptPreparation:
+    """Test compact context in sub-agent prompts."""
+    
+    def test_prompt_uses_compact_context_and_reports_tokens(self):
+        """Test context dicts are not interpolated as reprs and the prompt size is recorded."""
+        prompt_config = PromptConfig(
+            agent_type="holiday_agent",
+            system_prompt="系统",
+            user_prompt_template="用户信息：{user_profile}\n节假日背景：{social_context}\n时间背景：{temporal_context}",
+            output_format={},
+            validation_rules={}
+        )
+        llm_manager = Mock()
+        llm_manager.performance_settings = {"context_budget": {"max_value_chars": 20}}
+        agent = _PromptAgent("holiday_agent", prompt_config, llm_manager, Mock())
+        event_data = EventData(
+            event_id="e1", event_type="holiday", event_name="approaching_holiday",
+            timestamp=datetime(2025, 9, 28, 9, 0), user_id=1, context_data={}, metadata={}
+        )
+        context_data = DiaryContextData(
+            user_profile={"role": "clam", "name": "小明", "hobbies": None},
+            event_details={},
+            environmental_context={},
+            social_context={"holiday_type": "national", "typical_activities": ["旅游", "聚会"]},
+            emotional_context={},
+            temporal_context={}
+        )
+    
+        prompt = agent._prepare_user_prompt(event_data, context_data)
+    
+        assert "用户信息：name: 小明; role: clam" in prompt
+        assert "typical_activities: [旅游, 聚会]" in prompt
+        assert "时间背景：无" in prompt
+        assert "{'" not in prompt and "None" not in prompt
+        assert agent.context_serializer.config.max_value_chars == 20
+        assert agent.last_prompt_tokens > 0
@@ -12,7 +12,7 @@ from datetime import datetime, timedelta
 from diary_agent.utils.error_handler import (
     ErrorHandler, ErrorCategory, ErrorContext, CircuitBreaker, 
     CircuitBreakerConfig, CircuitBreakerState, CircuitBreakerOpenError,
-    with_error_handling, global_error_handler
+    CircuitBreakerTimeoutError, with_error_handling, global_error_handler
 )
 from diary_agent.utils.graceful_degradation import (
     GracefulDegradationManager, ServiceHealth, HealthCheck, FallbackConfig,
@@ -148,6 +148,103 @@ class TestCircuitBreaker:
         result = self.circuit_breaker.call(success_func)
         assert result == "success"
         assert self.circuit_breaker.state == CircuitBreakerState.CLOSED
+    
+    def test_call_rejects_coroutine_functions(self):
+        """Test sync call refuses coroutine functions instead of faking success."""
+        async def async_func():
+            return "never awaited"
+        
+        with pytest.raises(TypeError):
+            self.circuit_breaker.call(async_func)
+        assert self.circuit_breaker.failure_count == 0
+
+
+@pytest.mark.asyncio
+class TestAsyncCircuitBreaker:
+    """Test cases for CircuitBreaker.call_async."""
+    
+    async def test_awaited_failures_open_circuit(self):
+        """Test failures raised while awaiting are counted."""
+        breaker = CircuitBreaker("async_failures", CircuitBreakerConfig(failure_threshold=2))
+        
+        async def failing():
+            await asyncio.sleep(0)
+            raise ValueError("provider down")
+        
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await breaker.call_async(failing)
+        
+        assert breaker.state == CircuitBreakerState.OPEN
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call_async(failing)
+        assert breaker.get_state()["rejected_calls"] == 1
+    
+    async def test_timeout_is_enforced(self):
+        """Test slow calls are cut off and counted as failures."""
+        breaker = CircuitBreaker("async_timeout", CircuitBreakerConfig(failure_threshold=1, timeout=0.05))
+        
+        async def slow():
+            await asyncio.sleep(5)
+        
+        with pytest.raises(CircuitBreakerTimeoutError):
+            await breaker.call_async(slow)
+        
+        state = breaker.get_state()
+        assert state["state"] == "open"
+        assert state["timeouts"] == 1
+    
+    async def test_half_open_limits_probes(self):
+        """Test only half_open_max_calls probes run while half-open."""
+        breaker = CircuitBreaker("async_probe", CircuitBreakerConfig(
+            failure_threshold=1, recovery_timeout=1, success_threshold=1, half_open_max_calls=1
+        ))
+        breaker.state = CircuitBreakerState.OPEN
+        breaker.last_failure_time = datetime.now() - timedelta(seconds=2)
+        release = asyncio.Event()
+        
+        async def probe():
+            await release.wait()
+            return "ok"
+        
+        probe_task = asyncio.create_task(breaker.call_async(probe))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitBreakerState.HALF_OPEN
+        
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call_async(probe)
+        
+        release.set()
+        assert await probe_task == "ok"
+        assert breaker.state == CircuitBreakerState.CLOSED
+    
+    async def test_failed_probe_reopens(self):
+        """Test a failing half-open probe reopens the circuit."""
+        breaker = CircuitBreaker("async_reopen", CircuitBreakerConfig(
+            failure_threshold=3, recovery_timeout=1, success_threshold=2
+        ))
+        breaker.state = CircuitBreakerState.OPEN
+        breaker.last_failure_time = datetime.now() - timedelta(seconds=2)
+        
+        async def failing():
+            raise ValueError("still down")
+        
+        with pytest.raises(ValueError):
+            await breaker.call_async(failing)
+        assert breaker.state == CircuitBreakerState.OPEN
+    
+    async def test_cancellation_is_not_a_failure(self):
+        """Test a cancelled call frees its probe slot without counting."""
+        breaker = CircuitBreaker("async_cancel", CircuitBreakerConfig(failure_threshold=1))
+        
+        task = asyncio.create_task(breaker.call_async(asyncio.sleep, 5))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        assert breaker.state == CircuitBreakerState.CLOSED
+        assert breaker.failure_count == 0
 
 
 class TestGracefulDegradation:
@@ -0,0 +1,75 @@
+"""
+Unit tests for the precompiled event catalogue.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from diary_agent.utils.event_catalog import EventCatalog, match_detail_template
+
+
+RULES = {
+    "friends_function": [
+        ("liked_single", {"friend_action": "单次点赞", "interaction_count": 1}),
+        ("disliked", {"friend_action": "不喜欢", "interaction_type": "dislike"})
+    ]
+}
+EVENTS = {
+    "friends_function": ["liked_single", "disliked_3_to_5", "made_new_friend"],
+    "weather_events": ["favorite_weather"]
+}
+MAPPINGS = {"friends_function": "friends_agent"}
+
+
+class TestEventCatalog:
+    """Test compiling and looking up catalogued events."""
+
+    def test_compile_precomputes_templates_and_agents(self):
+        """Test each event gets the first matching rule and its category's agent."""
+        catalog = EventCatalog.compile(EVENTS, RULES, MAPPINGS)
+
+        assert len(catalog) == 4
+        assert catalog.get("friends_function", "liked_single").detail_template == {
+            "friend_action": "单次点赞", "interaction_count": 1
+        }
+        assert catalog.get("friends_function", "disliked_3_to_5").detail_template["interaction_type"] == "dislike"
+        assert catalog.get("friends_function", "made_new_friend").detail_template == {}
+        assert catalog.get("friends_function", "liked_single").agent_type == "friends_agent"
+        assert catalog.get("weather_events", "favorite_weather").agent_type == "interactive_agent"
+
+    def test_validation_is_exact(self):
+        """Test membership needs both the category and the name to match."""
+        catalog = EventCatalog.compile(EVENTS, RULES, MAPPINGS)
+
+        assert ("friends_function", "liked_single") in catalog
+        assert ("weather_events", "liked_single") not in catalog
+        assert catalog.get("friends_function", "liked") is None
+        assert catalog.categories() == EVENTS
+
+    def test_details_are_fresh_per_request(self):
+        """Test details carry the base fields and callers cannot mutate the template."""
+        spec = EventCatalog.compile(EVENTS, RULES, MAPPINGS).get("friends_function", "liked_single")
+
+        details = spec.details(datetime(2024, 1, 1))
+        details["interaction_count"] = 99
+
+        assert details["event_category"] == "friends_function"
+        assert details["event_name"] == "liked_single"
+        assert details["timestamp"] == "2024-01-01T00:00:00"
+        assert details["auto_generated"] is True
+        assert spec.details()["interaction_count"] == 1
+
+    def test_match_detail_template_unknown_category(self):
+        """Test events without rules get an empty template."""
+        assert match_detail_template(RULES, "unknown", "liked_single") == {}
+
+    def test_compiles_shipped_catalogue(self):
+        """Test the shipped events.json compiles with every event indexed."""
+        events_file = os.path.join(os.path.dirname(__file__), "..", "events.json")
+        with open(events_file, "r", encoding="utf-8") as f:
+            events_config = json.load(f)
+
+        catalog = EventCatalog.compile(events_config, {}, {})
+
+        assert len(catalog) == sum(len(names) for names in events_config.values())
@@ -0,0 +1,200 @@
+"""
+Unit tests for hedged LLM requests.
+"""
+
+import pytest
+import asyncio
+import json
+import tempfile
+import os
+from unittest.mock import patch
+
+from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
+from diary_agent.utils.hedging import HedgeBudget
+from diary_agent.utils.provider_router import ProviderRouter, RoutingConfig
+
+
+class TestHedgeBudget:
+    """Test the rolling hedge budget."""
+    
+    def test_budget_caps_hedge_rate(self):
+        """Test at most max_rate of recent requests are hedged."""
+        budget = HedgeBudget(max_rate=0.1, window=100)
+        granted = 0
+        for _ in range(100):
+            if budget.try_acquire(budget.record_request()):
+                granted += 1
+    
+        assert granted == 10
+        assert budget.get_stats()["hedges_denied"] == 100 - granted
+    
+    def test_zero_rate_never_hedges(self):
+        """Test a zero budget denies every hedge, including the first."""
+        budget = HedgeBudget(max_rate=0.0, window=10)
+    
+        assert not any(budget.try_acquire(budget.record_request()) for _ in range(10))
+        assert budget.get_stats()["hedges_fired"] == 0
+    
+    def test_budget_stops_at_exact_ceiling(self):
+        """Test hedges fire up to, but never beyond, max_rate of the window."""
+        budget = HedgeBudget(max_rate=0.05, window=20)
+        granted = sum(budget.try_acquire(budget.record_request()) for _ in range(20))
+    
+        assert granted == 1
+        assert budget.get_stats()["recent_hedge_rate"] == 0.05
+    
+    def test_hedge_marks_its_own_request(self):
+        """Test a hedge for an earlier request does not mark a later, concurrent one."""
+        budget = HedgeBudget(max_rate=1.0, window=3)
+        first = budget.record_request()
+        second = budget.record_request()
+    
+        assert budget.try_acquire(first)
+        assert first.hedged and not second.hedged
+        assert budget.get_stats()["recent_hedge_rate"] == 0.5
+    
+        # Once the hedged request leaves the window it no longer counts
+        for _ in range(3):
+            budget.record_request()
+        assert budget.get_stats()["recent_hedge_rate"] == 0.0
+
+
+class TestLatencyPercentile:
+    """Test percentile queries on the router's latency window."""
+    
+    def test_percentile_requires_min_samples(self):
+        """Test no percentile is reported until enough samples exist."""
+        router = ProviderRouter(RoutingConfig())
+        for latency in (1.0, 2.0):
+            router.record("qwen", latency, success=True)
+    
+        assert router.latency_percentile("qwen", 0.95, min_samples=3) is None
+        assert router.latency_percentile("qwen", 0.5, min_samples=2) in (1.0, 2.0)
+    
+    def test_percentile_ignores_failures(self):
+        """Test failed attempts do not enter the latency window."""
+        router = ProviderRouter(RoutingConfig())
+        for latency in range(1, 11):
+            router.record("qwen", float(latency), success=True)
+        router.record("qwen", 100.0, success=False)
+    
+        assert router.latency_percentile("qwen", 1.0) == 10.0
+        assert router.latency_percentile("qwen", 0.0) == 1.0
+
+
+class TestLLMConfigManagerHedging:
+    """Test hedging in the failover loop."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a configuration with hedging enabled and a short delay."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                },
+                "deepseek": {
+                    "provider_name": "deepseek",
+                    "api_endpoint": "https://api.deepseek.com/v1/chat",
+                    "api_key": "test-deepseek-key",
+                    "model_name": "deepseek-chat"
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "adaptive_routing": {"exploration_rate": 0.0},
+                    "single_flight": {"enabled": False},
+                    "hedging": {
+                        "enabled": True,
+                        "fallback_delay": 0.05,
+                        "min_delay": 0.05,
+                        "max_hedge_rate": 1.0
+                    }
+                }
+            }
+        }
+    
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+    
+        yield temp_path
+    
+        os.unlink(temp_path)
+    
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self, temp_config_file):
+        """Test the backup answers first and the slow primary is cancelled."""
+        manager = LLMConfigManager(temp_config_file)
+        cancelled = []
+    
+        async def generate(config, prompt, system_prompt):
+            if config.provider_name == "qwen":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append("qwen")
+                    raise
+                return "slow"
+            return "fast"
+    
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            result = await manager.generate_text_with_failover("Test prompt")
+    
+        assert result == "fast"
+        assert cancelled == ["qwen"]
+        assert manager.get_current_provider().provider_name == "deepseek"
+        assert manager.get_provider_status()["hedging"]["hedges_fired"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, temp_config_file):
+        """Test no backup request is sent when the primary is quick."""
+        manager = LLMConfigManager(temp_config_file)
+        used = []
+    
+        async def generate(config, prompt, system_prompt):
+            used.append(config.provider_name)
+            return "Generated content"
+    
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            result = await manager.generate_text_with_failover("Test prompt")
+    
+        assert result == "Generated content"
+        assert used == ["qwen"]
+        assert manager.hedge_budget.hedges_fired == 0
+    
+    @pytest.mark.asyncio
+    async def test_hedge_can_be_disabled_per_call(self, temp_config_file):
+        """Test hedge=False waits for the primary."""
+        manager = LLMConfigManager(temp_config_file)
+        used = []
+    
+        async def generate(config, prompt, system_prompt):
+            used.append(config.provider_name)
+            await asyncio.sleep(0.1)
+            return config.provider_name
+    
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            result = await manager.generate_text_with_failover("Test prompt", hedge=False)
+    
+        assert result == "qwen"
+        assert used == ["qwen"]
+    
+    @pytest.mark.asyncio
+    async def test_both_hedged_providers_fail(self, temp_config_file):
+        """Test failures from both sides of a hedge surface as a provider error."""
+        manager = LLMConfigManager(temp_config_file)
+    
+        async def generate(config, prompt, system_prompt):
+            await asyncio.sleep(0.1)
+            raise LLMProviderError(f"{config.provider_name} down")
+    
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            with pytest.raises(LLMProviderError):
+                await manager.generate_text_with_failover("Test prompt")
+    
+        assert manager.router.stats["qwen"].failures == 1
+        assert manager.router.stats["deepseek"].failures == 1
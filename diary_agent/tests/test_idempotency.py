@@ -0,0 +1,171 @@
+"""
+Unit tests for idempotency keys.
+"""
+
+import pytest
+import asyncio
+
+from diary_agent.utils.idempotency import (
+    IdempotencyConfig, IdempotencyConflict, IdempotencyStore, StoredResponse
+)
+
+
+def _counting(body, status=200, delay=0.0):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return StoredResponse({"n": len(calls), **body}, status)
+    return compute, calls
+
+
+class TestIdempotencyStore:
+    """Test attaching to in-flight calls and replaying stored responses."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_computation(self):
+        """Test retries arriving mid-flight attach to the running computation."""
+        store = IdempotencyStore()
+        compute, calls = _counting({"title": "晴天"}, delay=0.02)
+
+        results = await asyncio.gather(*[store.execute("key", "fp", compute) for _ in range(3)])
+
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results] == [False, True, True]
+        assert all(response.body == {"n": 1, "title": "晴天"} for response, _ in results)
+
+    @pytest.mark.asyncio
+    async def test_completed_response_is_replayed_until_ttl(self):
+        """Test a later retry gets the stored response and an expired key computes again."""
+        store = IdempotencyStore(IdempotencyConfig(ttl_seconds=0.05))
+        compute, calls = _counting({})
+
+        await store.execute("key", "fp", compute)
+        response, replayed = await store.execute("key", "fp", compute)
+        assert replayed and response.body["n"] == 1
+
+        await asyncio.sleep(0.06)
+        response, replayed = await store.execute("key", "fp", compute)
+        assert not replayed and response.body["n"] == 2
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_not_stored(self):
+        """Test 5xx responses and exceptions let the retry compute again."""
+        store = IdempotencyStore()
+        failing, calls = _counting({}, status=500)
+
+        await store.execute("key", "fp", failing)
+        await store.execute("key", "fp", failing)
+        assert len(calls) == 2
+
+        async def boom():
+            raise RuntimeError("provider down")
+
+        with pytest.raises(RuntimeError):
+            await store.execute("other", "fp", boom)
+        response, replayed = await store.execute("other", "fp", _counting({})[0])
+        assert not replayed
+
+    @pytest.mark.asyncio
+    async def test_key_reuse_with_different_body(self):
+        """Test reusing a key for a different request is rejected."""
+        store = IdempotencyStore()
+        await store.execute("key", "fp-a", _counting({})[0])
+
+        with pytest.raises(IdempotencyConflict):
+            await store.execute("key", "fp-b", _counting({})[0])
+
+    @pytest.mark.asyncio
+    async def test_caller_cancellation_keeps_computation(self):
+        """Test a disconnected client does not cancel the work its retry attaches to."""
+        store = IdempotencyStore()
+        compute, calls = _counting({}, delay=0.05)
+
+        first = asyncio.ensure_future(store.execute("key", "fp", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        response, replayed = await store.execute("key", "fp", compute)
+
+        assert replayed and len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_entries(self):
+        """Test completed entries beyond max_entries are evicted oldest first."""
+        store = IdempotencyStore(IdempotencyConfig(max_entries=2))
+        for key in ("a", "b", "c"):
+            await store.execute(key, "fp", _counting({})[0])
+
+        assert store.get_stats()["entries"] == 2
+        _, replayed = await store.execute("a", "fp", _counting({})[0])
+        assert not replayed
+
+    @pytest.mark.asyncio
+    async def test_disk_backend_shares_keys_between_stores(self, tmp_path):
+        """Test a second store (another worker process) replays and waits on the shared file."""
+        config = IdempotencyConfig(disk_path=str(tmp_path / "keys.sqlite3"), poll_interval=0.01)
+        first, second = IdempotencyStore(config), IdempotencyStore(config)
+        compute, calls = _counting({"title": "晴天"}, delay=0.05)
+
+        (a, replayed_a), (b, replayed_b) = await asyncio.gather(
+            first.execute("key", "fp", compute),
+            second.execute("key", "fp", compute)
+        )
+
+        assert len(calls) == 1
+        assert a.body == b.body
+        assert not replayed_a and replayed_b
+        first.close()
+        second.close()
+
+    def test_fingerprint_ignores_key_order(self):
+        """Test equal JSON bodies hash the same regardless of key order."""
+        assert IdempotencyStore.fingerprint("/p", {"a": 1, "b": 2}) == IdempotencyStore.fingerprint("/p", {"b": 2, "a": 1})
+        assert IdempotencyStore.fingerprint("/p", {"a": 1}) != IdempotencyStore.fingerprint("/q", {"a": 1})
+
+
+class TestIdempotencyScope:
+    """Test which requests are deduplicated."""
+
+    @pytest.mark.asyncio
+    async def test_identical_bodies_without_key_are_not_deduplicated(self):
+        """Test two clients sending the same body without a key both get fresh results."""
+        store = IdempotencyStore()
+        compute, calls = _counting({})
+        body = {"event_category": "weather_events", "event_name": "favorite_weather"}
+
+        results = []
+        for client_id in ("device-a", "device-b"):
+            scope = store.scope("/api/diary/process", body, None, client_id)
+            if scope is None:
+                results.append(await compute())
+            else:
+                results.append((await store.execute(scope[0], scope[1], compute, scope[2]))[0])
+
+        assert store.scope("/api/diary/process", body) is None
+        assert len(calls) == 2
+        assert [response.body["n"] for response in results] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_fallback_is_scoped_per_client(self):
+        """Test the opt-in fallback dedupes one client's retries but never across clients."""
+        store = IdempotencyStore(IdempotencyConfig(fingerprint_ttl_seconds=30))
+        compute, calls = _counting({})
+        body = {"event_category": "weather_events", "event_name": "favorite_weather"}
+
+        replays = []
+        for client_id in ("device-a", "device-a", "device-b"):
+            scoped_key, fingerprint, ttl = store.scope("/api/diary/process", body, None, client_id)
+            replays.append((await store.execute(scoped_key, fingerprint, compute, ttl))[1])
+
+        assert replays == [False, True, False]
+        assert len(calls) == 2
+        assert store.scope("/api/diary/process", body, None, None) is None
+
+    def test_explicit_key_scope(self):
+        """Test an Idempotency-Key scopes by key and keeps the default TTL."""
+        store = IdempotencyStore()
+        scoped_key, fingerprint, ttl = store.scope("/api/diary/process", {"a": 1}, "key-1")
+
+        assert ttl is None
+        assert scoped_key != store.scope("/api/diary/process-custom", {"a": 1}, "key-1")[0]
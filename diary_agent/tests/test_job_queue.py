@@ -0,0 +1,167 @@
+"""
+Unit tests for the durable background job queue.
+"""
+
+import pytest
+import asyncio
+import time
+
+from diary_agent.utils.job_queue import (
+    JobQueue, JobQueueConfig, JobWorkerPool, PermanentJobError, watch_job,
+    QUEUED, RUNNING, SUCCEEDED, DEAD
+)
+
+
+def _queue(tmp_path, **overrides):
+    settings = {"path": str(tmp_path / "jobs.sqlite3"), "retry_backoff": 0.0, "poll_interval": 0.01}
+    settings.update(overrides)
+    return JobQueue(JobQueueConfig.from_dict(settings))
+
+
+class TestJobQueue:
+    """Test persistence, leasing, retries and dead-lettering."""
+
+    def test_jobs_survive_reopening(self, tmp_path):
+        """Test a queued job is still there after the queue is reopened."""
+        queue = _queue(tmp_path)
+        job = queue.enqueue("diary_event", {"event_name": "celebration"})
+        queue.close()
+
+        reopened = _queue(tmp_path)
+        stored = reopened.get(job.job_id)
+
+        assert stored.status == QUEUED
+        assert stored.payload == {"event_name": "celebration"}
+        reopened.close()
+
+    def test_claim_leases_each_job_once(self, tmp_path):
+        """Test a claimed job is not handed out again while its lease is live."""
+        queue = _queue(tmp_path)
+        job = queue.enqueue("diary_event", {})
+
+        claimed = queue.claim()
+
+        assert claimed.job_id == job.job_id
+        assert claimed.status == RUNNING and claimed.attempts == 1
+        assert queue.claim() is None
+
+        assert queue.complete(claimed, {"title": "晴天"})
+        assert queue.get(job.job_id).status == SUCCEEDED
+        assert queue.get(job.job_id).result == {"title": "晴天"}
+
+    def test_expired_lease_is_redelivered_and_fenced(self, tmp_path):
+        """Test an expired lease makes the job claimable and the stale worker cannot complete it."""
+        queue = _queue(tmp_path, visibility_timeout=0.0)
+        queue.enqueue("diary_event", {})
+
+        stale = queue.claim()
+        fresh = queue.claim()
+
+        assert fresh.job_id == stale.job_id and fresh.attempts == 2
+        assert not queue.complete(stale, "late")
+        assert queue.complete(fresh, "ok")
+
+    def test_retry_with_backoff_then_dead_letter(self, tmp_path):
+        """Test failures are retried after the backoff and dead-lettered after max_attempts."""
+        queue = _queue(tmp_path, max_attempts=2, retry_backoff=60.0)
+        job = queue.enqueue("diary_event", {})
+
+        assert queue.fail(queue.claim(), "provider down") == QUEUED
+        retried = queue.get(job.job_id)
+        assert retried.available_at > time.time() + 30
+        assert queue.claim() is None
+
+        queue._conn.execute("UPDATE jobs SET available_at = 0")
+        assert queue.fail(queue.claim(), "provider down") == DEAD
+        assert queue.stats()[DEAD] == 1
+        assert [dead.job_id for dead in queue.list_jobs(DEAD)] == [job.job_id]
+
+        assert queue.retry_dead(job.job_id)
+        assert queue.claim().attempts == 1
+
+    def test_retry_delay_is_capped(self):
+        """Test backoff doubles per attempt up to the maximum."""
+        config = JobQueueConfig(retry_backoff=2.0, retry_backoff_max=5.0)
+
+        assert [config.retry_delay(n) for n in (1, 2, 3)] == [2.0, 4.0, 5.0]
+
+    def test_purge_only_removes_old_finished_jobs(self, tmp_path):
+        """Test purge keeps queued jobs and recent results."""
+        queue = _queue(tmp_path)
+        done = queue.enqueue("diary_event", {})
+        pending = queue.enqueue("diary_event", {})
+        queue.complete(queue.claim(), None)
+
+        assert queue.purge(older_than=3600) == 0
+        assert queue.purge(older_than=-1) == 1
+        assert queue.get(done.job_id) is None
+        assert queue.get(pending.job_id).status == QUEUED
+
+
+class TestJobWorkerPool:
+    """Test running jobs through handlers."""
+
+    @pytest.mark.asyncio
+    async def test_handler_outcomes(self, tmp_path):
+        """Test success, retryable failure and permanent failure."""
+        queue = _queue(tmp_path, max_attempts=3)
+        calls = []
+
+        async def flaky(payload):
+            calls.append(payload)
+            if len(calls) == 1:
+                raise RuntimeError("timeout from provider")
+            return {"ok": True}
+
+        async def broken(payload):
+            raise PermanentJobError("invalid event")
+
+        pool = JobWorkerPool(queue, {"flaky": flaky, "broken": broken})
+        flaky_job = queue.enqueue("flaky", {"n": 1})
+        broken_job = queue.enqueue("broken", {})
+        unknown_job = queue.enqueue("unknown", {})
+
+        while await pool.run_once():
+            pass
+
+        assert queue.get(flaky_job.job_id).status == SUCCEEDED
+        assert queue.get(flaky_job.job_id).attempts == 2
+        assert queue.get(broken_job.job_id).status == DEAD
+        assert queue.get(broken_job.job_id).attempts == 1
+        assert queue.get(unknown_job.job_id).status == DEAD
+
+    @pytest.mark.asyncio
+    async def test_attempt_time_limit(self, tmp_path):
+        """Test a handler running past the visibility timeout fails the attempt."""
+        queue = _queue(tmp_path, visibility_timeout=0.05, max_attempts=1)
+
+        async def slow(payload):
+            await asyncio.sleep(1)
+
+        job = queue.enqueue("slow", {})
+        await JobWorkerPool(queue, {"slow": slow}).run_once()
+
+        stored = queue.get(job.job_id)
+        assert stored.status == DEAD
+        assert stored.error == "attempt timed out"
+
+    @pytest.mark.asyncio
+    async def test_workers_and_watch(self, tmp_path):
+        """Test started workers drain the queue and watch_job follows a job to completion."""
+        queue = _queue(tmp_path, workers=2)
+
+        async def handler(payload):
+            await asyncio.sleep(0.01)
+            return payload["n"] * 2
+
+        pool = JobWorkerPool(queue, {"double": handler})
+        job = queue.enqueue("double", {"n": 21})
+        await pool.start()
+        try:
+            states = [state async for state in watch_job(queue, job.job_id, poll_interval=0.005, timeout=5)]
+        finally:
+            await pool.stop()
+
+        assert states[-1].status == SUCCEEDED
+        assert states[-1].result == 42
+        assert not pool.running
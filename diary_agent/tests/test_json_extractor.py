@@ -0,0 +1,122 @@
+"""
+Tests for the tolerant JSON extractor used on LLM replies.
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from diary_agent.agents.base_agent import BaseSubAgent
+from diary_agent.utils.data_models import PromptConfig
+from diary_agent.utils.json_extractor import (
+    extract_json_object, object_spans, repair_json, strip_wrappers, validate_schema
+)
+from diary_agent.utils.structured_output import schema_from_output_format
+
+
+DIARY_SCHEMA = schema_from_output_format({"title": "string", "content": "string", "emotion_tags": "list"})
+DIARY = '{"title": "晴天", "content": "出去玩", "emotion_tags": ["开心快乐"]}'
+
+
+class TestExtraction:
+    """Test objects are found in the reply shapes models produce."""
+    
+    def test_clean_and_wrapped_replies(self):
+        """Test clean JSON, code fences, chatty text and <think> blocks give the same object."""
+        expected = {"title": "晴天", "content": "出去玩", "emotion_tags": ["开心快乐"]}
+    
+        assert extract_json_object(DIARY) == expected
+        assert extract_json_object("```json\n" + DIARY + "\n```") == expected
+        assert extract_json_object("好的，日记如下：\n" + DIARY + "\n希望你喜欢") == expected
+        assert extract_json_object('<think>先写 {"title": "草稿"}</think>\n' + DIARY, DIARY_SCHEMA) == expected
+    
+    def test_object_inside_unterminated_think(self):
+        """Test an answer left inside an unfinished reasoning block is still found."""
+        text = '<think>\n用户想要描述\n{"description": "被轻轻摸了摸头"}'
+    
+        assert extract_json_object(text, {"required": ["description"]}) == {"description": "被轻轻摸了摸头"}
+    
+    def test_braces_and_quotes_inside_strings(self):
+        """Test braces and escaped quotes inside values do not end the object early."""
+        text = '前言 {"content": "用了 {花括号} 和 \\"引号\\"", "n": 1} 后记 {"x": 2}'
+    
+        assert [text[start:end] for start, end in object_spans(text)] == [
+            '{"content": "用了 {花括号} 和 \\"引号\\"", "n": 1}', '{"x": 2}'
+        ]
+        assert extract_json_object(text) == {"content": '用了 {花括号} 和 "引号"', "n": 1}
+    
+    def test_repairs(self):
+        """Test trailing commas and smart-quote delimiters are repaired, quotes inside text are kept."""
+        text = '{“title”: “晴天”, "content": "他说“你好”。", "emotion_tags": ["开心快乐",],}'
+    
+        assert repair_json('{"a": [1, 2,],}') == '{"a": [1, 2]}'
+        assert extract_json_object(text, DIARY_SCHEMA) == {
+            "title": "晴天", "content": "他说“你好”。", "emotion_tags": ["开心快乐"]
+        }
+    
+    def test_schema_selects_matching_object(self):
+        """Test objects that do not match the schema are skipped."""
+        text = '{"title": "只有标题"} {"title": "完整", "content": "正文", "emotion_tags": ["平静"]}'
+    
+        assert extract_json_object(text, DIARY_SCHEMA)["title"] == "完整"
+        assert extract_json_object('{"title": "只有标题"}', DIARY_SCHEMA) is None
+    
+    def test_no_object(self):
+        """Test replies without an object give None."""
+        assert extract_json_object("") is None
+        assert extract_json_object("今天天气很好") is None
+        assert extract_json_object("[1, 2]") is None
+        assert extract_json_object('{"title": ') is None
+        assert strip_wrappers("<think>a</think>b<think>c</think>d") == "bd"
+
+
+class TestValidateSchema:
+    """Test the JSON schema subset check."""
+    
+    def test_required_and_types(self):
+        """Test missing fields and wrong property types are reported."""
+        errors = validate_schema({"title": 1, "emotion_tags": "开心"}, DIARY_SCHEMA)
+    
+        assert errors == [
+            "missing field: content",
+            "wrong type for title: expected string",
+            "wrong type for emotion_tags: expected array"
+        ]
+        assert validate_schema({"n": True}, {"properties": {"n": {"type": "integer"}}}) == [
+            "wrong type for n: expected integer"
+        ]
+        assert validate_schema({"anything": 1}, None) == []
+
+
+class _ParseAgent(BaseSubAgent):
+
+    async def process_event(self, event_data):
+        pass
+    
+    def get_supported_events(self):
+        return []
+
+
+@pytest.mark.asyncio
+class TestAgentParsing:
+    """Test sub-agents parse replies through the shared extractor."""
+    
+    def _agent(self):
+        prompt_config = PromptConfig(
+            agent_type="weather_agent", system_prompt="系统", user_prompt_template="{event_name}",
+            output_format={"title": "string", "content": "string"}, validation_rules={}
+        )
+        return _ParseAgent("weather_agent", prompt_config, Mock(), Mock())
+    
+    async def test_repaired_reply_is_used(self):
+        """Test a fenced reply with a trailing comma parses without falling back to line parsing."""
+        reply = '```json\n{"title": "晴天", "content": "出去玩", "emotion_tags": ["开心快乐"],}\n```'
+    
+        content = await self._agent()._parse_generated_content(reply)
+    
+        assert content == {"title": "晴天", "content": "出去玩", "emotion_tags": ["开心快乐"]}
+    
+    async def test_partial_object_accepted_by_fallback(self):
+        """Test an object with a title and content but no tags is still used."""
+        content = await self._agent()._parse_generated_content('日记：{"title": "雨天", "content": "在家看书"}')
+    
+        assert content == {"title": "雨天", "content": "在家看书"}
@@ -0,0 +1,163 @@
+"""
+Unit tests for the LLM response cache.
+"""
+
+import pytest
+import json
+import tempfile
+import os
+from unittest.mock import patch
+
+from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
+from diary_agent.utils.llm_cache import LLMResponseCache, ResponseCacheConfig
+
+
+class TestLLMResponseCache:
+    """Test the in-memory and persistent cache behaviour."""
+    
+    def test_make_key_is_content_addressed(self):
+        """Test identical requests share a key and any field change alters it."""
+        key = LLMResponseCache.make_key("zhipu", "glm-4", 0.7, "system", "prompt")
+        
+        assert key == LLMResponseCache.make_key("zhipu", "glm-4", 0.7, "system", "prompt")
+        assert key != LLMResponseCache.make_key("qwen", "glm-4", 0.7, "system", "prompt")
+        assert key != LLMResponseCache.make_key("zhipu", "glm-4", 0.9, "system", "prompt")
+        assert key != LLMResponseCache.make_key("zhipu", "glm-4", 0.7, "", "prompt")
+    
+    def test_make_key_covers_output_options(self):
+        """Test response format, schema and max_tokens each alter the key."""
+        base = ("zhipu", "glm-4", 0.7, "system", "prompt")
+        key = LLMResponseCache.make_key(*base, "json", '{"type":"object"}', 500)
+    
+        assert key == LLMResponseCache.make_key(*base, "json", '{"type":"object"}', 500)
+        assert key != LLMResponseCache.make_key(*base, None, '{"type":"object"}', 500)
+        assert key != LLMResponseCache.make_key(*base, "json", None, 500)
+        assert key != LLMResponseCache.make_key(*base, "json", '{"type":"object"}', 1000)
+    
+    def test_hit_and_miss_counters(self):
+        """Test hits and misses are counted."""
+        cache = LLMResponseCache(ResponseCacheConfig(enabled=True))
+        
+        assert cache.get("missing") is None
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        
+        stats = cache.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = LLMResponseCache(ResponseCacheConfig(enabled=True, max_entries=2))
+        
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")  # "b" becomes least recently used
+        cache.set("c", "3")
+        
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+        assert cache.get_cache_stats()["evictions"] == 1
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after their TTL."""
+        cache = LLMResponseCache(ResponseCacheConfig(enabled=True))
+        
+        with patch("diary_agent.utils.llm_cache.time.time", return_value=1000.0):
+            cache.set("key", "value", ttl_seconds=10)
+        with patch("diary_agent.utils.llm_cache.time.time", return_value=1005.0):
+            assert cache.get("key") == "value"
+        with patch("diary_agent.utils.llm_cache.time.time", return_value=1011.0):
+            assert cache.get("key") is None
+    
+    def test_disk_backend_survives_restart(self):
+        """Test persisted entries are visible to a new cache instance."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = ResponseCacheConfig(enabled=True, disk_path=os.path.join(temp_dir, "cache.db"))
+            
+            cache = LLMResponseCache(config)
+            cache.set("key", "persisted value")
+            cache.close()
+            
+            restarted = LLMResponseCache(config)
+            assert restarted.get("key") == "persisted value"
+            assert restarted.get_cache_stats()["disk_hits"] == 1
+            restarted.close()
+
+
+class TestLLMConfigManagerCaching:
+    """Test cache integration in generate_text_with_failover."""
+    
+    @pytest.fixture
+    def cached_config_file(self):
+        """Create a configuration with the response cache enabled."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "response_cache": {"enabled": True, "max_entries": 10, "ttl_seconds": 60}
+                }
+            }
+        }
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+        
+        yield temp_path
+        
+        os.unlink(temp_path)
+    
+    @pytest.mark.asyncio
+    async def test_repeated_prompt_served_from_cache(self, cached_config_file):
+        """Test an identical request does not reach the provider twice."""
+        manager = LLMConfigManager(cached_config_file)
+        
+        with patch.object(manager, '_generate_with_retry') as mock_generate:
+            mock_generate.return_value = "Generated content"
+            
+            first = await manager.generate_text_with_failover("Test prompt", "System")
+            second = await manager.generate_text_with_failover("Test prompt", "System")
+            
+            assert first == second == "Generated content"
+            mock_generate.assert_called_once()
+        
+        assert manager.get_provider_status()["response_cache"]["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_use_cache_false_bypasses_cache(self, cached_config_file):
+        """Test callers can opt out of caching."""
+        manager = LLMConfigManager(cached_config_file)
+        
+        with patch.object(manager, '_generate_with_retry') as mock_generate:
+            mock_generate.side_effect = ["First", "Second"]
+            
+            await manager.generate_text_with_failover("Test prompt", use_cache=False)
+            result = await manager.generate_text_with_failover("Test prompt", use_cache=False)
+            
+            assert result == "Second"
+            assert mock_generate.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self, cached_config_file):
+        """Test a failed generation leaves no cache entry behind."""
+        manager = LLMConfigManager(cached_config_file)
+        
+        with patch.object(manager, '_generate_with_retry') as mock_generate:
+            mock_generate.side_effect = [LLMProviderError("Provider failed"), "Recovered"]
+            
+            with pytest.raises(LLMProviderError):
+                await manager.generate_text_with_failover("Test prompt")
+            result = await manager.generate_text_with_failover("Test prompt")
+            
+            assert result == "Recovered"
+            assert mock_generate.call_count == 2
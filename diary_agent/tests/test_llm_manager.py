@@ -18,6 +18,7 @@ from diary_agent.core.llm_manager import (
     LLMProviderError,
     LLMConfigurationError
 )
+from diary_agent.utils.error_handler import ErrorHandler, CircuitBreakerConfig, CircuitBreakerOpenError
 from diary_agent.utils.data_models import LLMConfig
 
 
@@ -398,6 +399,67 @@ class TestLLMConfigManager:
                 # Should have attempted retries
                 assert mock_sleep.call_count == 1  # One retry delay
     
+    @pytest.mark.asyncio
+    async def test_open_circuit_breaker_stops_retries(self, temp_config_file):
+        """Test failures open the provider's breaker and later calls are shed without retrying."""
+        manager = LLMConfigManager(temp_config_file)
+        manager.error_handler = ErrorHandler()
+        manager.error_handler.register_circuit_breaker(
+            "llm_qwen", CircuitBreakerConfig(failure_threshold=2, recovery_timeout=60)
+        )
+        config = manager.get_provider_config("qwen")
+        
+        with patch.object(manager, '_create_api_client') as mock_create_client:
+            mock_client = AsyncMock()
+            mock_client.generate_text.side_effect = LLMProviderError("API error")
+            mock_create_client.return_value.__aenter__.return_value = mock_client
+            
+            with patch('asyncio.sleep'):
+                with pytest.raises(CircuitBreakerOpenError):
+                    await manager._generate_with_retry(config, "Test prompt", "System prompt")
+                
+                # Two real attempts opened the breaker; the third was rejected
+                assert mock_client.generate_text.call_count == 2
+                
+                with pytest.raises(CircuitBreakerOpenError):
+                    await manager._generate_with_retry(config, "Test prompt", "System prompt")
+                assert mock_client.generate_text.call_count == 2
+        
+        breaker_state = manager.get_provider_status()["circuit_breakers"]["qwen"]
+        assert breaker_state["state"] == "open"
+        assert breaker_state["rejected_calls"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_api_clients_share_pooled_session(self, temp_config_file):
+        """Test API clients reuse the manager's pooled session until shutdown."""
+        manager = LLMConfigManager(temp_config_file)
+        config = manager.get_provider_config("qwen")
+        
+        async with manager._create_api_client(config) as first_client:
+            first_session = first_client.session
+        async with manager._create_api_client(config) as second_client:
+            second_session = second_client.session
+        
+        assert first_session is second_session
+        assert not first_session.closed
+        assert manager.get_provider_status()["connection_pool"]["open_sessions"] == 1
+        
+        await manager.close()
+        assert first_session.closed
+    
+    @pytest.mark.asyncio
+    async def test_pooled_sessions_are_per_provider(self, temp_config_file):
+        """Test each provider gets its own pooled session."""
+        manager = LLMConfigManager(temp_config_file)
+        
+        async with manager._create_api_client(manager.get_provider_config("qwen")) as qwen_client:
+            qwen_session = qwen_client.session
+        async with manager._create_api_client(manager.get_provider_config("deepseek")) as deepseek_client:
+            deepseek_session = deepseek_client.session
+        
+        assert qwen_session is not deepseek_session
+        await manager.close()
+    
     def test_get_provider_status(self, temp_config_file):
         """Test getting provider status information."""
         manager = LLMConfigManager(temp_config_file)
@@ -0,0 +1,96 @@
+"""
+Tests for the local LLM stand-in server, driven through LLMConfigManager.
+"""
+
+import pytest
+import json
+import random
+
+from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
+from diary_agent.utils.llm_stub_server import LLMStubServer, StubServerConfig
+
+
+@pytest.mark.asyncio
+class TestLLMStubServer:
+    """Test the stand-in speaks each protocol the clients use."""
+    
+    @pytest.mark.parametrize("api_format", ["openai", "ollama_generate", "ollama_chat"])
+    async def test_generates_canned_diary(self, write_config, api_format):
+        """Test a full request returns one of the canned JSON diaries."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0)) as server:
+            config_path = write_config({"stub": server.provider_config("stub", api_format)})
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            await manager.close()
+    
+        diary = json.loads(text)
+        assert set(diary) == {"title", "content", "emotion_tags"}
+        assert server.stats["completed"] == 1
+    
+    @pytest.mark.parametrize("api_format", ["openai", "ollama_chat"])
+    async def test_streaming_stops_early(self, write_config, api_format):
+        """Test streamed JSON generation disconnects once the diary object is complete."""
+        stub_config = StubServerConfig(latency_mean=0.0, trailing_text="\n以上就是今天的日记。" * 5)
+        async with LLMStubServer(stub_config) as server:
+            config_path = write_config(
+                {"stub": server.provider_config("stub", api_format)},
+                {"streaming": {"enabled": True}}
+            )
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover(
+                "写一篇日记", use_cache=False, response_format="json"
+            )
+            await manager.close()
+    
+        assert "以上" not in text
+        assert json.loads(text)["title"]
+        assert server.stats["streamed"] == 1
+        assert server.stats["completed"] == 0
+    
+    async def test_injected_rate_limits_fail_over(self, write_config):
+        """Test 429s from one provider are absorbed by failover to another."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0, rate_limit_rate=1.0)) as limited, \
+                LLMStubServer(StubServerConfig(latency_mean=0.0)) as healthy:
+            config_path = write_config({
+                "stub_limited": limited.provider_config("stub_limited", priority=1),
+                "stub_healthy": healthy.provider_config("stub_healthy", priority=2)
+            }, {"adaptive_routing": {"enabled": False}})
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            await manager.close()
+    
+        assert json.loads(text)
+        assert limited.stats["rate_limited"] == 1
+        assert healthy.stats["completed"] == 1
+    
+    async def test_errors_surface_as_provider_errors(self, write_config):
+        """Test injected 500s reach callers as LLMProviderError."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0, error_rate=1.0)) as server:
+            config_path = write_config({"stub_broken": server.provider_config("stub_broken")})
+            manager = LLMConfigManager(config_path)
+            with pytest.raises(LLMProviderError):
+                await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            await manager.close()
+    
+        assert server.stats["errors_injected"] == 1
+
+
+class TestStubServerConfig:
+    """Test deterministic latency sampling."""
+    
+    def test_same_seed_same_latencies(self):
+        """Test latencies are reproducible for a seed."""
+        server = LLMStubServer(StubServerConfig(latency_distribution="lognormal", latency_mean=0.2, latency_stddev=0.1))
+        first = [server._sample_latency(random.Random(f"0:{i}")) for i in range(5)]
+        second = [server._sample_latency(random.Random(f"0:{i}")) for i in range(5)]
+    
+        assert first == second
+        assert all(value >= 0 for value in first)
+    
+    def test_lognormal_mean_is_preserved(self):
+        """Test the lognormal distribution is centred on latency_mean."""
+        server = LLMStubServer(StubServerConfig(latency_distribution="lognormal", latency_mean=0.2, latency_stddev=0.1))
+        rng = random.Random(1)
+        samples = [server._sample_latency(rng) for _ in range(5000)]
+    
+        assert sum(samples) / len(samples) == pytest.approx(0.2, rel=0.05)
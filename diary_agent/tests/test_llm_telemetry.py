@@ -0,0 +1,157 @@
+"""
+Tests for LLM token accounting and per-attempt latency telemetry.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
+from diary_agent.utils.llm_stub_server import LLMStubServer, StubServerConfig
+from diary_agent.utils.llm_telemetry import Histogram, LLMTelemetry, AttemptMetrics, TelemetryConfig
+from diary_agent.utils.response_adapters import get_adapter
+from diary_agent.utils.token_estimator import estimate_tokens
+
+
+class TestHistogram:
+    """Test bucket counting and percentiles."""
+    
+    def test_percentiles_use_bucket_bounds(self):
+        """Test percentiles report the upper bound of their bucket."""
+        histogram = Histogram([0.1, 1.0, 10.0])
+        for value in [0.05, 0.05, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 5.0, 50.0]:
+            histogram.observe(value)
+    
+        stats = histogram.to_dict()
+    
+        assert stats["count"] == 10
+        assert stats["p50"] == 1.0
+        assert stats["p95"] == 50.0
+        assert stats["buckets"] == {"<=0.1": 2, "<=1": 6, "<=10": 1, "+Inf": 1}
+    
+    def test_empty_histogram(self):
+        """Test an empty histogram has no percentiles."""
+        assert Histogram([1.0]).to_dict()["p50"] is None
+
+
+class TestUsageParsing:
+    """Test token usage extraction per protocol."""
+    
+    def test_openai_usage(self):
+        """Test usage.prompt_tokens/completion_tokens are read."""
+        usage = get_adapter("openai").parse_usage({"usage": {"prompt_tokens": 40, "completion_tokens": 60}})
+    
+        assert usage == {"prompt_tokens": 40, "completion_tokens": 60}
+        assert get_adapter("openai").parse_usage({"choices": []}) is None
+    
+    def test_ollama_usage(self):
+        """Test eval_count and eval_duration (nanoseconds) are read from the final response."""
+        usage = get_adapter("ollama_chat").parse_usage(
+            {"done": True, "prompt_eval_count": 30, "eval_count": 80, "eval_duration": 2_000_000_000}
+        )
+    
+        assert usage == {"prompt_tokens": 30, "completion_tokens": 80, "generation_seconds": 2.0}
+        assert get_adapter("ollama_generate").parse_usage({"response": "x", "done": False}) is None
+    
+    def test_dashscope_usage(self):
+        """Test DashScope input/output token names are mapped."""
+        usage = get_adapter("dashscope").parse_usage({"usage": {"input_tokens": 5, "output_tokens": 7}})
+    
+        assert usage == {"prompt_tokens": 5, "completion_tokens": 7}
+    
+    def test_max_tokens_hits_are_counted(self):
+        """Test completions that exhausted max_tokens are flagged."""
+        telemetry = LLMTelemetry(TelemetryConfig())
+        metrics = AttemptMetrics(total=1.0)
+        metrics.apply_usage({"prompt_tokens": 10, "completion_tokens": 150})
+    
+        telemetry.record("qwen", metrics, max_tokens=150)
+    
+        stats = telemetry.get_provider_stats("qwen")
+        assert stats["hit_max_tokens"] == 1
+        assert stats["estimated_usage"] == 0
+
+
+@pytest.mark.asyncio
+class TestManagerTelemetry:
+    """Test telemetry collected from real HTTP calls to the stand-in server."""
+    
+    async def test_reported_usage_and_timings(self, write_config):
+        """Test provider usage, connect/TTFB/total and connection reuse are recorded."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.01)) as server:
+            config_path = write_config({"stub": server.provider_config("stub")})
+            manager = LLMConfigManager(config_path)
+            with patch('diary_agent.core.llm_manager.diary_logger') as mock_logger:
+                text = await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+                await manager.generate_text_with_failover("再写一篇日记", use_cache=False)
+            await manager.close()
+    
+        stats = manager.get_provider_telemetry("stub")
+        assert stats["successes"] == 2
+        assert stats["estimated_usage"] == 0
+        assert stats["connections_reused"] == 1
+        assert stats["latency"]["connect"]["count"] == 1
+        assert stats["latency"]["ttfb"]["count"] == 2
+        assert stats["latency"]["total"]["mean"] >= 0.01
+    
+        logged = mock_logger.log_llm_api_call.call_args_list[0].kwargs
+        assert logged["status"] == "success"
+        assert logged["tokens_used"] > estimate_tokens(text)
+        assert logged["response_time"] < 5
+    
+    async def test_ollama_generation_rate(self, write_config):
+        """Test Ollama eval_count/eval_duration give a tokens-per-second figure."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0)) as server:
+            config_path = write_config({"stub": server.provider_config("stub", "ollama_generate")})
+            manager = LLMConfigManager(config_path)
+            await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            await manager.close()
+    
+        stats = manager.get_provider_status()["telemetry"]["providers"]["stub"]
+        assert stats["estimated_usage"] == 0
+        assert stats["tokens_per_second"] > 0
+    
+    async def test_early_stopped_stream_records_reported_usage(self, write_config):
+        """Test an early-stopped stream is drained to the final usage chunk."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0, trailing_text="多余" * 20)) as server:
+            config_path = write_config({"stub": server.provider_config("stub")}, {"streaming": {"enabled": True}})
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover(
+                "写一篇日记", use_cache=False, response_format="json"
+            )
+            await manager.close()
+    
+        stats = manager.get_provider_telemetry("stub")
+        assert stats["estimated_usage"] == 0
+        # The provider counts the trailing text it generated before the stream closed
+        assert stats["completion_tokens_total"] == estimate_tokens(text + "多余" * 20)
+        assert manager.get_provider_status()["streaming"]["early_stops"] == 1
+    
+    async def test_streams_without_usage_are_estimated(self, write_config):
+        """Test an early-stopped stream that is not drained falls back to estimated token counts."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0, trailing_text="多余" * 20)) as server:
+            config_path = write_config({"stub": server.provider_config("stub")},
+                                        {"streaming": {"enabled": True, "usage_drain_timeout": 0}})
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover(
+                "写一篇日记", use_cache=False, response_format="json"
+            )
+            await manager.close()
+    
+        stats = manager.get_provider_telemetry("stub")
+        assert stats["estimated_usage"] == 1
+        assert stats["completion_tokens_total"] == estimate_tokens(text)
+        assert stats["latency"]["total"]["count"] == 1
+    
+    async def test_failed_attempts_are_counted(self, write_config):
+        """Test every failed HTTP attempt is counted without latency/token samples."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0, error_rate=1.0)) as server:
+            config_path = write_config({"stub_failing": server.provider_config("stub_failing", retry_attempts=1)})
+            manager = LLMConfigManager(config_path)
+            with pytest.raises(LLMProviderError):
+                await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            await manager.close()
+    
+        stats = manager.get_provider_telemetry("stub_failing")
+        assert stats["failures"] == 1
+        assert stats["successes"] == 0
+        assert stats["latency"]["total"]["count"] == 0
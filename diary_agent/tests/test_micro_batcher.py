@@ -0,0 +1,218 @@
+"""
+Unit tests for micro-batching of LLM requests.
+"""
+
+import pytest
+import asyncio
+import json
+import tempfile
+import os
+from unittest.mock import AsyncMock, patch
+
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.micro_batcher import (
+    MicroBatcher, BatchingConfig, batch_requests, pack_prompts, split_batch_response
+)
+
+
+class TestBatchPacking:
+    """Test packing prompts and splitting packed responses."""
+    
+    def test_pack_numbers_each_prompt(self):
+        """Test every prompt appears under its index."""
+        packed = pack_prompts(["写晴天日记", "写雨天日记"])
+    
+        assert "2个" in packed
+        assert "### 请求 0\n写晴天日记" in packed
+        assert "### 请求 1\n写雨天日记" in packed
+    
+    def test_split_matches_ids(self):
+        """Test items are returned in request order regardless of array order."""
+        text = '```json\n[{"id": 1, "title": "雨天"}, {"id": 0, "title": "晴天"}]\n```'
+    
+        results = split_batch_response(text, 2)
+    
+        assert [json.loads(result) for result in results] == [{"title": "晴天"}, {"title": "雨天"}]
+    
+    def test_split_drops_invalid_items(self):
+        """Test missing, duplicate, out-of-range and empty items become None."""
+        text = '[{"id": 0, "title": "a"}, {"id": 0, "title": "b"}, {"id": 5, "title": "c"}, {"id": 2}, "x"]'
+    
+        results = split_batch_response(text, 3)
+    
+        assert json.loads(results[0]) == {"title": "a"}
+        assert results[1:] == [None, None]
+    
+    def test_split_drops_schema_invalid_items(self):
+        """Test an item that fails the response schema becomes None so it is re-issued alone."""
+        schema = {
+            "type": "object",
+            "required": ["title", "content"],
+            "properties": {"title": {"type": "string"}, "content": {"type": "string"}}
+        }
+        text = '[{"id": 0, "title": "晴天", "content": "散步"}, {"id": 1, "title": "雨天"}, {"id": 2, "title": 3, "content": "x"}]'
+    
+        results = split_batch_response(text, 3, schema)
+    
+        assert json.loads(results[0]) == {"title": "晴天", "content": "散步"}
+        assert results[1:] == [None, None]
+    
+    def test_split_without_array(self):
+        """Test a response without a JSON array yields no items."""
+        assert split_batch_response('{"title": "a"}', 2) == [None, None]
+        assert split_batch_response('[{"id": 0,', 1) == [None]
+
+
+@pytest.mark.asyncio
+class TestMicroBatcher:
+    """Test request collection and flushing."""
+    
+    async def test_concurrent_requests_share_one_batch(self):
+        """Test requests within the window are executed together."""
+        execute = AsyncMock(side_effect=lambda group, prompts: [p.upper() for p in prompts])
+        batcher = MicroBatcher(BatchingConfig(enabled=True, max_wait_ms=10), execute)
+    
+        results = await asyncio.gather(*(batcher.submit("sys", p) for p in ["a", "b", "c"]))
+    
+        assert results == ["A", "B", "C"]
+        execute.assert_awaited_once_with("sys", ["a", "b", "c"])
+        assert batcher.get_stats()["average_batch_size"] == 3
+    
+    async def test_full_batch_flushes_immediately(self):
+        """Test reaching max_batch_size does not wait for the window."""
+        execute = AsyncMock(side_effect=lambda group, prompts: list(prompts))
+        batcher = MicroBatcher(BatchingConfig(enabled=True, max_batch_size=2, max_wait_ms=10000), execute)
+    
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("sys", "a"), batcher.submit("sys", "b")), timeout=1
+        )
+    
+        assert results == ["a", "b"]
+    
+    async def test_groups_are_batched_separately(self):
+        """Test prompts with different groups never share a call."""
+        execute = AsyncMock(side_effect=lambda group, prompts: list(prompts))
+        batcher = MicroBatcher(BatchingConfig(enabled=True, max_wait_ms=10), execute)
+    
+        await asyncio.gather(batcher.submit("x", "a"), batcher.submit("y", "b"), batcher.submit("x", "c"))
+    
+        assert execute.await_count == 1
+        execute.assert_awaited_once_with("x", ["a", "c"])
+    
+    async def test_single_item_and_failures_fall_back(self):
+        """Test a lone item skips execute and a failed batch returns None for all."""
+        execute = AsyncMock(side_effect=RuntimeError("boom"))
+        batcher = MicroBatcher(BatchingConfig(enabled=True, max_wait_ms=10), execute)
+    
+        assert await batcher.submit("sys", "a") is None
+        execute.assert_not_awaited()
+    
+        results = await asyncio.gather(batcher.submit("sys", "a"), batcher.submit("sys", "b"))
+    
+        assert results == [None, None]
+        assert batcher.get_stats()["fallbacks"] == 2
+
+
+class TestLLMConfigManagerBatching:
+    """Test batched generation through the manager."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a configuration with batching enabled."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo",
+                    "max_tokens": 150
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "batching": {"enabled": True, "max_wait_ms": 10}
+                }
+            }
+        }
+    
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+    
+        yield temp_path
+    
+        os.unlink(temp_path)
+    
+    @pytest.mark.asyncio
+    async def test_batched_json_requests_use_one_call(self, temp_config_file):
+        """Test concurrent JSON requests are packed and split per caller."""
+        manager = LLMConfigManager(temp_config_file)
+        packed_response = json.dumps([{"id": i, "title": f"日记{i}"} for i in range(3)], ensure_ascii=False)
+    
+        with patch.object(manager, '_call_provider', AsyncMock(return_value=packed_response)) as mock_call:
+            with batch_requests():
+                results = await asyncio.gather(*(
+                    manager.generate_text_with_failover(f"事件{i}", "系统", response_format="json")
+                    for i in range(3)
+                ))
+    
+        assert [json.loads(result)["title"] for result in results] == ["日记0", "日记1", "日记2"]
+        mock_call.assert_awaited_once()
+        config, prompt, system_prompt = mock_call.await_args.args
+        assert config.max_tokens == 450
+        assert "### 请求 2\n事件2" in prompt
+        assert system_prompt == "系统"
+        assert manager.providers["qwen"].max_tokens == 150
+    
+    @pytest.mark.asyncio
+    async def test_invalid_item_falls_back_to_single_call(self, temp_config_file):
+        """Test an item missing from the packed response is requested on its own."""
+        manager = LLMConfigManager(temp_config_file)
+        responses = ['[{"id": 0, "title": "甲"}]', '{"title": "乙"}']
+    
+        with patch.object(manager, '_call_provider', AsyncMock(side_effect=responses)) as mock_call:
+            results = await asyncio.gather(*(
+                manager.generate_text_with_failover(prompt, response_format="json", batch=True)
+                for prompt in ["事件0", "事件1"]
+            ))
+    
+        assert [json.loads(result)["title"] for result in results] == ["甲", "乙"]
+        assert mock_call.await_count == 2
+        assert mock_call.await_args.args[1] == "事件1"
+        assert manager.get_provider_status()["batching"]["fallbacks"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_schema_invalid_item_falls_back_to_single_call(self, temp_config_file):
+        """Test a batched item that fails the response schema is requested on its own."""
+        manager = LLMConfigManager(temp_config_file)
+        schema = {"type": "object", "required": ["title", "content"],
+                  "properties": {"title": {"type": "string"}, "content": {"type": "string"}}}
+        responses = [
+            '[{"id": 0, "title": "甲", "content": "a"}, {"id": 1, "title": "乙"}]',
+            '{"title": "乙", "content": "b"}'
+        ]
+    
+        with patch.object(manager, '_call_provider', AsyncMock(side_effect=responses)) as mock_call:
+            results = await asyncio.gather(*(
+                manager.generate_text_with_failover(prompt, response_format="json", batch=True,
+                                                    response_schema=schema)
+                for prompt in ["事件0", "事件1"]
+            ))
+    
+        assert [json.loads(result)["content"] for result in results] == ["a", "b"]
+        assert mock_call.await_count == 2
+        assert mock_call.await_args.args[1] == "事件1"
+    
+    @pytest.mark.asyncio
+    async def test_requests_outside_batch_scope_are_not_batched(self, temp_config_file):
+        """Test batching is opt-in per call site."""
+        manager = LLMConfigManager(temp_config_file)
+    
+        with patch.object(manager, '_call_provider', AsyncMock(return_value='{"title": "a"}')) as mock_call:
+            await asyncio.gather(*(
+                manager.generate_text_with_failover(f"事件{i}", response_format="json") for i in range(2)
+            ))
+    
+        assert mock_call.await_count == 2
+        assert manager.micro_batcher.batches == 0
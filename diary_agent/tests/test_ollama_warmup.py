@@ -0,0 +1,123 @@
+"""
+Tests for Ollama model preloading, keep_alive and keep-warm pings.
+"""
+
+import pytest
+import asyncio
+
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.data_models import LLMConfig
+from diary_agent.utils.graceful_degradation import degradation_manager
+from diary_agent.utils.llm_stub_server import LLMStubServer, StubServerConfig
+from diary_agent.utils.ollama_warmup import (
+    OllamaWarmupConfig, is_ollama_provider, ollama_base_url, model_resident
+)
+from diary_agent.utils.response_adapters import get_adapter
+
+
+class TestOllamaHelpers:
+    """Test provider detection, URLs and preload payloads."""
+    
+    def test_detects_ollama_providers(self):
+        """Test detection follows the resolved wire format."""
+        local = LLMConfig(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/generate",
+                          api_key="", model_name="qwen3:4b")
+        cloud = LLMConfig(provider_name="qwen", api_endpoint="https://api.qwen.com/v1/chat",
+                          api_key="key", model_name="qwen-turbo")
+    
+        assert is_ollama_provider(local)
+        assert not is_ollama_provider(cloud)
+        assert ollama_base_url("http://localhost:11434/api/chat") == "http://localhost:11434"
+    
+    def test_keep_alive_in_payloads(self):
+        """Test keep_alive reaches both generation and preload payloads."""
+        config = LLMConfig(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/chat",
+                           api_key="", model_name="qwen3:4b", keep_alive="-1m")
+        adapter = get_adapter("ollama_chat")
+        template = adapter.build_template(config)
+    
+        assert adapter.build_payload(template, "hi", "", stream=False)["keep_alive"] == "-1m"
+        assert adapter.build_preload_payload(template) == {"model": "qwen3:4b", "keep_alive": "-1m", "messages": []}
+        assert get_adapter("openai").build_preload_payload(template) is None
+    
+    def test_unreachable_server_is_not_resident(self):
+        """Test a connection failure reports the model as not loaded."""
+        assert model_resident("http://127.0.0.1:9/api/generate", "qwen3:4b", timeout=0.5) is False
+
+
+@pytest.mark.asyncio
+class TestManagerWarmup:
+    """Test warm-up and keep-warm against the local stand-in server."""
+    
+    async def test_warm_up_preloads_with_default_keep_alive(self, write_config):
+        """Test start() preloads Ollama models and the health check sees them resident."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0)) as server:
+            config_path = write_config({
+                "ollama_local": server.provider_config("ollama_local", "ollama_generate", model_name="qwen3:4b")
+            })
+            manager = LLMConfigManager(config_path)
+            health_check = degradation_manager.health_checks["llm_manager"].check_function
+    
+            assert await asyncio.to_thread(health_check) is False
+    
+            await manager.start()
+    
+            assert server.stats["preloads"] == 1
+            assert server.stats["requests"] == 0
+            assert server.loaded_models == {"qwen3:4b": "30m"}
+            assert await asyncio.to_thread(health_check) is True
+    
+            await manager.generate_text_with_failover("写一篇日记", use_cache=False)
+            assert server.loaded_models["qwen3:4b"] == "30m"
+    
+            status = manager.get_provider_status()["warmup"]
+            assert status["warmups"] == 1
+            assert status["keep_warm_running"] is True
+    
+            await manager.close()
+            assert manager.get_provider_status()["warmup"]["keep_warm_running"] is False
+    
+    async def test_keep_warm_pings_only_while_traffic_expected(self, write_config):
+        """Test pings repeat during traffic and stop after the traffic window."""
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0)) as server:
+            config_path = write_config(
+                {"ollama_local": server.provider_config("ollama_local", "ollama_chat")},
+                {"ollama_warmup": {"warm_up_on_start": False, "keep_warm_interval": 0.02, "traffic_window": 0.1}}
+            )
+            manager = LLMConfigManager(config_path)
+            await manager.start()
+            await asyncio.sleep(0.09)
+            pings_during_traffic = server.stats["preloads"]
+            await asyncio.sleep(0.1)
+            pings_after_window = server.stats["preloads"]
+            await asyncio.sleep(0.1)
+    
+            assert pings_during_traffic >= 2
+            assert server.stats["preloads"] == pings_after_window
+            await manager.close()
+    
+    async def test_cloud_only_config_does_nothing(self, write_config):
+        """Test no keep-warm loop is started without Ollama providers."""
+        config_path = write_config({
+            "qwen": {"provider_name": "qwen", "api_endpoint": "https://api.qwen.com/v1/chat",
+                     "api_key": "key", "model_name": "qwen-turbo"}
+        })
+        manager = LLMConfigManager(config_path)
+        await manager.start()
+    
+        assert manager.warmups == 0
+        assert manager.get_provider_status()["warmup"]["keep_warm_running"] is False
+        assert manager.providers["qwen"].keep_alive is None
+    
+    async def test_disabled_warmup_keeps_provider_keep_alive_unset(self, write_config):
+        """Test the default keep_alive is only applied when warm-up is enabled."""
+        config_path = write_config({
+            "ollama_local": {"provider_name": "ollama_local", "api_endpoint": "http://localhost:11434/api/generate",
+                             "api_key": "", "model_name": "qwen3"}
+        }, {"ollama_warmup": {"enabled": False}})
+        manager = LLMConfigManager(config_path)
+        await manager.start()
+    
+        assert manager.providers["ollama_local"].keep_alive is None
+        assert manager.warmups == 0
+        assert OllamaWarmupConfig.from_dict({"unknown": 1}).enabled is True
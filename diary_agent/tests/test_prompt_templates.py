@@ -0,0 +1,159 @@
+"""
+Tests for precompiled prompt templates and the shared template registry.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import Mock
+
+from diary_agent.agents.base_agent import BaseSubAgent
+from diary_agent.utils.data_models import EventData, DiaryContextData, PromptConfig
+from diary_agent.utils.prompt_templates import (
+    CompiledTemplate, PromptTemplateRegistry, prompt_config_hash, template_registry
+)
+
+
+def _prompt_config(template):
+    return PromptConfig(
+        agent_type="weather_agent",
+        system_prompt="系统",
+        user_prompt_template=template,
+        output_format={},
+        validation_rules={}
+    )
+
+
+class TestCompiledTemplate:
+    """Test parsing, validation and rendering."""
+    
+    def test_render_matches_str_format(self):
+        """Test rendering gives the same text as str.format for ordinary templates."""
+        template = "事件：{event_name}\n时间：{timestamp}\n{{\"title\": \"标题\"}}"
+        values = {"event_name": "sunny", "timestamp": "2025-10-01"}
+    
+        compiled = CompiledTemplate(template)
+    
+        assert compiled.valid
+        assert compiled.fields == ["event_name", "timestamp"]
+        assert compiled.render(values) == template.format(**values)
+    
+    def test_single_brace_json_is_literal(self):
+        """Test a JSON example written with single braces is kept instead of raising KeyError."""
+        compiled = CompiledTemplate('事件：{event_name}\n{"title": "标题", "emotion_tags": ["情感"]}')
+    
+        assert compiled.valid
+        assert compiled.render({"event_name": "rain"}) == '事件：rain\n{"title": "标题", "emotion_tags": ["情感"]}'
+    
+    def test_unknown_placeholder_is_reported(self):
+        """Test unknown variables are flagged at compile time and raise KeyError when rendered."""
+        compiled = CompiledTemplate("{event_name} {mqtt_message}")
+    
+        assert compiled.errors == ["Unknown placeholder: {mqtt_message}"]
+        with pytest.raises(KeyError):
+            compiled.render({"event_name": "x"})
+    
+    def test_unparseable_template(self):
+        """Test a template with an unmatched brace is reported and cannot render."""
+        compiled = CompiledTemplate("{event_name")
+    
+        assert not compiled.valid
+        with pytest.raises(KeyError):
+            compiled.render({"event_name": "x"})
+    
+    def test_item_access_and_format_spec(self):
+        """Test index access and format specs behave like str.format."""
+        compiled = CompiledTemplate("{user_profile[name]} {user_id:04d}")
+    
+        assert compiled.fields == ["user_profile", "user_id"]
+        assert compiled.render({"user_profile": {"name": "小明"}, "user_id": 7}) == "小明 0007"
+
+
+class TestPromptTemplateRegistry:
+    """Test template sharing."""
+    
+    def test_templates_compiled_once(self):
+        """Test equal templates share one compiled object."""
+        registry = PromptTemplateRegistry()
+    
+        first = registry.compile("{event_name}")
+        second = registry.compile("{event_name}")
+    
+        assert first is second
+        assert registry.get_stats()["compilations"] == 1
+        assert registry.get_stats()["hits"] == 1
+    
+    def test_least_recently_used_templates_are_evicted(self):
+        """Test the registry stays bounded."""
+        registry = PromptTemplateRegistry(max_templates=2)
+        registry.compile("a {event_name}")
+        registry.compile("b {event_name}")
+        registry.compile("a {event_name}")
+        registry.compile("c {event_name}")
+    
+        assert registry.get_stats()["templates"] == 2
+        assert registry.compile("a {event_name}") is not None
+        assert registry.get_stats()["compilations"] == 3
+    
+    def test_prompt_config_hash(self):
+        """Test the hash changes with any part of the prompt configuration."""
+        config = _prompt_config("{event_name}")
+    
+        assert prompt_config_hash(config) == prompt_config_hash(_prompt_config("{event_name}"))
+        assert prompt_config_hash(config) != prompt_config_hash(_prompt_config("{event_type}"))
+
+
+class _TemplateAgent(BaseSubAgent):
+
+    async def process_event(self, event_data):
+        pass
+    
+    def get_supported_events(self):
+        return []
+
+
+class TestAgentTemplates:
+    """Test sub-agents render prompts through compiled templates."""
+    
+    @pytest.fixture
+    def event_data(self):
+        return EventData(
+            event_id="e1", event_type="weather", event_name="favorite_weather",
+            timestamp=datetime(2025, 10, 1, 9, 0), user_id=1, context_data={}, metadata={}
+        )
+    
+    @pytest.fixture
+    def context_data(self):
+        return DiaryContextData(
+            user_profile={"name": "小明"}, event_details={}, environmental_context={"weather": "晴"},
+            social_context={}, emotional_context={}, temporal_context={}
+        )
+    
+    def test_agents_share_compiled_template(self, event_data, context_data):
+        """Test agents with the same template reuse one compiled template."""
+        config = _prompt_config('天气：{environmental_context}\n{"title": "标题"}')
+        first = _TemplateAgent("weather_agent", config, Mock(), Mock())
+        second = _TemplateAgent("weather_agent", config, Mock(), Mock())
+    
+        prompt = first._prepare_user_prompt(event_data, context_data)
+    
+        assert first._get_compiled_template() is second._get_compiled_template()
+        assert prompt == '天气：weather: 晴\n{"title": "标题"}'
+    
+    def test_changed_template_is_recompiled(self, event_data, context_data):
+        """Test replacing the prompt config's template takes effect."""
+        agent = _TemplateAgent("weather_agent", _prompt_config("A {event_name}"), Mock(), Mock())
+        agent.prompt_config.user_prompt_template = "B {event_name} {now_date}"
+    
+        prompt = agent._prepare_user_prompt(event_data, context_data)
+    
+        assert prompt.startswith("B favorite_weather ")
+        assert "年" in prompt
+    
+    def test_unknown_placeholder_falls_back(self, event_data, context_data):
+        """Test a template with unknown variables still yields the simple fallback prompt."""
+        agent = _TemplateAgent("weather_agent", _prompt_config("{sensor_data}"), Mock(), Mock())
+    
+        prompt = agent._prepare_user_prompt(event_data, context_data)
+    
+        assert prompt.startswith("Generate a diary entry for event: favorite_weather")
+        assert template_registry.compile("{sensor_data}").errors
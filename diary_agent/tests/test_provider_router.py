@@ -0,0 +1,185 @@
+"""
+Unit tests for latency-aware provider routing.
+"""
+
+import pytest
+import asyncio
+import json
+import random
+import tempfile
+import os
+from unittest.mock import AsyncMock, patch
+
+from diary_agent.core.llm_manager import LLMConfigManager, LLMProviderError
+from diary_agent.utils.provider_router import ProviderRouter, RoutingConfig
+from diary_agent.utils.rate_limiter import ProviderRateLimiter, RateLimitConfig
+
+
+class TestProviderRouter:
+    """Test EWMA tracking and ranking."""
+    
+    def test_unknown_providers_keep_priority_order(self):
+        """Test ties preserve the incoming priority order."""
+        router = ProviderRouter(RoutingConfig(exploration_rate=0.0))
+        
+        assert router.rank(["zhipu", "qwen", "deepseek"]) == ["zhipu", "qwen", "deepseek"]
+    
+    def test_faster_provider_ranked_first(self):
+        """Test the provider with the lowest expected latency leads."""
+        router = ProviderRouter(RoutingConfig(exploration_rate=0.0))
+        router.record("zhipu", 4.0, success=True)
+        router.record("qwen", 1.0, success=True)
+        
+        assert router.rank(["zhipu", "qwen"]) == ["qwen", "zhipu"]
+    
+    def test_errors_increase_expected_completion_time(self):
+        """Test a fast but failing provider loses to a reliable one."""
+        router = ProviderRouter(RoutingConfig(exploration_rate=0.0, ewma_alpha=0.5))
+        for _ in range(4):
+            router.record("flaky", 1.0, success=False)
+            router.record("steady", 2.0, success=True)
+        
+        assert router.expected_completion_time("flaky") > router.expected_completion_time("steady")
+        assert router.rank(["flaky", "steady"]) == ["steady", "flaky"]
+    
+    def test_ewma_smooths_latency(self):
+        """Test the EWMA moves toward new samples by alpha."""
+        router = ProviderRouter(RoutingConfig(ewma_alpha=0.5))
+        router.record("zhipu", 2.0, success=True)
+        router.record("zhipu", 4.0, success=True)
+        
+        assert router.stats["zhipu"].ewma_latency == pytest.approx(3.0)
+    
+    def test_exploration_sends_traffic_to_others(self):
+        """Test a non-best provider is occasionally tried first."""
+        router = ProviderRouter(RoutingConfig(exploration_rate=0.5), rng=random.Random(7))
+        router.record("fast", 0.5, success=True)
+        router.record("slow", 5.0, success=True)
+        
+        leaders = [router.rank(["fast", "slow"])[0] for _ in range(100)]
+        
+        assert 20 < leaders.count("slow") < 80
+        assert router.get_routing_stats()["explorations"] == leaders.count("slow")
+    
+    def test_disabled_router_keeps_order(self):
+        """Test routing can be turned off."""
+        router = ProviderRouter(RoutingConfig(enabled=False))
+        router.record("b", 0.1, success=True)
+        
+        assert router.rank(["a", "b"]) == ["a", "b"]
+
+
+class TestLLMConfigManagerRouting:
+    """Test router integration in the failover loop."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a configuration with exploration disabled."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo",
+                    "capabilities": ["general", "fast"]
+                },
+                "deepseek": {
+                    "provider_name": "deepseek",
+                    "api_endpoint": "https://api.deepseek.com/v1/chat",
+                    "api_key": "test-deepseek-key",
+                    "model_name": "deepseek-chat",
+                    "capabilities": ["general", "coding"]
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "adaptive_routing": {"exploration_rate": 0.0}
+                }
+            }
+        }
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+        
+        yield temp_path
+        
+        os.unlink(temp_path)
+    
+    @pytest.mark.asyncio
+    async def test_requests_prefer_faster_provider(self, temp_config_file):
+        """Test observed latency overrides static priority."""
+        manager = LLMConfigManager(temp_config_file)
+        manager.router.record("qwen", 8.0, success=True)
+        manager.router.record("deepseek", 1.0, success=True)
+        
+        used = []
+        
+        async def generate(config, prompt, system_prompt):
+            used.append(config.provider_name)
+            return "Generated content"
+        
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            await manager.generate_text_with_failover("Test prompt", use_cache=False)
+        
+        assert used == ["deepseek"]
+        assert manager.get_current_provider().provider_name == "deepseek"
+    
+    @pytest.mark.asyncio
+    async def test_failure_does_not_rotate_global_provider(self, temp_config_file):
+        """Test a failed request does not change routing for other callers."""
+        manager = LLMConfigManager(temp_config_file)
+        
+        with patch.object(manager, '_generate_with_retry', side_effect=LLMProviderError("down")):
+            with pytest.raises(LLMProviderError):
+                await manager.generate_text_with_failover("Test prompt", use_cache=False)
+        
+        assert manager.current_provider_index == 0
+        assert manager.router.stats["qwen"].failures == 1
+        assert manager.router.stats["deepseek"].failures == 1
+    
+    @pytest.mark.asyncio
+    async def test_capability_filters_candidates(self, temp_config_file):
+        """Test only providers with the requested capability are used."""
+        manager = LLMConfigManager(temp_config_file)
+        used = []
+        
+        async def generate(config, prompt, system_prompt):
+            used.append(config.provider_name)
+            return "Generated content"
+        
+        with patch.object(manager, '_generate_with_retry', side_effect=generate):
+            await manager.generate_text_with_failover("Test prompt", use_cache=False, capability="coding")
+        
+        assert used == ["deepseek"]
+    
+    @pytest.mark.asyncio
+    async def test_local_rate_limit_rejection_is_not_a_provider_failure(self, temp_config_file):
+        """Test a full local queue fails over without marking the provider unhealthy."""
+        manager = LLMConfigManager(temp_config_file)
+        limiter = ProviderRateLimiter("qwen", RateLimitConfig(max_concurrent=1, max_queue_wait=0.01))
+        manager.rate_limiters["qwen"] = limiter
+        await limiter.acquire()
+        
+        with patch.object(manager, '_call_provider', AsyncMock(return_value="Generated content")):
+            result = await manager.generate_text_with_failover("Test prompt", use_cache=False)
+        limiter.release()
+        
+        assert result == "Generated content"
+        assert "qwen" not in manager.router.stats
+        assert manager.router.stats["deepseek"].failures == 0
+    
+    @pytest.mark.asyncio
+    async def test_queue_time_is_not_provider_latency(self, temp_config_file):
+        """Test time spent waiting for rate-limiter admission is left out of the recorded latency."""
+        manager = LLMConfigManager(temp_config_file)
+        limiter = ProviderRateLimiter("qwen", RateLimitConfig(max_concurrent=1))
+        manager.rate_limiters["qwen"] = limiter
+        await limiter.acquire()
+        asyncio.get_running_loop().call_later(0.2, limiter.release)
+        
+        with patch.object(manager, '_call_provider', AsyncMock(return_value="Generated content")):
+            await manager.generate_text_with_failover("Test prompt", use_cache=False)
+        
+        assert manager.router.stats["qwen"].ewma_latency < 0.1
@@ -0,0 +1,172 @@
+"""
+Unit tests for per-provider rate limiting.
+"""
+
+import pytest
+import asyncio
+import json
+import tempfile
+import os
+import time
+
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.rate_limiter import (
+    ProviderRateLimiter,
+    RateLimitConfig,
+    RateLimitExceededError
+)
+from diary_agent.utils.token_estimator import estimate_tokens
+
+
+class TestProviderRateLimiter:
+    """Test admission control behaviour."""
+    
+    @pytest.mark.asyncio
+    async def test_max_concurrent_is_enforced(self):
+        """Test no more than max_concurrent requests run at once."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(max_concurrent=2))
+        running = 0
+        peak = 0
+        
+        async def call():
+            nonlocal running, peak
+            async with limiter.limit():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+        
+        await asyncio.gather(*[call() for _ in range(6)])
+        
+        assert peak == 2
+        stats = limiter.get_stats()
+        assert stats["admitted"] == 6
+        assert stats["in_flight"] == 0
+        assert stats["queued"] > 0
+    
+    @pytest.mark.asyncio
+    async def test_release_wakes_queued_request(self):
+        """Test a queued request is admitted as soon as a slot is released, not on a poll tick."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(max_concurrent=1))
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        
+        released_at = time.monotonic()
+        limiter.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        
+        assert time.monotonic() - released_at < 0.02
+        assert limiter.get_stats()["in_flight"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_queue_wait_is_bounded(self):
+        """Test a request that cannot be admitted in time is rejected."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(max_concurrent=1, max_queue_wait=0.1))
+        
+        await limiter.acquire()
+        with pytest.raises(RateLimitExceededError):
+            await limiter.acquire()
+        limiter.release()
+        
+        assert limiter.get_stats()["rejected"] == 1
+        assert limiter.get_stats()["waiting"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_immediately(self):
+        """Test the queue size bound."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(max_concurrent=1, max_queue_size=1))
+        
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        
+        with pytest.raises(RateLimitExceededError, match="queue is full"):
+            await limiter.acquire()
+        
+        limiter.release()
+        await waiter
+        limiter.release()
+    
+    @pytest.mark.asyncio
+    async def test_requests_per_second_throttles(self):
+        """Test the request bucket spaces out a burst."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(requests_per_second=20))
+        
+        start = time.monotonic()
+        for _ in range(25):
+            async with limiter.limit():
+                pass
+        elapsed = time.monotonic() - start
+        
+        # Bucket holds 20; the remaining 5 need ~0.25s of refill
+        assert elapsed >= 0.2
+    
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_throttles(self):
+        """Test the token bucket blocks once the budget is spent."""
+        limiter = ProviderRateLimiter("test", RateLimitConfig(tokens_per_minute=600, max_queue_wait=0.2))
+        
+        await limiter.acquire(600)
+        limiter.release()
+        
+        with pytest.raises(RateLimitExceededError):
+            await limiter.acquire(600)
+
+
+class TestTokenEstimation:
+    """Test the token estimator used for rate budgets."""
+    
+    def test_chinese_characters_count_individually(self):
+        assert estimate_tokens("今天天气很好") == 6
+    
+    def test_english_words(self):
+        assert estimate_tokens("hello world") == 4
+    
+    def test_empty_text(self):
+        assert estimate_tokens("") == 0
+
+
+class TestLLMConfigManagerRateLimits:
+    """Test rate limiter configuration in the manager."""
+    
+    def test_rate_limits_read_from_performance_settings(self):
+        """Test per-provider settings override the defaults."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                },
+                "ollama_qwen3": {
+                    "provider_name": "ollama_qwen3",
+                    "api_endpoint": "http://localhost:11434/api/generate",
+                    "api_key": "not-required",
+                    "model_name": "qwen3:4b"
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "rate_limits": {
+                        "default": {"max_concurrent": 8, "requests_per_second": 5},
+                        "ollama_qwen3": {"max_concurrent": 2}
+                    }
+                }
+            }
+        }
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+        
+        try:
+            manager = LLMConfigManager(temp_path)
+            
+            assert manager.rate_limiters["qwen"].config.max_concurrent == 8
+            assert manager.rate_limiters["ollama_qwen3"].config.max_concurrent == 2
+            assert manager.rate_limiters["ollama_qwen3"].config.requests_per_second == 5
+            assert "ollama_qwen3" in manager.get_provider_status()["rate_limits"]
+        finally:
+            os.unlink(temp_path)
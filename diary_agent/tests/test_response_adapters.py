@@ -0,0 +1,197 @@
+"""
+Unit tests for the unified chat client and provider response adapters.
+"""
+
+import pytest
+import json
+import tempfile
+import os
+from unittest.mock import AsyncMock, patch
+
+from diary_agent.core.llm_manager import (
+    LLMConfigManager, ChatAPIClient, OllamaAPIClient, QwenAPIClient, LLMConfigurationError
+)
+from diary_agent.utils import fast_json
+from diary_agent.utils.data_models import LLMConfig
+from diary_agent.utils.response_adapters import (
+    get_adapter, resolve_api_format, OllamaChatAdapter, DashScopeAdapter
+)
+
+
+def _config(**overrides):
+    values = {
+        "provider_name": "qwen",
+        "api_endpoint": "https://api.qwen.com/v1/chat",
+        "api_key": "key",
+        "model_name": "qwen-turbo"
+    }
+    values.update(overrides)
+    return LLMConfig(**values)
+
+
+class TestResolveApiFormat:
+    """Test wire-format inference."""
+    
+    def test_known_cloud_providers_use_openai(self):
+        """Test existing cloud providers keep the chat-completions format."""
+        assert resolve_api_format(_config()) == "openai"
+        assert resolve_api_format(_config(provider_name="zhipu")) == "openai"
+    
+    def test_ollama_endpoint_selects_protocol(self):
+        """Test Ollama uses /api/generate unless the endpoint is /api/chat."""
+        generate = _config(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/generate")
+        chat = _config(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/chat")
+    
+        assert resolve_api_format(generate) == "ollama_generate"
+        assert resolve_api_format(chat) == "ollama_chat"
+    
+    def test_explicit_format_wins(self):
+        """Test api_format from config overrides inference."""
+        assert resolve_api_format(_config(provider_name="vllm_local", api_format="openai")) == "openai"
+        assert resolve_api_format(_config(provider_name="unknown")) is None
+
+
+class TestAdapters:
+    """Test payload building and response parsing per protocol."""
+    
+    def test_openai_payload_reuses_skeleton(self):
+        """Test the skeleton is copied, not mutated, per request."""
+        adapter = get_adapter("openai")
+        template = adapter.build_template(_config(temperature=0.3))
+    
+        payload = adapter.build_payload(template, "写日记", "你是助手", stream=True)
+    
+        assert payload["messages"] == [
+            {"role": "system", "content": "你是助手"},
+            {"role": "user", "content": "写日记"}
+        ]
+        assert payload["temperature"] == 0.3
+        assert payload["stream"] is True
+        assert "messages" not in template.skeleton
+        assert template.headers["Authorization"] == "Bearer key"
+    
+    def test_ollama_chat_parses_message(self):
+        """Test /api/chat responses and stream events."""
+        adapter = OllamaChatAdapter()
+        template = adapter.build_template(_config(provider_name="ollama_qwen3"))
+    
+        payload = adapter.build_payload(template, "hi", "", stream=False)
+    
+        assert payload["messages"] == [{"role": "user", "content": "hi"}]
+        assert payload["options"]["num_predict"] == 150
+        assert "Authorization" not in template.headers
+        assert adapter.parse_response({"message": {"content": " ok "}}) == "ok"
+        assert adapter.parse_stream_event({"message": {"content": "x"}, "done": True}) == ("x", True)
+    
+    def test_dashscope_native_shape(self):
+        """Test DashScope input/parameters/output mapping."""
+        adapter = DashScopeAdapter()
+        template = adapter.build_template(_config())
+    
+        payload = adapter.build_payload(template, "hi", "sys", stream=True)
+    
+        assert payload["input"]["messages"][0] == {"role": "system", "content": "sys"}
+        assert payload["parameters"]["incremental_output"] is True
+        assert "incremental_output" not in template.skeleton["parameters"]
+        assert template.stream_headers["X-DashScope-SSE"] == "enable"
+        assert adapter.parse_response({"output": {"choices": [{"message": {"content": "a"}}]}}) == "a"
+        assert adapter.parse_response({"output": {"text": "b"}}) == "b"
+
+
+class TestFastJson:
+    """Test the optional fast JSON backend."""
+    
+    def test_round_trip(self):
+        """Test both str and bytes input decode."""
+        text = fast_json.dumps({"title": "晴天"})
+    
+        assert fast_json.loads(text) == {"title": "晴天"}
+        assert fast_json.loads(text.encode("utf-8")) == {"title": "晴天"}
+    
+    def test_stdlib_fallback_keeps_unicode(self):
+        """Test the fallback does not escape Chinese text."""
+        with patch.object(fast_json, "orjson", None):
+            assert fast_json.dumps({"title": "晴天"}) == '{"title":"晴天"}'
+            assert fast_json.loads('{"a": 1}') == {"a": 1}
+
+
+class TestChatAPIClient:
+    """Test the unified client and its creation from config."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a configuration with a config-only OpenAI-compatible provider."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                },
+                "vllm_local": {
+                    "provider_name": "vllm_local",
+                    "api_endpoint": "http://localhost:8000/v1/chat/completions",
+                    "api_key": "none",
+                    "model_name": "Qwen2.5-7B-Instruct",
+                    "api_format": "openai"
+                }
+            }
+        }
+    
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+    
+        yield temp_path
+    
+        os.unlink(temp_path)
+    
+    def test_config_only_provider(self, temp_config_file):
+        """Test a provider with api_format needs no dedicated client class."""
+        manager = LLMConfigManager(temp_config_file)
+    
+        client = manager._create_api_client(manager.get_provider_config("vllm_local"))
+    
+        assert type(client) is ChatAPIClient
+        assert client.adapter is get_adapter("openai")
+        assert isinstance(manager._create_api_client(manager.get_provider_config("qwen")), QwenAPIClient)
+    
+    def test_unknown_api_format_rejected(self, temp_config_file):
+        """Test an unregistered api_format is a configuration error."""
+        manager = LLMConfigManager(temp_config_file)
+    
+        with pytest.raises(LLMConfigurationError, match="Unsupported api_format"):
+            manager._create_api_client(_config(provider_name="custom", api_format="soap"))
+    
+    def test_request_template_is_cached(self, temp_config_file):
+        """Test headers and skeleton are built once and rebuilt on config change."""
+        manager = LLMConfigManager(temp_config_file)
+        config = manager.get_provider_config("qwen")
+    
+        first = manager._create_api_client(config).template
+        assert manager._create_api_client(config).template is first
+    
+        config.temperature = 0.1
+        rebuilt = manager._create_api_client(config).template
+        assert rebuilt is not first
+        assert rebuilt.skeleton["temperature"] == 0.1
+    
+    @pytest.mark.asyncio
+    async def test_ollama_chat_generation(self):
+        """Test the Ollama client speaks /api/chat when configured for it."""
+        config = _config(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/chat")
+    
+        with patch('aiohttp.ClientSession.post') as mock_post:
+            mock_resp = AsyncMock()
+            mock_resp.status = 200
+            mock_resp.json = AsyncMock(return_value={"message": {"content": "你好"}, "done": True})
+            mock_post.return_value.__aenter__.return_value = mock_resp
+    
+            async with OllamaAPIClient(config) as client:
+                result = await client.generate_text("hi", "sys")
+    
+            assert result == "你好"
+            sent = mock_post.call_args.kwargs["json"]
+            assert sent["stream"] is False
+            assert sent["messages"][-1] == {"role": "user", "content": "hi"}
@@ -0,0 +1,87 @@
+"""
+Unit tests for incremental NDJSON/SSE response bodies.
+"""
+
+import asyncio
+import json
+
+from diary_agent.utils.response_stream import format_record, iterate_async, stream_records, wants_sse
+
+
+class TestFormatting:
+    """Test record serialization and format negotiation."""
+
+    def test_ndjson_and_sse_records(self):
+        """Test NDJSON gives one line per record and SSE names the event after its type."""
+        record = {"type": "result", "title": "晴天"}
+
+        assert format_record(record) == '{"type":"result","title":"晴天"}\n'
+        assert format_record(record, sse=True) == 'event: result\ndata: {"type":"result","title":"晴天"}\n\n'
+
+    def test_wants_sse(self):
+        """Test the explicit format wins over the Accept header."""
+        assert wants_sse("text/event-stream")
+        assert not wants_sse("application/json")
+        assert not wants_sse(None)
+        assert not wants_sse("text/event-stream", "ndjson")
+        assert wants_sse(None, "SSE")
+
+
+class TestIterateAsync:
+    """Test driving async record generators from a sync response body."""
+
+    def test_records_stream_in_order(self):
+        """Test each record is emitted as the async generator produces it."""
+        async def records():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield {"type": "result", "event_index": i}
+
+        lines = [json.loads(line) for line in iterate_async(records)]
+
+        assert [line["event_index"] for line in lines] == [0, 1, 2]
+
+    def test_error_becomes_final_record(self):
+        """Test an exception mid-stream ends the body with an error record."""
+        async def records():
+            yield {"type": "result"}
+            raise RuntimeError("boom")
+
+        lines = [json.loads(line) for line in iterate_async(records)]
+
+        assert lines == [{"type": "result"}, {"type": "error", "error": "boom"}]
+
+    def test_closing_early_closes_generator(self):
+        """Test a client disconnect closes the async generator."""
+        closed = []
+
+        async def records():
+            try:
+                while True:
+                    yield {"type": "result"}
+            finally:
+                closed.append(True)
+
+        body = iterate_async(records)
+        next(body)
+        body.close()
+
+        assert closed == [True]
+
+
+class TestStreamRecords:
+    """Test the ASGI streaming body."""
+
+    def test_records_and_error(self):
+        """Test records are formatted in order and an exception becomes an error record."""
+        async def records():
+            yield {"type": "result", "event_index": 0}
+            raise RuntimeError("boom")
+
+        async def collect():
+            return [json.loads(line) async for line in stream_records(records())]
+
+        assert asyncio.run(collect()) == [
+            {"type": "result", "event_index": 0},
+            {"type": "error", "error": "boom"}
+        ]
@@ -0,0 +1,82 @@
+"""
+Unit tests for the process-wide service container.
+"""
+
+import pytest
+import threading
+from unittest.mock import AsyncMock, Mock
+
+from diary_agent.core.service_container import ServiceContainer, get_container, reset_container
+
+
+class TestServiceContainer:
+    """Test lazy construction and sharing of services."""
+
+    def test_services_are_built_once_on_first_use(self):
+        """Test a service is built lazily and then shared."""
+        container = ServiceContainer()
+        factory = Mock(side_effect=lambda c: object())
+        container.register("service", factory)
+
+        assert not container.is_built("service")
+        first = container.get("service")
+
+        assert container.get("service") is first
+        assert factory.call_count == 1
+        assert container.built_services() == ["service"]
+
+    def test_dependencies_share_the_llm_manager(self):
+        """Test services built from the container reuse its single LLM manager."""
+        container = ServiceContainer()
+        container.register("llm_manager", lambda c: Mock(name="manager"))
+        container.register("agent_a", lambda c: Mock(llm_manager=c.llm_manager))
+        container.register("agent_b", lambda c: Mock(llm_manager=c.llm_manager))
+
+        assert container.get("agent_a").llm_manager is container.get("agent_b").llm_manager
+
+    def test_concurrent_first_use_builds_once(self):
+        """Test threads racing on first use get the same instance."""
+        container = ServiceContainer()
+        builds = []
+
+        def factory(c):
+            builds.append(1)
+            return object()
+
+        container.register("service", factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(container.get("service"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(builds) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_unknown_service(self):
+        """Test asking for an unregistered service raises KeyError."""
+        with pytest.raises(KeyError):
+            ServiceContainer().get("missing")
+
+    @pytest.mark.asyncio
+    async def test_close_only_touches_built_manager(self):
+        """Test close() is a no-op until the LLM manager has been built."""
+        container = ServiceContainer()
+        manager = Mock(close=AsyncMock())
+        container.register("llm_manager", lambda c: manager)
+
+        await container.close()
+        manager.close.assert_not_called()
+
+        container.get("llm_manager")
+        await container.close()
+        manager.close.assert_awaited_once()
+
+    def test_process_wide_container(self):
+        """Test get_container() returns one instance until reset."""
+        reset_container()
+        try:
+            assert get_container() is get_container()
+        finally:
+            reset_container()
@@ -0,0 +1,78 @@
+"""
+Endpoint tests for the simple diary API.
+"""
+
+import pytest
+import json
+from unittest.mock import AsyncMock, patch
+
+pytest.importorskip("quart")
+pytest.importorskip("aiohttp")
+
+import simple_diary_api
+from diary_agent.utils.micro_batcher import BatchingConfig
+from diary_agent.utils.stream_parser import StreamingConfig
+
+
+HOLIDAY_EVENTS = [
+    {"event_category": "holiday_events", "event_name": name}
+    for name in ("approaching_holiday", "during_holiday", "holiday_ends")
+]
+
+
+async def _provider_reply(config, prompt, system_prompt, **kwargs):
+    """Answer packed prompts with a JSON array and single prompts with one diary."""
+    diary = {"title": "放假", "content": "今天和主人一起过节", "emotion_tags": ["开心快乐"]}
+    count = prompt.count("### 请求")
+    if count:
+        return json.dumps([dict(diary, id=i) for i in range(count)], ensure_ascii=False)
+    return json.dumps(diary, ensure_ascii=False)
+
+
+async def _post_batch(path, batching_enabled):
+    """POST the holiday events and return (response JSON or body, provider call count)."""
+    manager = simple_diary_api.diary_manager.llm_config_manager
+    batching = BatchingConfig(enabled=batching_enabled, max_wait_ms=50)
+    provider = AsyncMock(side_effect=_provider_reply)
+
+    # Single requests go through _call_provider too (not the streaming path)
+    with patch.object(manager.micro_batcher, "config", batching), \
+            patch.object(manager, "streaming_config", StreamingConfig(enabled=False)), \
+            patch.object(manager, "response_cache", None), \
+            patch.object(manager, "_call_provider", provider):
+        client = simple_diary_api.app.test_client()
+        response = await client.post(path, json={"events": HOLIDAY_EVENTS})
+        body = await response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    return body, provider.await_count
+
+
+class TestBatchProcessEndpoint:
+    """Test micro-batching of the batch endpoints' LLM requests."""
+
+    @pytest.mark.asyncio
+    async def test_batched_events_share_provider_calls(self):
+        """Test N events cost fewer than N provider calls when batching is enabled."""
+        body, calls = await _post_batch("/api/diary/batch-process", batching_enabled=True)
+        data = json.loads(body)["data"]
+
+        assert data["diaries_generated"] == len(HOLIDAY_EVENTS)
+        assert calls < len(HOLIDAY_EVENTS)
+
+    @pytest.mark.asyncio
+    async def test_unbatched_events_call_provider_each(self):
+        """Test every event gets its own provider call when batching is disabled."""
+        body, calls = await _post_batch("/api/diary/batch-process", batching_enabled=False)
+
+        assert json.loads(body)["data"]["diaries_generated"] == len(HOLIDAY_EVENTS)
+        assert calls == len(HOLIDAY_EVENTS)
+
+    @pytest.mark.asyncio
+    async def test_stream_endpoint_batches_too(self):
+        """Test the streaming variant opts its events into batching."""
+        body, calls = await _post_batch("/api/diary/batch-process/stream", batching_enabled=True)
+        records = [json.loads(line) for line in body.splitlines() if line.strip()]
+
+        assert records[-1]["diaries_generated"] == len(HOLIDAY_EVENTS)
+        assert calls < len(HOLIDAY_EVENTS)
@@ -0,0 +1,163 @@
+"""
+Unit tests for in-flight request coalescing.
+"""
+
+import pytest
+import asyncio
+import json
+import tempfile
+import os
+from unittest.mock import patch
+
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test SingleFlight coalescing and cancellation semantics."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test N concurrent identical calls run the function once."""
+        flight = SingleFlight()
+        executions = 0
+        
+        async def work():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+        
+        assert results == ["result"] * 5
+        assert executions == 1
+        stats = flight.get_key_stats("key")
+        assert stats.calls == 5
+        assert stats.executions == 1
+        assert stats.coalesced == 4
+    
+    @pytest.mark.asyncio
+    async def test_sequential_calls_execute_again(self):
+        """Test a finished flight is not reused by later callers."""
+        flight = SingleFlight()
+        executions = 0
+        
+        async def work():
+            nonlocal executions
+            executions += 1
+            return executions
+        
+        assert await flight.do("key", work) == 1
+        assert await flight.do("key", work) == 2
+    
+    @pytest.mark.asyncio
+    async def test_exception_fans_out_to_all_waiters(self):
+        """Test every waiter sees the upstream exception."""
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+        
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(3)], return_exceptions=True)
+        
+        assert all(isinstance(result, ValueError) for result in results)
+    
+    @pytest.mark.asyncio
+    async def test_cancelling_one_waiter_keeps_shared_call(self):
+        """Test a cancelled waiter does not cancel the call for the others."""
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return "result"
+        
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        
+        assert await second == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+    
+    @pytest.mark.asyncio
+    async def test_cancelling_all_waiters_cancels_upstream(self):
+        """Test the upstream call is cancelled once nobody is waiting."""
+        flight = SingleFlight()
+        upstream_cancelled = asyncio.Event()
+        
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+        
+        waiter = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        
+        await asyncio.wait_for(upstream_cancelled.wait(), timeout=1)
+        assert flight.get_stats()["in_flight"] == 0
+
+
+class TestLLMConfigManagerCoalescing:
+    """Test single-flight integration in generate_text_with_failover."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a single-provider configuration."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                }
+            }
+        }
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+        
+        yield temp_path
+        
+        os.unlink(temp_path)
+    
+    @pytest.mark.asyncio
+    async def test_burst_of_identical_prompts_costs_one_call(self, temp_config_file):
+        """Test concurrent identical prompts reach the provider once."""
+        manager = LLMConfigManager(temp_config_file)
+        
+        async def slow_generate(config, prompt, system_prompt):
+            await asyncio.sleep(0.02)
+            return "Generated content"
+        
+        with patch.object(manager, '_generate_with_retry', side_effect=slow_generate) as mock_generate:
+            results = await asyncio.gather(*[
+                manager.generate_text_with_failover("Same prompt", "System") for _ in range(5)
+            ])
+        
+        assert results == ["Generated content"] * 5
+        assert mock_generate.call_count == 1
+        assert manager.get_provider_status()["single_flight"]["coalesced"] == 4
+    
+    @pytest.mark.asyncio
+    async def test_creative_requests_are_not_coalesced(self, temp_config_file):
+        """Test use_cache=False requests each get their own call."""
+        manager = LLMConfigManager(temp_config_file)
+        
+        async def slow_generate(config, prompt, system_prompt):
+            await asyncio.sleep(0.02)
+            return "Generated content"
+        
+        with patch.object(manager, '_generate_with_retry', side_effect=slow_generate) as mock_generate:
+            await asyncio.gather(*[
+                manager.generate_text_with_failover("Same prompt", use_cache=False) for _ in range(3)
+            ])
+        
+        assert mock_generate.call_count == 3
@@ -0,0 +1,113 @@
+"""
+Unit tests for the cold-start profiler and budget check.
+"""
+
+import pytest
+
+from diary_agent.utils.lazy_import import import_string
+from diary_agent.utils.startup_profiler import (
+    StartupBudget, StartupReport, load_budget, parse_importtime, profile_startup
+)
+
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _json
+import time:       800 |        920 | json
+import time:      5000 |       5000 |     PIL._util
+import time:     20000 |      25000 |   PIL.Image
+import time:      1000 |      26000 | diary_agent.core.condition
+"""
+
+
+class TestParseImporttime:
+    """Test parsing of -X importtime output."""
+
+    def test_records_and_depth(self):
+        """Test each module line becomes a record with its nesting depth."""
+        records = parse_importtime(IMPORTTIME_OUTPUT)
+
+        assert [record.module for record in records] == [
+            "_json", "json", "PIL._util", "PIL.Image", "diary_agent.core.condition"
+        ]
+        assert [record.depth for record in records] == [1, 0, 2, 1, 0]
+        assert records[3].cumulative_us == 25000
+
+    def test_package_costs(self):
+        """Test self time is summed per top-level package."""
+        report = StartupReport(entry="app", phases={}, imports=parse_importtime(IMPORTTIME_OUTPUT))
+
+        costs = report.package_costs()
+
+        assert list(costs)[0] == "PIL"
+        assert costs["PIL"] == pytest.approx(25.0)
+        assert report.slowest_imports(1)[0].module == "diary_agent.core.condition"
+
+
+class TestStartupBudget:
+    """Test budget enforcement."""
+
+    def test_within_budget(self):
+        """Test a fast startup has no violations."""
+        report = StartupReport(entry="app", phases={"import app": 100.0, "total": 150.0}, max_rss_kb=50 * 1024)
+        budget = StartupBudget(max_import_ms=500, max_total_ms=1000, max_rss_mb=100)
+
+        assert budget.check(report) == []
+
+    def test_violations(self):
+        """Test time, memory and forbidden imports are all reported."""
+        report = StartupReport(
+            entry="app",
+            phases={"import app": 900.0, "total": 1200.0},
+            imports=parse_importtime(IMPORTTIME_OUTPUT),
+            max_rss_kb=400 * 1024
+        )
+        budget = StartupBudget.from_dict({
+            "max_import_ms": 500, "max_total_ms": 1000, "max_rss_mb": 100,
+            "forbidden_imports": ["PIL.Image", "mysql.connector"], "unknown": True
+        })
+
+        violations = budget.check(report)
+
+        assert len(violations) == 4
+        assert "PIL.Image is imported at startup" in violations
+
+    def test_zero_disables_limits(self):
+        """Test an empty budget never fails."""
+        report = StartupReport(entry="app", phases={"import app": 1e6, "total": 1e6}, max_rss_kb=10 ** 9)
+
+        assert StartupBudget().check(report) == []
+
+    def test_budget_file_has_api_entry(self):
+        """Test the shipped budget covers the simple API entry point."""
+        budget = load_budget(entry="simple_diary_api")
+
+        assert budget.max_import_ms > 0
+        assert "PIL" in budget.forbidden_imports
+
+
+class TestLazyImport:
+    """Test import_string resolution."""
+
+    def test_resolves_attribute(self):
+        """Test a "module:attribute" path resolves to the object."""
+        assert import_string("json:dumps").__name__ == "dumps"
+
+    def test_missing_attribute(self):
+        """Test a missing attribute raises ImportError."""
+        with pytest.raises(ImportError):
+            import_string("json:no_such_thing")
+
+
+@pytest.mark.performance
+class TestColdStartBudget:
+    """Test the simple API cold start stays within its budget."""
+
+    def test_simple_diary_api_cold_start(self):
+        """Test importing simple_diary_api is within config/startup_budget.json."""
+        pytest.importorskip("quart")
+        pytest.importorskip("aiohttp")
+
+        report = profile_startup("simple_diary_api")
+
+        assert load_budget(entry="simple_diary_api").check(report) == []
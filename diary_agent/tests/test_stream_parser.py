@@ -0,0 +1,263 @@
+"""
+Unit tests for streamed LLM generation and incremental JSON parsing.
+"""
+
+import pytest
+import json
+import tempfile
+import os
+from unittest.mock import AsyncMock, patch
+
+from diary_agent.core.llm_manager import LLMConfigManager, QwenAPIClient, OllamaAPIClient
+from diary_agent.utils.data_models import LLMConfig
+from diary_agent.utils.llm_telemetry import AttemptMetrics
+from diary_agent.utils.stream_parser import IncrementalJSONParser, iter_sse_data, iter_ndjson
+
+
+async def _lines(*lines):
+    """Async iterable of byte lines, like aiohttp's response.content."""
+    for line in lines:
+        yield line
+
+
+class TestIncrementalJSONParser:
+    """Test field events and completion detection."""
+    
+    def test_fields_reported_as_they_complete(self):
+        """Test a field is reported by the chunk that closes it."""
+        parser = IncrementalJSONParser()
+    
+        assert parser.feed('{"title": "晴') == []
+        assert parser.feed('天", "con') == [("title", "晴天")]
+        assert parser.feed('tent": "散步"') == [("content", "散步")]
+        assert not parser.complete
+    
+        parser.feed(', "emotion_tags": ["开心"]}')
+    
+        assert parser.complete
+        assert json.loads(parser.document)["emotion_tags"] == ["开心"]
+    
+    def test_text_around_object_is_ignored(self):
+        """Test prose and code fences before and after the object are skipped."""
+        parser = IncrementalJSONParser()
+        parser.feed('好的，日记如下：\n```json\n{"title": "a"}')
+        parser.feed('\n```\n多余的说明')
+    
+        assert parser.document == '{"title": "a"}'
+    
+    def test_braces_inside_think_block_are_skipped(self):
+        """Test reasoning in <think> blocks (tags split across chunks too) is not taken as the object."""
+        parser = IncrementalJSONParser()
+        parser.feed('<think>用户要 {a} 的格式</think>')
+        assert not parser.complete
+    
+        parser.feed('<thi')
+        parser.feed('nk>再想想 {"title": "草稿"}</th')
+        assert not parser.complete
+    
+        fields = parser.feed('ink>\n{"title": "晴天"}')
+    
+        assert parser.complete
+        assert parser.document == '{"title": "晴天"}'
+        assert fields == [("title", "晴天")]
+    
+    def test_braces_and_escapes_inside_strings(self):
+        """Test structural characters inside strings do not end the object."""
+        parser = IncrementalJSONParser()
+        fields = parser.feed('{"title": "a}\\"b", "nested": {"x": "1"}, "content": "c"}')
+    
+        assert fields == [("title", 'a}"b'), ("content", "c")]
+        assert parser.complete
+    
+    def test_nested_strings_are_not_top_level_fields(self):
+        """Test only top-level string values are reported."""
+        parser = IncrementalJSONParser()
+        fields = parser.feed('{"meta": {"title": "inner"}, "tags": ["x"], "title": "outer"}')
+    
+        assert fields == [("title", "outer")]
+
+
+@pytest.mark.asyncio
+class TestStreamDecoders:
+    """Test SSE and NDJSON line decoding."""
+    
+    async def test_sse_stops_at_done(self):
+        """Test data lines are yielded until [DONE]."""
+        events = [data async for data in iter_sse_data(_lines(
+            b'data: {"a": 1}\n', b'\n', b': keep-alive\n', b'data: {"a": 2}\n', b'data: [DONE]\n', b'data: {"a": 3}\n'
+        ))]
+    
+        assert events == ['{"a": 1}', '{"a": 2}']
+    
+    async def test_ndjson_decodes_lines(self):
+        """Test each non-empty line is decoded."""
+        events = [event async for event in iter_ndjson(_lines(b'{"response": "a"}\n', b'\n', b'{"done": true}\n'))]
+    
+        assert events == [{"response": "a"}, {"done": True}]
+
+
+@pytest.mark.asyncio
+class TestStreamingClients:
+    """Test provider stream_text implementations."""
+    
+    async def test_qwen_stream_yields_deltas(self):
+        """Test SSE chat completion deltas are yielded in order."""
+        config = LLMConfig(provider_name="qwen", api_endpoint="https://api.qwen.com/v1/chat",
+                           api_key="key", model_name="qwen-turbo")
+    
+        with patch('aiohttp.ClientSession.post') as mock_post:
+            mock_resp = AsyncMock()
+            mock_resp.status = 200
+            mock_resp.content = _lines(
+                b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n',
+                b'data: {"choices": [{"delta": {"content": "{\\"title\\""}}]}\n',
+                b'data: {"choices": [{"delta": {"content": ": \\"x\\"}"}}]}\n',
+                b'data: [DONE]\n'
+            )
+            mock_post.return_value.__aenter__.return_value = mock_resp
+    
+            async with QwenAPIClient(config) as client:
+                chunks = [chunk async for chunk in client.stream_text("prompt", "system")]
+    
+            assert "".join(chunks) == '{"title": "x"}'
+            assert mock_post.call_args.kwargs["json"]["stream"] is True
+            assert mock_post.call_args.kwargs["json"]["stream_options"] == {"include_usage": True}
+    
+    async def test_ollama_stream_stops_when_done(self):
+        """Test NDJSON chunks are yielded until done."""
+        config = LLMConfig(provider_name="ollama_qwen3", api_endpoint="http://localhost:11434/api/generate",
+                           api_key="", model_name="qwen3")
+    
+        with patch('aiohttp.ClientSession.post') as mock_post:
+            mock_resp = AsyncMock()
+            mock_resp.status = 200
+            mock_resp.content = _lines(
+                b'{"response": "{\\"title\\": ", "done": false}\n',
+                b'{"response": "\\"x\\"}", "done": true}\n',
+                b'{"response": "ignored", "done": false}\n'
+            )
+            mock_post.return_value.__aenter__.return_value = mock_resp
+    
+            async with OllamaAPIClient(config) as client:
+                chunks = [chunk async for chunk in client.stream_text("prompt")]
+    
+            assert "".join(chunks) == '{"title": "x"}'
+
+
+class TestLLMConfigManagerStreaming:
+    """Test streamed JSON generation through the manager."""
+    
+    @pytest.fixture
+    def temp_config_file(self):
+        """Create a configuration with streaming enabled."""
+        config_data = {
+            "providers": {
+                "qwen": {
+                    "provider_name": "qwen",
+                    "api_endpoint": "https://api.qwen.com/v1/chat",
+                    "api_key": "test-qwen-key",
+                    "model_name": "qwen-turbo"
+                }
+            },
+            "model_selection": {
+                "performance_settings": {
+                    "streaming": {"enabled": True}
+                }
+            }
+        }
+    
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            temp_path = f.name
+    
+        yield temp_path
+    
+        os.unlink(temp_path)
+    
+    @staticmethod
+    def _fake_client(chunks, consumed, usage=None):
+        """API client double whose stream records how far it was read and reports usage at the end."""
+        class FakeClient:
+            async def __aenter__(self):
+                return self
+    
+            async def __aexit__(self, exc_type, exc_val, exc_tb):
+                return False
+    
+            async def stream_text(self, prompt, system_prompt=""):
+                if usage is not None:
+                    self.last_metrics = AttemptMetrics()
+                for chunk in chunks:
+                    consumed.append(chunk)
+                    yield chunk
+                if usage is not None:
+                    self.last_metrics.apply_usage(usage)
+    
+        return FakeClient()
+    
+    @pytest.mark.asyncio
+    async def test_stream_stops_at_closing_brace(self, temp_config_file):
+        """Test generation stops once the JSON object is complete and fields are reported early."""
+        manager = LLMConfigManager(temp_config_file)
+        chunks = ['{"title": "雨天', '", "content": "在家', '看书", "emotion_tags": []}', ' 以上是日记。', '多余']
+        consumed = []
+        fields = []
+    
+        with patch.object(manager, '_create_api_client', return_value=self._fake_client(chunks, consumed)):
+            result = await manager.generate_text_with_failover(
+                "Test prompt", response_format="json",
+                on_field=lambda key, value: fields.append((key, value))
+            )
+    
+        assert json.loads(result)["content"] == "在家看书"
+        assert consumed == chunks[:3]
+        assert fields[0] == ("title", "雨天")
+        status = manager.get_provider_status()["streaming"]
+        assert status["streamed_requests"] == 1
+        assert status["early_stops"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_early_stop_records_reported_usage(self, temp_config_file):
+        """Test the stream is drained to the usage event so telemetry records the provider's counts."""
+        manager = LLMConfigManager(temp_config_file)
+        chunks = ['{"title": "雨天", ', '"content": "在家看书"}', ' 以上是日记。']
+        consumed = []
+        fields = []
+        usage = {"prompt_tokens": 120, "completion_tokens": 37}
+    
+        with patch.object(manager, '_create_api_client', return_value=self._fake_client(chunks, consumed, usage)):
+            result = await manager.generate_text_with_failover(
+                "Test prompt", response_format="json",
+                on_field=lambda key, value: fields.append((key, value))
+            )
+    
+        assert json.loads(result)["content"] == "在家看书"
+        assert consumed == chunks
+        assert [key for key, _ in fields] == ["title", "content"]
+        stats = manager.telemetry.get_provider_stats("qwen")
+        assert stats["estimated_usage"] == 0
+        assert stats["prompt_tokens_total"] == 120
+        assert stats["completion_tokens_total"] == 37
+    
+    @pytest.mark.asyncio
+    async def test_plain_requests_do_not_stream(self, temp_config_file):
+        """Test requests without response_format use the regular path."""
+        manager = LLMConfigManager(temp_config_file)
+    
+        with patch.object(manager, '_call_provider', AsyncMock(return_value="plain text")) as mock_call:
+            result = await manager.generate_text_with_failover("Test prompt")
+    
+        assert result == "plain text"
+        mock_call.assert_awaited_once()
+        assert manager.streamed_requests == 0
+    
+    @pytest.mark.asyncio
+    async def test_incomplete_object_returns_full_text(self, temp_config_file):
+        """Test a response without a complete object is returned whole for fallback parsing."""
+        manager = LLMConfigManager(temp_config_file)
+        chunks = ['标题：雨天\n', '内容：在家看书']
+    
+        with patch.object(manager, '_create_api_client', return_value=self._fake_client(chunks, [])):
+            result = await manager.generate_text_with_failover("Test prompt", response_format="json")
+    
+        assert result == "标题：雨天\n内容：在家看书"
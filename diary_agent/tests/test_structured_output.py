@@ -0,0 +1,154 @@
+"""
+Tests for structured JSON output and single-call diary generation.
+"""
+
+import pytest
+import json
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock
+
+from diary_agent.agents.base_agent import BaseSubAgent
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.data_models import LLMConfig, PromptConfig, EventData, DiaryContextData
+from diary_agent.utils.formatters import DiaryFormatter
+from diary_agent.utils.llm_stub_server import LLMStubServer, StubServerConfig
+from diary_agent.utils.response_adapters import get_adapter
+from diary_agent.utils.structured_output import (
+    JSON_OBJECT_SCHEMA, StructuredOutputConfig, schema_from_output_format
+)
+
+
+DIARY_SCHEMA = schema_from_output_format({"title": "string", "content": "string", "emotion_tags": "list"})
+
+
+class TestSchemas:
+    """Test schema construction and per-protocol request fields."""
+    
+    def test_schema_from_output_format(self):
+        """Test output_format type names map to a JSON schema requiring every field."""
+        assert DIARY_SCHEMA == {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "content": {"type": "string"},
+                "emotion_tags": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["title", "content", "emotion_tags"]
+        }
+        assert schema_from_output_format({}) is None
+    
+    def test_extra_output_format_keys_stay_optional(self):
+        """Test fields outside required are properties but not required."""
+        schema = schema_from_output_format({"emotion": "string", "title": "string"}, required=["title"])
+    
+        assert schema["properties"]["emotion"] == {"type": "string"}
+        assert schema["required"] == ["title"]
+        assert StructuredOutputConfig.from_dict({"unknown": 1}).enabled is True
+    
+    def test_protocol_fields(self):
+        """Test JSON mode for OpenAI/DashScope and a format schema (or "json") for Ollama."""
+        config = LLMConfig(provider_name="p", api_endpoint="http://x", api_key="k", model_name="m")
+    
+        openai = get_adapter("openai").build_template(config, DIARY_SCHEMA).skeleton
+        dashscope = get_adapter("dashscope").build_template(config, DIARY_SCHEMA).skeleton
+        ollama = get_adapter("ollama_chat").build_template(config, DIARY_SCHEMA).skeleton
+        ollama_plain = get_adapter("ollama_generate").build_template(config, JSON_OBJECT_SCHEMA).skeleton
+    
+        assert openai["response_format"] == {"type": "json_object"}
+        assert dashscope["parameters"]["response_format"] == {"type": "json_object"}
+        assert dashscope["parameters"]["result_format"] == "message"
+        assert ollama["format"] == DIARY_SCHEMA
+        assert ollama_plain["format"] == "json"
+        assert "response_format" not in get_adapter("openai").build_template(config).skeleton
+
+
+@pytest.mark.asyncio
+class TestManagerStructuredOutput:
+    """Test which requests ask the stand-in server for structured output."""
+    
+    async def _run(self, write_config, provider_overrides=None, performance_settings=None, prompt="用JSON写一篇日记",
+                   api_format="ollama_chat", **kwargs):
+        async with LLMStubServer(StubServerConfig(latency_mean=0.0)) as server:
+            provider = server.provider_config("stub", api_format, **(provider_overrides or {}))
+            config_path = write_config({"stub": provider}, performance_settings)
+            manager = LLMConfigManager(config_path)
+            text = await manager.generate_text_with_failover(prompt, use_cache=False, **kwargs)
+            await manager.close()
+        return server.stats["structured"], text
+    
+    async def test_json_requests_are_structured(self, write_config):
+        """Test JSON requests carry a schema or JSON mode and still return the object."""
+        structured, text = await self._run(write_config, response_format="json", response_schema=DIARY_SCHEMA)
+    
+        assert structured == 1
+        assert "title" in json.loads(text)
+    
+    async def test_streamed_openai_requests_are_structured(self, write_config):
+        """Test JSON mode is also requested on the streaming path."""
+        structured, _ = await self._run(
+            write_config, performance_settings={"streaming": {"enabled": True}}, api_format="openai", response_format="json"
+        )
+    
+        assert structured == 1
+    
+    async def test_plain_and_opted_out_requests_are_not(self, write_config):
+        """Test plain requests, prompts not mentioning JSON and opted-out providers stay unconstrained."""
+        assert (await self._run(write_config))[0] == 0
+        assert (await self._run(write_config, prompt="写一篇日记", response_format="json"))[0] == 0
+        assert (await self._run(write_config, {"structured_output": False}, response_format="json"))[0] == 0
+        assert (await self._run(write_config, performance_settings={"structured_output": {"enabled": False}},
+                                response_format="json"))[0] == 0
+
+
+class TestExtractTitle:
+    """Test the local extractive title generator."""
+    
+    def test_first_meaningful_clause(self):
+        """Test the first clause is used without filler words, punctuation or emoji."""
+        assert DiaryFormatter.extract_title("今天我和小明一起去公园玩，非常开心！") == "我和小明一起去公园玩"
+        assert DiaryFormatter.extract_title("😀\n内容：下雨了☔️ 在家看书。") == "下雨了在家看书"
+        assert DiaryFormatter.extract_title("主人陪我玩了一整个下午的积木游戏", max_length=6) == "主人陪我玩了"
+    
+    def test_default_when_nothing_usable(self):
+        """Test text without usable clauses falls back to the default title."""
+        assert DiaryFormatter.extract_title("！！…") == "美好时光"
+        assert DiaryFormatter.extract_title("") == "美好时光"
+
+
+class _SingleCallAgent(BaseSubAgent):
+
+    async def process_event(self, event_data):
+        pass
+    
+    def get_supported_events(self):
+        return []
+
+
+class TestSingleCallGeneration:
+    """Test a diary costs at most one LLM call."""
+    
+    @pytest.mark.asyncio
+    async def test_non_json_reply_needs_no_title_call(self):
+        """Test a reply without a title gets an extracted one instead of a second LLM call."""
+        prompt_config = PromptConfig(
+            agent_type="weather_agent", system_prompt="系统", user_prompt_template="以JSON格式写{event_name}",
+            output_format={"title": "string", "mood": "string"}, validation_rules={}
+        )
+        llm_manager = Mock()
+        llm_manager.generate_text_with_failover = AsyncMock(
+            return_value="今天我和主人一起看雨，心里暖暖的，开心极了，还听到了好多好多的雨声，真是太有趣了呢"
+        )
+        agent = _SingleCallAgent("weather_agent", prompt_config, llm_manager, Mock())
+        event_data = EventData(
+            event_id="e1", event_type="weather", event_name="rainy_day",
+            timestamp=datetime(2025, 10, 1, 9, 0), user_id=1, context_data={}, metadata={}
+        )
+        context_data = DiaryContextData({}, {}, {}, {}, {}, {})
+    
+        content = await agent.generate_diary_content(event_data, context_data)
+    
+        assert content["title"] == "我和主人一起看雨"
+        llm_manager.generate_text_with_failover.assert_awaited_once()
+        schema = llm_manager.generate_text_with_failover.await_args.kwargs["response_schema"]
+        assert schema["required"] == ["title", "content", "emotion_tags"]
+        assert "mood" in schema["properties"]
@@ -0,0 +1,125 @@
+"""
+Bounded-concurrency execution of independent async jobs.
+Used by the batch diary endpoint: up to max_concurrency jobs run at once,
+each job gets its own timeout, and a request-wide deadline cancels whatever
+is still running or queued so finished results can be returned as they are.
+"""
+
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+
+# Outcome statuses
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+
+@dataclass
+class BatchRunConfig:
+    """Configuration for concurrent batch processing."""
+    max_concurrency: int = 4
+    max_concurrency_limit: int = 16  # cap on per-request overrides
+    item_timeout: float = 60.0  # seconds per job, 0 disables
+    deadline: float = 120.0  # seconds for the whole batch, 0 disables
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "BatchRunConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+    def with_overrides(self, max_concurrency: Any = None, item_timeout: Any = None,
+                       deadline: Any = None) -> "BatchRunConfig":
+        """
+        Apply per-request overrides.
+
+        Concurrency is clamped to [1, max_concurrency_limit]; timeouts may only
+        be shortened, never raised above the configured values.
+        """
+        config = replace(self)
+        if max_concurrency is not None:
+            config.max_concurrency = int(max_concurrency)
+        config.max_concurrency = max(1, min(config.max_concurrency, self.max_concurrency_limit))
+        if item_timeout is not None and float(item_timeout) > 0:
+            config.item_timeout = _shorter(float(item_timeout), self.item_timeout)
+        if deadline is not None and float(deadline) > 0:
+            config.deadline = _shorter(float(deadline), self.deadline)
+        return config
+
+
+def _shorter(requested: float, configured: float) -> float:
+    return min(requested, configured) if configured else requested
+
+
+@dataclass
+class ItemOutcome:
+    """Result of one job: status is ok, error, timeout or deadline_exceeded."""
+    status: str
+    value: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+async def iter_bounded(jobs: Sequence[Callable[[], Awaitable[Any]]],
+                       config: BatchRunConfig = None) -> AsyncIterator[Tuple[int, ItemOutcome]]:
+    """
+    Run jobs concurrently and yield (index, outcome) pairs as they finish.
+
+    Exceptions and per-job timeouts become outcomes instead of propagating.
+    When the deadline passes, jobs still running or queued are cancelled and
+    yielded (in input order) as deadline_exceeded. Closing the iterator early
+    cancels everything still pending.
+    """
+    config = config or BatchRunConfig()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, config.max_concurrency))
+    deadline_at = loop.time() + config.deadline if config.deadline else None
+
+    async def run_one(job: Callable[[], Awaitable[Any]]) -> ItemOutcome:
+        async with semaphore:
+            try:
+                if config.item_timeout:
+                    value = await asyncio.wait_for(job(), config.item_timeout)
+                else:
+                    value = await job()
+                return ItemOutcome(OK, value)
+            except asyncio.TimeoutError:
+                return ItemOutcome(TIMEOUT, error=f"Timed out after {config.item_timeout}s")
+            except Exception as e:
+                return ItemOutcome(ERROR, error=str(e))
+
+    pending: Dict[asyncio.Task, int] = {
+        loop.create_task(run_one(job)): index for index, job in enumerate(jobs)
+    }
+    try:
+        while pending:
+            timeout = None if deadline_at is None else max(0.0, deadline_at - loop.time())
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                yield pending.pop(task), task.result()
+
+        for task, index in sorted(pending.items(), key=lambda item: item[1]):
+            task.cancel()
+            yield index, ItemOutcome(DEADLINE_EXCEEDED, error=f"Batch deadline of {config.deadline}s exceeded")
+        pending.clear()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def run_bounded(jobs: Sequence[Callable[[], Awaitable[Any]]],
+                      config: BatchRunConfig = None) -> List[ItemOutcome]:
+    """Run jobs concurrently and return their outcomes in input order."""
+    outcomes: List[Optional[ItemOutcome]] = [None] * len(jobs)
+    async for index, outcome in iter_bounded(jobs, config):
+        outcomes[index] = outcome
+    return outcomes
@@ -0,0 +1,116 @@
+"""
+Pooled HTTP sessions for LLM provider clients.
+Keeps one long-lived aiohttp session per provider so that repeated calls reuse
+warm keep-alive connections instead of paying a TCP/TLS handshake every time.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import aiohttp
+
+from . import fast_json
+from .llm_telemetry import create_trace_config
+
+
+@dataclass
+class ConnectionPoolConfig:
+    """Configuration for pooled provider connections."""
+    limit: int = 100  # total connections per provider session
+    limit_per_host: int = 20
+    keepalive_timeout: float = 30.0  # seconds an idle connection is kept open
+    ttl_dns_cache: int = 300  # seconds
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ConnectionPoolConfig":
+        """Build a pool config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+class ProviderSessionPool:
+    """Owns one pooled aiohttp session per LLM provider."""
+
+    def __init__(self, config: ConnectionPoolConfig = None):
+        self.config = config or ConnectionPoolConfig()
+        self.logger = logging.getLogger("connection_pool")
+        # provider name -> (owning event loop, session)
+        self._sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self.sessions_created = 0
+
+    def get_session(self, provider_name: str, timeout: float) -> aiohttp.ClientSession:
+        """
+        Return the pooled session for a provider, creating it if needed.
+
+        Must be called from within a running event loop. Sessions are bound to
+        the loop that created them, so a session created on a loop that has
+        since gone away is replaced rather than reused.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(provider_name)
+
+        if entry is not None:
+            session_loop, session = entry
+            if (session_loop is loop and not session.closed
+                    and session.timeout.total == timeout):
+                return session
+            if session_loop is loop and not session.closed:
+                # Provider settings changed (e.g. after a reload); close it in the background
+                loop.create_task(session.close())
+            elif not session.closed and not session_loop.is_running():
+                # The owning loop is gone (e.g. asyncio.run() per request), so the
+                # session can no longer be closed there; detach it instead
+                session.detach()
+            self.logger.debug(f"Replacing stale pooled session for {provider_name}")
+
+        session = self._create_session(timeout)
+        self._sessions[provider_name] = (loop, session)
+        self.sessions_created += 1
+        self.logger.info(f"Created pooled HTTP session for {provider_name}")
+        return session
+
+    def _create_session(self, timeout: float) -> aiohttp.ClientSession:
+        """Create a session backed by a keep-alive connector with DNS caching."""
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            keepalive_timeout=self.config.keepalive_timeout,
+            ttl_dns_cache=self.config.ttl_dns_cache,
+            use_dns_cache=True
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            json_serialize=fast_json.dumps,
+            trace_configs=[create_trace_config()]
+        )
+
+    async def close(self):
+        """Close every pooled session; sessions on other live loops are closed there."""
+        loop = asyncio.get_running_loop()
+        sessions = self._sessions
+        self._sessions = {}
+
+        for provider_name, (session_loop, session) in sessions.items():
+            if session.closed:
+                continue
+            if session_loop is loop:
+                await session.close()
+            elif session_loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            else:
+                session.detach()
+            self.logger.info(f"Closed pooled HTTP session for {provider_name}")
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get pool statistics for monitoring."""
+        return {
+            "open_sessions": sum(1 for _, session in self._sessions.values() if not session.closed),
+            "sessions_created": self.sessions_created,
+            "providers": list(self._sessions.keys()),
+            "limit": self.config.limit,
+            "limit_per_host": self.config.limit_per_host
+        }
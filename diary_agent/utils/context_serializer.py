@@ -0,0 +1,182 @@
+"""
+Compact, token-budgeted rendering of diary context dicts for prompts.
+Data readers fill user_profile / social_context / ... with many fields;
+interpolating the raw dicts produces long Python reprs. The serializer drops
+empty values, orders keys stably, truncates long and low-value fields and
+trims the largest sections until the context fits its token budget, so equal
+contexts always yield identical (cache-friendly) prompts.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+
+from .token_estimator import estimate_tokens
+
+
+DEFAULT_LOW_VALUE_KEYS = [
+    "timestamp", "created_at", "updated_at", "last_updated", "id", "user_id",
+    "source", "data_source", "metadata", "raw_data"
+]
+
+
+@dataclass
+class ContextBudgetConfig:
+    """Configuration for context compaction."""
+    enabled: bool = True
+    max_context_tokens: int = 800  # budget shared by all context sections of one prompt
+    max_value_chars: int = 120  # longer strings are cut with an ellipsis
+    max_low_value_chars: int = 24
+    max_list_items: int = 6
+    max_depth: int = 2  # nested containers below this depth are elided
+    low_value_keys: List[str] = field(default_factory=lambda: list(DEFAULT_LOW_VALUE_KEYS))
+    empty_placeholder: str = "无"
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ContextBudgetConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, tuple, set, dict)) and not value)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max(max_chars - 1, 1)] + "…"
+
+
+class ContextSerializer:
+    """Renders context sections as compact `key: value` text within a token budget."""
+
+    def __init__(self, config: ContextBudgetConfig = None):
+        self.config = config or ContextBudgetConfig()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.fields_truncated = 0
+        self.fields_dropped = 0  # removed to meet the token budget
+        self.tokens_total = 0
+
+    def render_value(self, value: Any, depth: int = 0, max_chars: Optional[int] = None) -> str:
+        """Render one value compactly; returns "" for empty values."""
+        max_chars = max_chars or self.config.max_value_chars
+        if _is_empty(value):
+            return ""
+        if isinstance(value, Enum):
+            value = value.value
+        if isinstance(value, bool):
+            return "是" if value else "否"
+        if isinstance(value, float):
+            return f"{value:.2f}".rstrip("0").rstrip(".")
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M")
+        if isinstance(value, date):
+            return value.strftime("%Y-%m-%d")
+        if isinstance(value, dict):
+            if depth >= self.config.max_depth:
+                return "…"
+            pairs = [f"{key}: {text}" for key, text in self._render_items(value, depth + 1)]
+            return "{" + ", ".join(pairs) + "}" if pairs else ""
+        if isinstance(value, (list, tuple, set)):
+            if depth >= self.config.max_depth:
+                return "…"
+            items = sorted(value, key=str) if isinstance(value, set) else list(value)
+            rendered = [text for text in (self.render_value(item, depth + 1) for item in items) if text]
+            extra = len(rendered) - self.config.max_list_items
+            if extra > 0:
+                rendered = rendered[:self.config.max_list_items] + [f"…+{extra}"]
+            return "[" + ", ".join(rendered) + "]" if rendered else ""
+
+        text = " ".join(str(value).split())
+        truncated = _truncate(text, max_chars)
+        if truncated != text:
+            with self._lock:
+                self.fields_truncated += 1
+        return truncated
+
+    def _render_items(self, mapping: Dict[Any, Any], depth: int) -> List[Tuple[str, str]]:
+        """
+        Render non-empty fields as (key, text) pairs.
+
+        Keys are sorted with low-value keys last, so trimming from the end
+        drops them first.
+        """
+        low_value = set(self.config.low_value_keys)
+        items = []
+        for key in sorted(mapping, key=lambda k: (str(k) in low_value, str(k))):
+            max_chars = self.config.max_low_value_chars if str(key) in low_value else None
+            text = self.render_value(mapping[key], depth, max_chars)
+            if text:
+                items.append((str(key), text))
+        return items
+
+    def serialize(self, mapping: Dict[str, Any]) -> str:
+        """Render one context dict without a budget."""
+        if not self.config.enabled:
+            return str(mapping)
+        pairs = self._render_items(mapping or {}, 0)
+        return "; ".join(f"{key}: {text}" for key, text in pairs) or self.config.empty_placeholder
+
+    def serialize_sections(self, sections: Dict[str, Dict[str, Any]],
+                           max_tokens: Optional[int] = None) -> Tuple[Dict[str, str], int]:
+        """
+        Render several context sections sharing one token budget.
+
+        While over budget, the last field of the largest section is dropped.
+
+        Returns:
+            Tuple of (rendered text per section, estimated context tokens)
+        """
+        if not self.config.enabled:
+            rendered = {name: str(mapping) for name, mapping in sections.items()}
+            return rendered, sum(estimate_tokens(text) for text in rendered.values())
+
+        budget = max_tokens if max_tokens is not None else self.config.max_context_tokens
+        fields = {name: self._render_items(mapping or {}, 0) for name, mapping in sections.items()}
+        costs = {
+            name: [estimate_tokens(f"{key}: {text}; ") for key, text in pairs]
+            for name, pairs in fields.items()
+        }
+        total = sum(sum(section_costs) for section_costs in costs.values())
+
+        dropped = 0
+        while total > budget:
+            # Ties go to the first section in sorted order, keeping trimming deterministic
+            name = max(sorted(costs), key=lambda section: sum(costs[section]))
+            if not costs[name]:
+                break
+            fields[name].pop()
+            total -= costs[name].pop()
+            dropped += 1
+
+        rendered = {
+            name: "; ".join(f"{key}: {text}" for key, text in pairs) or self.config.empty_placeholder
+            for name, pairs in fields.items()
+        }
+        tokens = sum(estimate_tokens(text) for text in rendered.values())
+        with self._lock:
+            self.renders += 1
+            self.fields_dropped += dropped
+            self.tokens_total += tokens
+        return rendered, tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get compaction statistics."""
+        with self._lock:
+            return {
+                "enabled": self.config.enabled,
+                "max_context_tokens": self.config.max_context_tokens,
+                "renders": self.renders,
+                "fields_truncated": self.fields_truncated,
+                "fields_dropped": self.fields_dropped,
+                "average_context_tokens": self.tokens_total / self.renders if self.renders else 0.0
+            }
+
+
+def serialize_context(mapping: Dict[str, Any], config: ContextBudgetConfig = None) -> str:
+    """Render one context dict compactly (convenience wrapper)."""
+    return ContextSerializer(config).serialize(mapping)
@@ -75,6 +75,9 @@ class LLMConfig:
     enabled: bool = True
     priority: int = 999
     capabilities: List[str] = None
+    api_format: Optional[str] = None  # "openai", "ollama_generate", "ollama_chat", "dashscope"; inferred if unset
+    keep_alive: Optional[Any] = None  # Ollama only: how long the model stays loaded, e.g. "30m"; "-1m" pins it
+    structured_output: Optional[bool] = None  # False disables JSON mode / schema-constrained output for this provider
     
     def __post_init__(self):
         if self.capabilities is None:
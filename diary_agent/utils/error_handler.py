@@ -4,6 +4,7 @@ Provides error categorization, recovery mechanisms, and circuit breaker patterns
 """
 
 import logging
+import threading
 import time
 from enum import Enum
 from typing import Dict, Any, Optional, Callable, List
@@ -54,7 +55,8 @@ class CircuitBreakerConfig:
     failure_threshold: int = 5
     recovery_timeout: int = 60  # seconds
     success_threshold: int = 3  # for half-open state
-    timeout: int = 30  # request timeout
+    timeout: int = 30  # request timeout for call_async (0 disables)
+    half_open_max_calls: int = 1  # concurrent probe calls allowed while half-open
 
 
 class CircuitBreaker:
@@ -67,51 +69,153 @@ class CircuitBreaker:
         self.failure_count = 0
         self.success_count = 0
         self.last_failure_time = None
+        self.half_open_in_flight = 0
+        self.total_calls = 0
+        self.rejected_calls = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
         self.logger = logging.getLogger(f"circuit_breaker.{name}")
     
     def call(self, func: Callable, *args, **kwargs):
-        """Execute function with circuit breaker protection."""
-        if self.state == CircuitBreakerState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitBreakerState.HALF_OPEN
-                self.logger.info(f"Circuit breaker {self.name} moving to HALF_OPEN state")
-            else:
-                raise CircuitBreakerOpenError(f"Circuit breaker {self.name} is OPEN")
+        """
+        Execute a synchronous function with circuit breaker protection.
+        
+        Coroutine functions must go through call_async; calling them here would
+        only create the coroutine and record a success before it has run.
+        """
+        if asyncio.iscoroutinefunction(func):
+            raise TypeError(f"Use call_async for coroutine function {func.__name__}")
         
+        probe = self._before_call()
         try:
             result = func(*args, **kwargs)
-            self._on_success()
-            return result
         except Exception as e:
-            self._on_failure()
+            self._on_failure(probe)
             raise e
+        self._on_success(probe)
+        return result
+    
+    async def call_async(self, func: Callable, *args, **kwargs):
+        """
+        Await a coroutine function with circuit breaker protection.
+        
+        The call is bounded by config.timeout; a timeout counts as a failure and
+        raises CircuitBreakerTimeoutError. Cancellation is not counted.
+        """
+        probe = self._before_call()
+        try:
+            if self.config.timeout and self.config.timeout > 0:
+                result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.config.timeout)
+            else:
+                result = await func(*args, **kwargs)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            self._on_failure(probe)
+            raise CircuitBreakerTimeoutError(
+                f"Circuit breaker {self.name} call timed out after {self.config.timeout}s"
+            )
+        except asyncio.CancelledError:
+            self._release_probe(probe)
+            raise
+        except Exception:
+            self._on_failure(probe)
+            raise
+        self._on_success(probe)
+        return result
+    
+    def _before_call(self) -> bool:
+        """
+        Admit or reject a call based on the current state.
+        
+        Returns:
+            True if the call is a half-open probe
+        
+        Raises:
+            CircuitBreakerOpenError: If the circuit is open or the probe limit is reached
+        """
+        with self._lock:
+            self.total_calls += 1
+            if self.state == CircuitBreakerState.OPEN:
+                if self._should_attempt_reset():
+                    self.state = CircuitBreakerState.HALF_OPEN
+                    self.success_count = 0
+                    self.half_open_in_flight = 0
+                    self.logger.info(f"Circuit breaker {self.name} moving to HALF_OPEN state")
+                else:
+                    self.rejected_calls += 1
+                    raise CircuitBreakerOpenError(f"Circuit breaker {self.name} is OPEN")
+            
+            if self.state == CircuitBreakerState.HALF_OPEN:
+                if self.half_open_in_flight >= max(1, self.config.half_open_max_calls):
+                    self.rejected_calls += 1
+                    raise CircuitBreakerOpenError(
+                        f"Circuit breaker {self.name} is HALF_OPEN and probe limit reached"
+                    )
+                self.half_open_in_flight += 1
+                return True
+            return False
+    
+    def _release_probe(self, probe: bool):
+        """Free a half-open probe slot without recording an outcome."""
+        if probe:
+            with self._lock:
+                self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
     
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to attempt reset."""
         if self.last_failure_time is None:
             return True
-        return (datetime.now() - self.last_failure_time).seconds >= self.config.recovery_timeout
+        return (datetime.now() - self.last_failure_time).total_seconds() >= self.config.recovery_timeout
     
-    def _on_success(self):
+    def _on_success(self, probe: bool = False):
         """Handle successful call."""
-        if self.state == CircuitBreakerState.HALF_OPEN:
-            self.success_count += 1
-            if self.success_count >= self.config.success_threshold:
-                self.state = CircuitBreakerState.CLOSED
+        self._release_probe(probe)
+        with self._lock:
+            if self.state == CircuitBreakerState.HALF_OPEN:
+                self.success_count += 1
+                if self.success_count >= self.config.success_threshold:
+                    self.state = CircuitBreakerState.CLOSED
+                    self.failure_count = 0
+                    self.success_count = 0
+                    self.logger.info(f"Circuit breaker {self.name} reset to CLOSED state")
+            else:
                 self.failure_count = 0
-                self.success_count = 0
-                self.logger.info(f"Circuit breaker {self.name} reset to CLOSED state")
-        else:
-            self.failure_count = 0
     
-    def _on_failure(self):
+    def _on_failure(self, probe: bool = False):
         """Handle failed call."""
-        self.failure_count += 1
-        self.last_failure_time = datetime.now()
-        
-        if self.failure_count >= self.config.failure_threshold:
-            self.state = CircuitBreakerState.OPEN
-            self.logger.warning(f"Circuit breaker {self.name} opened due to {self.failure_count} failures")
+        self._release_probe(probe)
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = datetime.now()
+            
+            if self.state == CircuitBreakerState.HALF_OPEN:
+                # A failed probe reopens the circuit immediately
+                self.state = CircuitBreakerState.OPEN
+                self.success_count = 0
+                self.logger.warning(f"Circuit breaker {self.name} reopened after failed probe")
+            elif self.failure_count >= self.config.failure_threshold:
+                self.state = CircuitBreakerState.OPEN
+                self.logger.warning(f"Circuit breaker {self.name} opened due to {self.failure_count} failures")
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get breaker state and counters for monitoring."""
+        with self._lock:
+            retry_in = None
+            if self.state == CircuitBreakerState.OPEN and self.last_failure_time is not None:
+                elapsed = (datetime.now() - self.last_failure_time).total_seconds()
+                retry_in = max(0.0, self.config.recovery_timeout - elapsed)
+            return {
+                "state": self.state.value,
+                "failure_count": self.failure_count,
+                "success_count": self.success_count,
+                "half_open_in_flight": self.half_open_in_flight,
+                "last_failure_time": self.last_failure_time.isoformat() if self.last_failure_time else None,
+                "retry_in": retry_in,
+                "total_calls": self.total_calls,
+                "rejected_calls": self.rejected_calls,
+                "timeouts": self.timeouts
+            }
 
 
 class CircuitBreakerOpenError(Exception):
@@ -119,6 +223,11 @@ class CircuitBreakerOpenError(Exception):
     pass
 
 
+class CircuitBreakerTimeoutError(Exception):
+    """Exception raised when a call through the circuit breaker times out."""
+    pass
+
+
 class ErrorHandler:
     """Central error handling and recovery system."""
     
@@ -181,8 +290,10 @@ class ErrorHandler:
         if context.retry_count < context.max_retries:
             # Exponential backoff
             wait_time = 2 ** context.retry_count
-            self.logger.info(f"Retrying LLM API call in {wait_time} seconds (attempt {context.retry_count + 1})")
-            time.sleep(wait_time)
+            self.logger.info(f"LLM API call may be retried in {wait_time} seconds (attempt {context.retry_count + 1})")
+            # Advisory only: the caller decides whether and how to wait (the LLM
+            # manager backs off per provider and fails over without waiting);
+            # sleeping here would block the event loop for async callers
             return {"retry": True, "wait_time": wait_time}
         else:
             self.logger.error(f"LLM API failure exceeded max retries for {context.component_name}")
@@ -258,6 +369,10 @@ class ErrorHandler:
             "alert_admin": True
         }
     
+    def get_circuit_breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        """Get detailed state for every registered circuit breaker."""
+        return {name: breaker.get_state() for name, breaker in self.circuit_breakers.items()}
+    
     def get_error_statistics(self) -> Dict[str, Any]:
         """Get error statistics for monitoring."""
         circuit_breaker_states = {
@@ -268,6 +383,7 @@ class ErrorHandler:
         return {
             "error_counts": {cat.value: count for cat, count in self.error_counts.items()},
             "circuit_breaker_states": circuit_breaker_states,
+            "circuit_breakers": self.get_circuit_breaker_states(),
             "total_errors": sum(self.error_counts.values())
         }
 
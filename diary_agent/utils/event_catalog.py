@@ -0,0 +1,94 @@
+"""
+Precompiled event catalogue.
+Compiles the events.json catalogue once into a (category, name) index holding
+each event's detail template and agent type, so validation, detail generation
+and agent dispatch are dictionary lookups instead of per-request substring
+matching.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Tuple
+
+# Ordered (substring, details) rules per category; the first rule whose
+# substring occurs in the event name supplies the event's detail template.
+DetailRules = Mapping[str, Sequence[Tuple[str, Mapping[str, Any]]]]
+
+
+@dataclass(frozen=True)
+class EventSpec:
+    """A catalogued event with its precomputed dispatch data."""
+    category: str
+    name: str
+    agent_type: str
+    detail_template: Mapping[str, Any] = field(default_factory=dict)
+
+    def details(self, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
+        """Fresh event details for one request."""
+        details = {
+            "event_category": self.category,
+            "event_name": self.name,
+            "timestamp": (timestamp or datetime.now()).isoformat(),
+            "auto_generated": True
+        }
+        details.update(self.detail_template)
+        return details
+
+
+def match_detail_template(rules: DetailRules, category: str, name: str) -> Dict[str, Any]:
+    """Detail template for an event name from the category's ordered rules."""
+    for pattern, template in rules.get(category, ()):
+        if pattern in name:
+            return dict(template)
+    return {}
+
+
+class EventCatalog:
+    """Index of catalogued events keyed by (category, name)."""
+
+    def __init__(self, specs: Sequence[EventSpec] = (), default_agent_type: str = "interactive_agent"):
+        self.default_agent_type = default_agent_type
+        self._specs: Dict[Tuple[str, str], EventSpec] = {}
+        self._categories: Dict[str, List[str]] = {}
+        for spec in specs:
+            self._specs[(spec.category, spec.name)] = spec
+            self._categories.setdefault(spec.category, []).append(spec.name)
+
+    @classmethod
+    def compile(cls, events_config: Mapping[str, Sequence[str]], detail_rules: DetailRules,
+                agent_mappings: Mapping[str, str],
+                default_agent_type: str = "interactive_agent") -> "EventCatalog":
+        """
+        Compile an events.json catalogue.
+
+        Args:
+            events_config: Category -> event names, as in events.json
+            detail_rules: Ordered substring rules per category
+            agent_mappings: Category -> agent type
+            default_agent_type: Agent type for unmapped categories
+        """
+        specs = [
+            EventSpec(
+                category=category,
+                name=name,
+                agent_type=agent_mappings.get(category, default_agent_type),
+                detail_template=match_detail_template(detail_rules, category, name)
+            )
+            for category, names in events_config.items()
+            for name in names
+        ]
+        return cls(specs, default_agent_type)
+
+    def get(self, category: str, name: str) -> Optional[EventSpec]:
+        """The catalogued event, or None if it is not in the catalogue."""
+        return self._specs.get((category, name))
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def categories(self) -> Dict[str, List[str]]:
+        """Category -> event names, in catalogue order."""
+        return {category: list(names) for category, names in self._categories.items()}
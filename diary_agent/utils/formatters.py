@@ -91,6 +91,10 @@ class DiaryEntryFormatter:
 class DiaryFormatter:
     """Formatter for diary entries."""
     
+    # Clause boundaries and leading filler words skipped when extracting a title
+    _CLAUSE_SEPARATORS = re.compile(r"[。！？!?；;，,、\n]+")
+    _TITLE_FILLERS = ("今天", "今日", "日记", "标题", "内容")
+    
     @classmethod
     def format_timestamp(cls, timestamp: datetime) -> str:
         """Format timestamp for diary entry."""
@@ -110,6 +114,29 @@ class DiaryFormatter:
             return title
         return title[:max_length-1] + "…"
     
+    @classmethod
+    def extract_title(cls, content: str, max_length: int = 10, default: str = "美好时光") -> str:
+        """
+        Build a short title from the diary text itself, without an LLM call.
+        
+        Uses the first clause with at least two characters left after removing
+        punctuation, emoji and leading filler words, cut to max_length.
+        """
+        for clause in cls._CLAUSE_SEPARATORS.split(content or ""):
+            words = re.sub(r"[^\w\s]+|_", "", clause).split()
+            # Spaces left between Chinese characters (e.g. where an emoji was) are dropped
+            text = re.sub(r"(?<=[\u4e00-\u9fff]) (?=[\u4e00-\u9fff])", "", " ".join(words))
+            stripped = True
+            while stripped:
+                stripped = False
+                for filler in cls._TITLE_FILLERS:
+                    if text.startswith(filler):
+                        text = text[len(filler):].lstrip()
+                        stripped = True
+            if len(text) >= 2:
+                return text[:max_length].rstrip()
+        return default
+    
     @classmethod
     def truncate_content(cls, content: str, max_length: int = 35) -> str:
         """Truncate content to maximum length."""
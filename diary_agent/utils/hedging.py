@@ -0,0 +1,100 @@
+"""
+Request hedging support for LLM calls.
+If the primary provider is slower than a percentile of its observed latency,
+a second request is sent to the next provider and the first answer wins. A
+rolling budget caps how many requests may be hedged.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+
+@dataclass
+class HedgingConfig:
+    """Configuration for hedged requests."""
+    enabled: bool = False  # default for callers that do not pass hedge explicitly
+    latency_percentile: float = 0.95  # hedge once the primary exceeds this percentile
+    min_samples: int = 10  # samples required before the percentile is trusted
+    fallback_delay: float = 8.0  # seconds to wait when there are too few samples
+    min_delay: float = 0.2  # never hedge sooner than this
+    max_hedge_rate: float = 0.1  # share of recent requests that may be hedged
+    budget_window: int = 200  # number of recent requests the budget covers
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "HedgingConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+class HedgeSlot:
+    """One eligible request's place in the budget window."""
+    __slots__ = ("hedged", "in_window")
+
+    def __init__(self):
+        self.hedged = False
+        self.in_window = True
+
+
+class HedgeBudget:
+    """Caps hedges to a share of the most recent eligible requests."""
+
+    def __init__(self, max_rate: float, window: int):
+        self.max_rate = max_rate
+        self._recent = deque()
+        self._window = window
+        self._hedged_in_window = 0
+        self._lock = threading.Lock()
+        self.hedges_fired = 0
+        self.hedges_denied = 0
+
+    def record_request(self) -> HedgeSlot:
+        """Record an eligible request and return its slot for try_acquire()."""
+        slot = HedgeSlot()
+        with self._lock:
+            self._append(slot)
+        return slot
+
+    def try_acquire(self, slot: HedgeSlot) -> bool:
+        """
+        Claim a hedge for the request holding slot if the budget allows it.
+
+        Each request marks its own slot, so concurrent requests recorded in
+        between do not shift the accounting.
+        """
+        with self._lock:
+            # Counting the hedge being requested keeps the rate at or under max_rate
+            if self._hedged_in_window + 1 > self.max_rate * len(self._recent):
+                self.hedges_denied += 1
+                return False
+            if not slot.in_window or slot.hedged:
+                # The request has aged out of the window (or hedges again); count the hedge now
+                slot = HedgeSlot()
+                self._append(slot)
+            slot.hedged = True
+            self._hedged_in_window += 1
+            self.hedges_fired += 1
+            return True
+
+    def _append(self, slot: HedgeSlot):
+        """Add a slot, evicting the oldest beyond the window. Caller holds the lock."""
+        self._recent.append(slot)
+        while len(self._recent) > self._window:
+            evicted = self._recent.popleft()
+            evicted.in_window = False
+            if evicted.hedged:
+                self._hedged_in_window -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budget statistics for monitoring."""
+        with self._lock:
+            recent = len(self._recent)
+            return {
+                "hedges_fired": self.hedges_fired,
+                "hedges_denied": self.hedges_denied,
+                "recent_hedge_rate": self._hedged_in_window / recent if recent else 0.0,
+                "max_hedge_rate": self.max_rate
+            }
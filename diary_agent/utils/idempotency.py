@@ -0,0 +1,294 @@
+"""
+Idempotency keys for non-idempotent API calls.
+A retried request with the same key attaches to the computation still in
+flight or replays its stored response, so a client retrying after a network
+blip does not generate the same diary twice. Completed responses are kept in
+a bounded TTL store, optionally backed by a SQLite file so that all worker
+processes on a host share keys (and in-progress markers).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+
+@dataclass
+class IdempotencyConfig:
+    """Configuration for idempotency keys."""
+    enabled: bool = True
+    ttl_seconds: float = 3600.0             # how long responses for explicit keys are kept
+    # Opt-in: treat identical bodies without a key as retries within this window,
+    # scoped to the client id header below (never to the peer address)
+    fingerprint_ttl_seconds: float = 0.0
+    client_id_header: str = "X-Device-Id"
+    max_entries: int = 10000
+    in_progress_timeout: float = 300.0      # a crashed computation's marker expires after this
+    poll_interval: float = 0.25             # waiting on another process's computation
+    disk_path: Optional[str] = None         # SQLite file shared by worker processes; None keeps keys in memory
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "IdempotencyConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+@dataclass
+class StoredResponse:
+    """A response body and HTTP status kept for replay."""
+    body: Any
+    status: int = 200
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different body."""
+    pass
+
+
+class _Entry:
+    """A key's request fingerprint and its in-flight task or stored response."""
+
+    def __init__(self, fingerprint: str, expires_at: float, task: Optional[asyncio.Task] = None,
+                 response: Optional[StoredResponse] = None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.task = task
+        self.response = response
+
+
+class DiskIdempotencyBackend:
+    """SQLite table of in-progress markers and completed responses."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, response TEXT, "
+            "http_status INTEGER, expires_at REAL NOT NULL)"
+        )
+
+    def claim(self, key: str, fingerprint: str, pending_expires_at: float) -> Tuple[bool, Optional[str], Optional[StoredResponse]]:
+        """
+        Claim a key for computation.
+
+        Returns (claimed, fingerprint, response): claimed is True if this caller
+        must compute; otherwise the existing fingerprint and the stored response
+        (None while the owner is still computing).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM idempotency WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO idempotency (key, fingerprint, expires_at) VALUES (?, ?, ?)",
+                    (key, fingerprint, pending_expires_at)
+                )
+                row = None
+                if cursor.rowcount != 1:
+                    row = self._conn.execute(
+                        "SELECT fingerprint, response, http_status FROM idempotency WHERE key = ?", (key,)
+                    ).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return True, fingerprint, None
+        response = StoredResponse(json.loads(row[1]), row[2]) if row[1] is not None else None
+        return False, row[0], response
+
+    def complete(self, key: str, response: StoredResponse, expires_at: float):
+        """Store the response for a claimed key."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET response = ?, http_status = ?, expires_at = ? WHERE key = ?",
+                (json.dumps(response.body, ensure_ascii=False), response.status, expires_at, key)
+            )
+
+    def release(self, key: str):
+        """Drop a key so the next request computes afresh."""
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def prune(self):
+        """Drop expired keys."""
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),))
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class IdempotencyStore:
+    """Deduplicates requests by key: one computation, replayed to every retry."""
+
+    def __init__(self, config: IdempotencyConfig = None):
+        self.config = config or IdempotencyConfig()
+        self.logger = logging.getLogger("idempotency")
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._disk = DiskIdempotencyBackend(self.config.disk_path) if self.config.disk_path else None
+        self._writes_since_prune = 0
+        self.executions = 0
+        self.replays = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Stable hash of request parts (e.g. endpoint and JSON body)."""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def scope(self, endpoint: str, body: Any, idempotency_key: Optional[str] = None,
+              client_id: Optional[str] = None) -> Optional[Tuple[str, str, Optional[float]]]:
+        """
+        Resolve the dedup scope of a request as (scoped_key, fingerprint, ttl).
+
+        Returns None when the request must not be deduplicated: no key and
+        either the fingerprint fallback is off or the client sent no id.
+        """
+        if not self.enabled or not body:
+            return None
+        fingerprint = self.fingerprint(endpoint, body)
+        if idempotency_key is not None:
+            return self.fingerprint(endpoint, "key", idempotency_key), fingerprint, None
+        if self.config.fingerprint_ttl_seconds > 0 and client_id:
+            scoped_key = self.fingerprint(endpoint, "client", client_id, fingerprint)
+            return scoped_key, fingerprint, self.config.fingerprint_ttl_seconds
+        return None
+
+    async def execute(self, key: str, fingerprint: str,
+                      compute: Callable[[], Awaitable[StoredResponse]],
+                      ttl: Optional[float] = None) -> Tuple[StoredResponse, bool]:
+        """
+        Run compute() once per key and return (response, replayed).
+
+        Responses with a 5xx status, and exceptions, are not stored, so a
+        retry computes again. The computation keeps running if the caller
+        disconnects, so its retry can attach to it.
+
+        Raises:
+            IdempotencyConflict: If the key was used with a different fingerprint
+        """
+        ttl = self.config.ttl_seconds if ttl is None else ttl
+        while True:
+            entry = self._get_entry(key)
+            if entry is not None:
+                self._check_fingerprint(key, entry.fingerprint, fingerprint)
+                self.replays += 1
+                if entry.response is not None:
+                    return entry.response, True
+                return await asyncio.shield(entry.task), True
+
+            if self._disk is None:
+                break
+            claimed, stored_fingerprint, response = await asyncio.to_thread(
+                self._disk.claim, key, fingerprint, time.time() + self.config.in_progress_timeout
+            )
+            if claimed:
+                break
+            self._check_fingerprint(key, stored_fingerprint, fingerprint)
+            if response is not None:
+                self.replays += 1
+                self._remember(key, _Entry(fingerprint, time.time() + ttl, response=response))
+                return response, True
+            # Another process is computing this key; wait for its response or marker expiry
+            await asyncio.sleep(self.config.poll_interval)
+
+        self.executions += 1
+        task = asyncio.get_running_loop().create_task(self._compute(key, compute, ttl))
+        self._remember(key, _Entry(fingerprint, time.time() + self.config.in_progress_timeout, task=task))
+        return await asyncio.shield(task), False
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[StoredResponse]], ttl: float) -> StoredResponse:
+        try:
+            response = await compute()
+        except BaseException:
+            await self._forget(key)
+            raise
+        if response.status >= 500:
+            await self._forget(key)
+            return response
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.response, entry.task, entry.expires_at = response, None, time.time() + ttl
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.complete, key, response, time.time() + ttl)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to persist idempotent response: {e}")
+        return response
+
+    async def _forget(self, key: str):
+        self._entries.pop(key, None)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.release, key)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to release idempotency key: {e}")
+
+    def _get_entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.task is None and entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        # Evict the oldest completed entries; in-flight ones stay until they finish
+        for old_key in list(self._entries):
+            if len(self._entries) <= self.config.max_entries:
+                break
+            if self._entries[old_key].task is None:
+                del self._entries[old_key]
+        self._writes_since_prune += 1
+        if self._disk is not None and self._writes_since_prune >= 100:
+            self._writes_since_prune = 0
+            try:
+                self._disk.prune()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to prune idempotency keys: {e}")
+
+    def _check_fingerprint(self, key: str, stored: str, fingerprint: str):
+        if stored != fingerprint:
+            raise IdempotencyConflict(f"Idempotency key {key[:12]} was used with a different request")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get deduplication statistics for monitoring."""
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "in_flight": sum(1 for entry in self._entries.values() if entry.task is not None),
+            "executions": self.executions,
+            "replays": self.replays,
+            "shared": self._disk is not None
+        }
+
+    def close(self):
+        """Close the disk backend, if any."""
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,397 @@
+"""
+Durable background job queue.
+Jobs are stored in a SQLite (WAL) file so they survive restarts and can be
+shared by all worker processes on one host. A worker claims a job by leasing
+it for the visibility timeout; if the worker dies or hangs, the lease expires
+and the job becomes claimable again. Failed jobs are retried with exponential
+backoff and dead-lettered once they run out of attempts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+TERMINAL_STATUSES = (SUCCEEDED, DEAD)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed."""
+    pass
+
+
+@dataclass
+class JobQueueConfig:
+    """Configuration for the background job queue and its workers."""
+    enabled: bool = True
+    path: str = "data/diary_jobs.sqlite3"
+    workers: int = 2                  # concurrent jobs per process
+    visibility_timeout: float = 180.0  # lease length; also the per-attempt time limit
+    max_attempts: int = 3
+    retry_backoff: float = 2.0        # delay before the first retry, doubled per attempt
+    retry_backoff_max: float = 60.0
+    poll_interval: float = 0.5
+    retention_seconds: float = 86400.0  # finished jobs are purged after this
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "JobQueueConfig":
+        """Build a queue config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt after `attempts` failed ones."""
+        return min(self.retry_backoff_max, self.retry_backoff * (2 ** max(0, attempts - 1)))
+
+
+@dataclass
+class Job:
+    """A queued unit of work and its current state."""
+    job_id: str
+    kind: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    available_at: float
+    lease_expires_at: Optional[float]
+    result: Any
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "next_attempt_at": self.available_at if self.status == QUEUED else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+_COLUMNS = ("job_id, kind, payload, status, attempts, max_attempts, available_at, "
+            "lease_expires_at, result, error, created_at, updated_at")
+
+
+def _row_to_job(row) -> Job:
+    return Job(
+        job_id=row[0],
+        kind=row[1],
+        payload=json.loads(row[2]),
+        status=row[3],
+        attempts=row[4],
+        max_attempts=row[5],
+        available_at=row[6],
+        lease_expires_at=row[7],
+        result=json.loads(row[8]) if row[8] is not None else None,
+        error=row[9],
+        created_at=row[10],
+        updated_at=row[11]
+    )
+
+
+class JobQueue:
+    """SQLite-backed job store with leased claims."""
+
+    def __init__(self, config: JobQueueConfig = None):
+        self.config = config or JobQueueConfig()
+        self.path = Path(self.config.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode so claims can take the write lock up front (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, "
+            "lease_expires_at REAL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at)")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: Optional[int] = None) -> Job:
+        """Persist a new job; it is claimable immediately."""
+        now = time.time()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            payload=payload,
+            status=QUEUED,
+            attempts=0,
+            max_attempts=max_attempts or self.config.max_attempts,
+            available_at=now,
+            lease_expires_at=None,
+            result=None,
+            error=None,
+            created_at=now,
+            updated_at=now
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, 0,
+                 job.max_attempts, now, None, None, None, now, now)
+            )
+        return job
+
+    def claim(self) -> Optional[Job]:
+        """
+        Lease the next available job.
+
+        Jobs whose lease expired are redelivered, or dead-lettered if that was
+        their last attempt. The returned job's `attempts` is the fencing token
+        for complete() and fail().
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts",
+                    (DEAD, "visibility timeout expired", now, RUNNING, now)
+                )
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs "
+                    "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?) "
+                    "ORDER BY available_at, created_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = _row_to_job(row)
+                job.status = RUNNING
+                job.attempts += 1
+                job.lease_expires_at = now + self.config.visibility_timeout
+                job.updated_at = now
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE job_id = ?",
+                    (RUNNING, job.attempts, job.lease_expires_at, now, job.job_id)
+                )
+                self._conn.execute("COMMIT")
+                return job
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def complete(self, job: Job, result: Any) -> bool:
+        """Record a successful attempt; False if the lease was lost to another worker."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires_at = NULL, "
+                "updated_at = ? WHERE job_id = ? AND status = ? AND attempts = ?",
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time(),
+                 job.job_id, RUNNING, job.attempts)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Record a failed attempt.
+
+        Returns the job's new status (queued for a retry, or dead), or None if
+        the lease was lost to another worker.
+        """
+        now = time.time()
+        if retry and job.attempts < job.max_attempts:
+            status, available_at = QUEUED, now + self.config.retry_delay(job.attempts)
+        else:
+            status, available_at = DEAD, job.available_at
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL, "
+                "updated_at = ? WHERE job_id = ? AND status = ? AND attempts = ?",
+                (status, error, available_at, now, job.job_id, RUNNING, job.attempts)
+            )
+            return status if cursor.rowcount == 1 else None
+
+    def retry_dead(self, job_id: str) -> bool:
+        """Move a dead-lettered job back to the queue with a fresh set of attempts."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (QUEUED, now, now, job_id, DEAD)
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Current state of a job, or None if unknown (or purged)."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recently updated jobs, optionally filtered by status."""
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, DEAD)}
+        counts.update(dict(rows))
+        return counts
+
+    def purge(self, older_than: Optional[float] = None) -> int:
+        """Delete finished jobs last updated more than `older_than` seconds ago."""
+        if older_than is None:
+            older_than = self.config.retention_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*TERMINAL_STATUSES, time.time() - older_than)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class JobWorkerPool:
+    """Runs queued jobs on the current event loop with a fixed number of workers."""
+
+    PURGE_INTERVAL = 600.0
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler]):
+        self.queue = queue
+        self.config = queue.config
+        self.handlers = dict(handlers)
+        self.logger = logging.getLogger("job_worker_pool")
+        self._tasks: List[asyncio.Task] = []
+        self._worker_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the workers. Call from the running event loop."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self._worker_prefix}-{n}"))
+            for n in range(max(1, self.config.workers))
+        ]
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are redelivered once their lease expires."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_once(self) -> bool:
+        """Claim and run a single job; False if none was available."""
+        job = await asyncio.to_thread(self.queue.claim)
+        if job is None:
+            return False
+        await self.run_job(job)
+        return True
+
+    async def run_job(self, job: Job):
+        """Run one claimed job and record its outcome."""
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind '{job.kind}'")
+            result = await asyncio.wait_for(handler(job.payload), self.config.visibility_timeout)
+        except asyncio.CancelledError:
+            raise
+        except PermanentJobError as e:
+            status = await asyncio.to_thread(self.queue.fail, job, str(e), False)
+            self.logger.warning(f"Job {job.job_id} failed permanently ({status}): {e}")
+        except Exception as e:
+            error = "attempt timed out" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+            status = await asyncio.to_thread(self.queue.fail, job, error)
+            self.logger.warning(f"Job {job.job_id} attempt {job.attempts}/{job.max_attempts} failed ({status}): {error}")
+        else:
+            if not await asyncio.to_thread(self.queue.complete, job, result):
+                self.logger.warning(f"Job {job.job_id} finished after its lease was lost; result discarded")
+
+    async def _worker(self, worker_id: str):
+        while True:
+            try:
+                if not await self.run_once():
+                    await asyncio.sleep(self.config.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the worker alive through transient store errors (e.g. a locked database)
+                self.logger.error(f"Job worker {worker_id} error: {e}")
+                await asyncio.sleep(self.config.poll_interval)
+
+    async def _purge_loop(self):
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.queue.purge)
+                if purged:
+                    self.logger.info(f"Purged {purged} finished jobs")
+            except Exception as e:
+                self.logger.warning(f"Job purge failed: {e}")
+            await asyncio.sleep(self.PURGE_INTERVAL)
+
+
+async def watch_job(queue: JobQueue, job_id: str, poll_interval: float = 0.5,
+                    timeout: Optional[float] = None) -> AsyncIterator[Job]:
+    """
+    Yield a job's state on every status or attempt change until it finishes.
+
+    Stops silently when the job is unknown or `timeout` seconds pass.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    last = None
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            return
+        if (job.status, job.attempts) != last:
+            last = (job.status, job.attempts)
+            yield job
+        if job.finished or (deadline and time.monotonic() >= deadline):
+            return
+        await asyncio.sleep(poll_interval)
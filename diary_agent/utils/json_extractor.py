@@ -0,0 +1,174 @@
+"""
+Tolerant JSON extraction for LLM replies.
+Models wrap the object they were asked for in <think> blocks, Markdown code
+fences or chatty text, and now and then emit trailing commas or typographic
+quotes. extract_json_object() strips the wrappers, scans once for the
+outermost balanced objects and only repairs a candidate when the strict parse
+fails, so a clean reply costs one parse.
+"""
+
+import re
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .fast_json import loads
+
+_CODE_FENCE = re.compile(r"```[A-Za-z0-9_-]*")
+# Characters that matter while scanning for balanced braces
+_SIGNIFICANT = re.compile(r'[{}"\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# Typographic quotes standing where JSON syntax expects a double quote
+_SMART_QUOTE_OPEN = re.compile(r"([{\[,:]\s*)[“”„‘’]")
+_SMART_QUOTE_CLOSE = re.compile(r"[“”„‘’](\s*[:,}\]])")
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def strip_wrappers(text: str) -> str:
+    """
+    Remove closed <think> blocks and Markdown code fence markers.
+
+    An unterminated <think> is kept because some models put the answer
+    inside it when they run out of tokens.
+    """
+    start = text.find("<think>")
+    while start != -1:
+        end = text.find("</think>", start)
+        if end == -1:
+            break
+        text = text[:start] + text[end + len("</think>"):]
+        start = text.find("<think>", start)
+    if "```" in text:
+        text = _CODE_FENCE.sub("", text)
+    return text
+
+
+def object_spans(text: str, start: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) of each top-level balanced {...} in text[start:].
+
+    Braces inside string literals are ignored. Only brace, quote and
+    backslash characters are visited, so long prose costs one regex scan.
+    """
+    depth = 0
+    in_string = False
+    escaped_until = -1
+    for match in _SIGNIFICANT.finditer(text, start):
+        position = match.start()
+        if position < escaped_until:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                escaped_until = position + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            if depth:
+                in_string = True
+        elif char == "{":
+            if depth == 0:
+                start = position
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, position + 1
+
+
+def repair_json(candidate: str) -> str:
+    """Fix trailing commas and typographic quotes used as JSON delimiters."""
+    candidate = _SMART_QUOTE_OPEN.sub(r'\1"', candidate)
+    candidate = _SMART_QUOTE_CLOSE.sub(r'"\1', candidate)
+    return _TRAILING_COMMA.sub(r"\1", candidate)
+
+
+def validate_schema(data: Any, schema: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Check an object against a JSON schema.
+
+    Supports the subset produced by structured_output: the top-level type,
+    "required" keys and the "type" of each property. Returns error messages
+    (empty when valid).
+    """
+    if not schema:
+        return []
+    if not isinstance(data, dict):
+        return ["not an object"]
+    errors = [f"missing field: {key}" for key in schema.get("required", ()) if key not in data]
+    for key, prop in (schema.get("properties") or {}).items():
+        if key not in data or not isinstance(prop, dict):
+            continue
+        expected = _JSON_TYPES.get(prop.get("type"))
+        value = data[key]
+        if expected is None:
+            continue
+        # bool is an int subclass but never a valid JSON number
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            errors.append(f"wrong type for {key}: expected {prop['type']}")
+    return errors
+
+
+def _parse_object(candidate: str, schema: Optional[Dict[str, Any]], repair: bool) -> Optional[Dict[str, Any]]:
+    try:
+        data = loads(candidate)
+    except ValueError:
+        if not repair:
+            return None
+        try:
+            data = loads(repair_json(candidate))
+        except ValueError:
+            return None
+    if isinstance(data, dict) and not validate_schema(data, schema):
+        return data
+    return None
+
+
+def _extract(text: str, schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    first, last = text.find("{"), text.rfind("}")
+    if first == -1 or last < first:
+        return None
+    # Common case: the widest brace pair is exactly the object
+    widest = text[first:last + 1]
+    data = _parse_object(widest, schema, repair=False)
+    if data is not None:
+        return data
+
+    found = False
+    for start, end in object_spans(text, first):
+        found = True
+        data = _parse_object(text[start:end], schema, repair=True)
+        if data is not None:
+            return data
+    if not found:
+        # Unbalanced (e.g. an unescaped quote inside a value)
+        return _parse_object(widest, schema, repair=True)
+    return None
+
+
+def extract_json_object(text: Optional[str], schema: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extract the JSON object from an LLM reply.
+
+    Args:
+        text: Raw reply text
+        schema: Optional JSON schema the object must satisfy (see validate_schema);
+            objects that do not match are skipped
+
+    Returns:
+        The first matching object, or None if the reply contains none
+    """
+    if not text:
+        return None
+    cleaned = strip_wrappers(text)
+    data = _extract(cleaned, schema)
+    if data is None and cleaned != text:
+        # The only object may sit inside the reasoning block
+        data = _extract(text.replace("```", ""), schema)
+    return data
@@ -0,0 +1,26 @@
+"""
+Deferred imports for optional and heavy subsystems.
+Agent modules pull in their data readers (and through them database drivers
+and HTTP clients), so entry points refer to them by dotted path and import
+them on first use.
+"""
+
+import importlib
+from typing import Any
+
+
+def import_string(path: str) -> Any:
+    """
+    Import an attribute given as "package.module:name".
+
+    Raises:
+        ImportError: If the module or attribute cannot be found
+    """
+    module_name, _, attribute = path.partition(":")
+    module = importlib.import_module(module_name)
+    if not attribute:
+        return module
+    try:
+        return getattr(module, attribute)
+    except AttributeError:
+        raise ImportError(f"{module_name} has no attribute {attribute}") from None
@@ -0,0 +1,215 @@
+"""
+Content-addressed response cache for LLM calls.
+Keeps recent responses in a bounded in-memory LRU with per-entry TTL and can
+optionally persist them to a SQLite file so they survive restarts.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Configuration for the LLM response cache."""
+    enabled: bool = False
+    max_entries: int = 1000
+    ttl_seconds: int = 3600
+    disk_path: Optional[str] = None  # SQLite file; None keeps the cache in memory only
+    disk_max_entries: int = 10000
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ResponseCacheConfig":
+        """Build a cache config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+class DiskCacheBackend:
+    """SQLite-backed persistent store for cached responses."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (value, expires_at) for a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float):
+        """Store an entry, pruning expired and oldest rows periodically."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, value, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        """Drop expired rows and keep at most max_entries of the newest."""
+        self._writes_since_prune = 0
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE cache_key NOT IN ("
+            "SELECT cache_key FROM llm_cache ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        """Remove all persisted entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """Bounded LRU cache of LLM responses with per-entry TTL."""
+
+    def __init__(self, config: ResponseCacheConfig = None):
+        self.config = config or ResponseCacheConfig()
+        self.logger = logging.getLogger("llm_cache")
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk_backend: Optional[DiskCacheBackend] = None
+        if self.config.enabled and self.config.disk_path:
+            self.disk_backend = DiskCacheBackend(self.config.disk_path, self.config.disk_max_entries)
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float,
+                 system_prompt: str, prompt: str, response_format: Optional[str] = None,
+                 response_schema_key: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        Build a content-addressed key for a request.
+
+        Everything that changes the response is part of the key: requests that
+        differ only in output format, schema (its schema_key text) or token limit
+        must not share a cached response.
+        """
+        payload = json.dumps(
+            [provider, model, temperature, system_prompt, prompt,
+             response_format, response_schema_key, max_tokens],
+            ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response, promoting it to most recently used."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.disk_backend is not None:
+            stored = self.disk_backend.get(key)
+            if stored is not None:
+                value, expires_at = stored
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[int] = None):
+        """Cache a response for ttl_seconds (defaults to the configured TTL)."""
+        ttl = self.config.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.disk_backend is not None:
+            try:
+                self.disk_backend.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to persist cached LLM response: {str(e)}")
+
+    def _store(self, key: str, value: str, expires_at: float):
+        """Insert into the in-memory LRU, evicting the oldest entries if full."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all cached responses, including persisted ones."""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_backend is not None:
+            self.disk_backend.clear()
+
+    def close(self):
+        """Release the disk backend, if any."""
+        if self.disk_backend is not None:
+            self.disk_backend.close()
+            self.disk_backend = None
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.config.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "persistent": self.disk_backend is not None
+        }
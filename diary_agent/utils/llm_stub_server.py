@@ -0,0 +1,338 @@
+"""
+Deterministic local stand-in for LLM providers.
+Speaks the OpenAI chat-completions protocol and Ollama's /api/generate and
+/api/chat, with configurable latency, injected 5xx/429 errors, streaming and
+canned JSON diary responses, so throughput and latency benchmarks can run
+offline against the real LLMConfigManager.
+
+Run standalone:
+    python -m diary_agent.utils.llm_stub_server --port 11435 --latency-mean 0.3
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web
+
+from .token_estimator import estimate_tokens
+
+
+DEFAULT_DIARIES: List[Dict[str, Any]] = [
+    {"title": "晴天散步", "content": "今天阳光很好，主人带我去公园散步，我开心得摇尾巴！", "emotion_tags": ["开心快乐"]},
+    {"title": "雨天", "content": "外面一直在下雨，只能待在家里看窗外，有点无聊。", "emotion_tags": ["平静"]},
+    {"title": "新朋友", "content": "今天认识了一个新朋友，我们一起玩了好久，好开心呀。", "emotion_tags": ["兴奋激动"]},
+    {"title": "等主人", "content": "主人很晚才回家，我一直在门口等着，终于等到啦。", "emotion_tags": ["担忧", "开心快乐"]},
+    {"title": "被夸奖", "content": "主人摸摸我的头说我很乖，心里暖暖的，今天真棒！", "emotion_tags": ["骄傲"]},
+]
+
+
+@dataclass
+class StubServerConfig:
+    """Behaviour of the stand-in server."""
+    host: str = "127.0.0.1"
+    port: int = 0  # 0 picks a free port
+    latency_distribution: str = "fixed"  # "fixed", "uniform", "normal" or "lognormal"
+    latency_mean: float = 0.05  # seconds before the first byte
+    latency_stddev: float = 0.0  # spread for uniform (half-width), normal and lognormal
+    error_rate: float = 0.0  # share of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # share of requests answered with HTTP 429
+    retry_after: int = 1  # Retry-After header on 429 responses
+    stream_chunk_chars: int = 4  # characters per streamed chunk
+    stream_chunk_delay: float = 0.005  # seconds between streamed chunks
+    trailing_text: str = ""  # text appended after the JSON diary (to exercise early stop)
+    seed: int = 0
+    responses: List[Dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_DIARIES))
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "StubServerConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+class LLMStubServer:
+    """Asyncio HTTP server imitating OpenAI-compatible and Ollama endpoints."""
+
+    def __init__(self, config: StubServerConfig = None):
+        self.config = config or StubServerConfig()
+        self.logger = logging.getLogger("llm_stub_server")
+        self._runner: Optional[web.AppRunner] = None
+        self._request_index = 0
+        self.base_url: Optional[str] = None
+        self.loaded_models: Dict[str, Any] = {}  # model name -> last keep_alive, as reported by /api/ps
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "completed": 0,
+            "streamed": 0,
+            "errors_injected": 0,
+            "rate_limited": 0,
+            "client_disconnects": 0,
+            "preloads": 0,
+            "structured": 0,  # requests asking for JSON mode or a format schema
+        }
+
+    async def __aenter__(self) -> "LLMStubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle_openai)
+        app.router.add_post("/chat/completions", self._handle_openai)
+        app.router.add_post("/api/generate", self._handle_ollama_generate)
+        app.router.add_post("/api/chat", self._handle_ollama_chat)
+        app.router.add_get("/api/tags", self._handle_ollama_tags)
+        app.router.add_get("/api/ps", self._handle_ollama_ps)
+        app.router.add_get("/stats", self._handle_stats)
+        return app
+
+    async def start(self) -> str:
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{self.config.host}:{port}"
+        self.logger.info(f"LLM stub server listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def provider_config(self, provider_name: str, api_format: str = "openai", **overrides) -> Dict[str, Any]:
+        """Provider entry for llm_configuration.json pointing at this server."""
+        paths = {"openai": "/v1/chat/completions", "ollama_generate": "/api/generate", "ollama_chat": "/api/chat"}
+        entry = {
+            "provider_name": provider_name,
+            "api_endpoint": f"{self.base_url}{paths[api_format]}",
+            "api_key": "stub",
+            "model_name": "stub-model",
+            "api_format": api_format,
+            "max_tokens": 150,
+            "timeout": 30,
+            "retry_attempts": 1,
+        }
+        entry.update(overrides)
+        return entry
+
+    def _begin_request(self, prompt_text: str):
+        """Pick this request's latency, injected failure and canned response."""
+        self.stats["requests"] += 1
+        index = self._request_index
+        self._request_index += 1
+        rng = random.Random(f"{self.config.seed}:{index}")
+
+        failure = None
+        roll = rng.random()
+        if roll < self.config.rate_limit_rate:
+            failure = 429
+        elif roll < self.config.rate_limit_rate + self.config.error_rate:
+            failure = 500
+
+        # Same prompt, same diary: keeps cache and coalescing benchmarks meaningful
+        digest = hashlib.sha256(prompt_text.encode("utf-8")).digest()
+        diary = self.config.responses[digest[0] % len(self.config.responses)]
+        text = json.dumps(diary, ensure_ascii=False) + self.config.trailing_text
+        return self._sample_latency(rng), failure, text
+
+    def _sample_latency(self, rng: random.Random) -> float:
+        mean, spread = self.config.latency_mean, self.config.latency_stddev
+        distribution = self.config.latency_distribution
+        if distribution == "uniform":
+            value = rng.uniform(mean - spread, mean + spread)
+        elif distribution == "normal":
+            value = rng.gauss(mean, spread)
+        elif distribution == "lognormal" and mean > 0:
+            # mu = -sigma^2/2 gives the multiplier a mean of 1, so the mean stays latency_mean
+            sigma = spread / mean
+            value = mean * rng.lognormvariate(-sigma * sigma / 2, sigma)
+        else:
+            value = mean
+        return max(0.0, value)
+
+    def _failure_response(self, status: int) -> web.Response:
+        if status == 429:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                status=429, headers={"Retry-After": str(self.config.retry_after)}
+            )
+        self.stats["errors_injected"] += 1
+        return web.json_response({"error": {"message": "Injected server error"}}, status=500)
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(1, self.config.stream_chunk_chars)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    async def _stream(self, request: web.Request, content_type: str, events: List[bytes]) -> web.StreamResponse:
+        self.stats["streamed"] += 1
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        await response.prepare(request)
+        try:
+            for event in events:
+                await response.write(event)
+                if self.config.stream_chunk_delay > 0:
+                    await asyncio.sleep(self.config.stream_chunk_delay)
+            await response.write_eof()
+        except ConnectionResetError:
+            # Client stopped reading (e.g. early stop after the JSON object closed)
+            self.stats["client_disconnects"] += 1
+            return response
+        except asyncio.CancelledError:
+            self.stats["client_disconnects"] += 1
+            raise
+        self.stats["completed"] += 1
+        return response
+
+    async def _handle_openai(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        if payload.get("response_format"):
+            self.stats["structured"] += 1
+        prompt_text = json.dumps(payload.get("messages") or [], ensure_ascii=False)
+        latency, failure, text = self._begin_request(prompt_text)
+        await asyncio.sleep(latency)
+        if failure:
+            return self._failure_response(failure)
+
+        model = payload.get("model", "stub-model")
+        created = int(time.time())
+        if payload.get("stream"):
+            events = []
+            for chunk in self._chunks(text):
+                event = {"object": "chat.completion.chunk", "model": model, "created": created,
+                         "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                events.append(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                # Like OpenAI, usage comes in a final chunk with no choices
+                event = {"object": "chat.completion.chunk", "model": model, "created": created,
+                         "choices": [], "usage": self._usage(prompt_text, text)}
+                events.append(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            events.append(b"data: [DONE]\n\n")
+            return await self._stream(request, "text/event-stream", events)
+
+        self.stats["completed"] += 1
+        return web.json_response({
+            "object": "chat.completion",
+            "model": model,
+            "created": created,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": self._usage(prompt_text, text)
+        })
+
+    async def _handle_ollama(self, request: web.Request, chat: bool) -> web.StreamResponse:
+        payload = await request.json()
+        model = payload.get("model", "stub-model")
+        if payload.get("keep_alive") in (0, "0", "0s"):
+            self.loaded_models.pop(model, None)
+        else:
+            self.loaded_models[model] = payload.get("keep_alive", "5m")
+
+        # Like Ollama, a request without a prompt or messages only loads the model
+        if (chat and not payload.get("messages")) or (not chat and "prompt" not in payload):
+            self.stats["preloads"] += 1
+            body = {"model": model, "done": True, "done_reason": "load"}
+            body.update({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""})
+            return web.json_response(body)
+
+        if payload.get("format"):
+            self.stats["structured"] += 1
+        prompt_text = json.dumps(payload.get("messages"), ensure_ascii=False) if chat else payload.get("prompt", "")
+        latency, failure, text = self._begin_request(prompt_text)
+        await asyncio.sleep(latency)
+        if failure:
+            return self._failure_response(failure)
+
+        def event(piece: str, done: bool) -> Dict[str, Any]:
+            body = {"model": model, "done": done}
+            if chat:
+                body["message"] = {"role": "assistant", "content": piece}
+            else:
+                body["response"] = piece
+            if done:
+                # Ollama reports usage on the final response
+                usage = self._usage(prompt_text, text)
+                body.update(
+                    prompt_eval_count=usage["prompt_tokens"],
+                    eval_count=usage["completion_tokens"],
+                    eval_duration=int(len(self._chunks(text)) * self.config.stream_chunk_delay * 1e9)
+                )
+            return body
+
+        if payload.get("stream", True):
+            events = [
+                (json.dumps(event(chunk, False), ensure_ascii=False) + "\n").encode("utf-8")
+                for chunk in self._chunks(text)
+            ]
+            events.append((json.dumps(event("", True)) + "\n").encode("utf-8"))
+            return await self._stream(request, "application/x-ndjson", events)
+
+        self.stats["completed"] += 1
+        return web.json_response(event(text, True))
+
+    @staticmethod
+    def _usage(prompt_text: str, text: str) -> Dict[str, int]:
+        prompt_tokens, completion_tokens = estimate_tokens(prompt_text), estimate_tokens(text)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    async def _handle_ollama_generate(self, request: web.Request) -> web.StreamResponse:
+        return await self._handle_ollama(request, chat=False)
+
+    async def _handle_ollama_chat(self, request: web.Request) -> web.StreamResponse:
+        return await self._handle_ollama(request, chat=True)
+
+    async def _handle_ollama_tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": "stub-model", "model": "stub-model"}]})
+
+    async def _handle_ollama_ps(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [
+            {"name": name, "model": name, "keep_alive": keep_alive}
+            for name, keep_alive in self.loaded_models.items()
+        ]})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local LLM provider stand-in for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-distribution", default="fixed",
+                        choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.05)
+    parser.add_argument("--latency-stddev", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = StubServerConfig(
+        host=args.host, port=args.port,
+        latency_distribution=args.latency_distribution,
+        latency_mean=args.latency_mean, latency_stddev=args.latency_stddev,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    )
+    web.run_app(LLMStubServer(config).create_app(), host=config.host, port=config.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Token usage and latency telemetry for LLM provider calls.
+Each HTTP attempt records connect, time-to-first-byte and total time plus the
+token usage reported by the provider; results are aggregated into
+per-provider histograms for tuning max_tokens and routing.
+"""
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+
+DEFAULT_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0]
+DEFAULT_TOKEN_BUCKETS = [16, 32, 64, 96, 128, 160, 200, 256, 384, 512, 1024, 2048]
+
+
+@dataclass
+class TelemetryConfig:
+    """Configuration for LLM telemetry histograms."""
+    enabled: bool = True
+    latency_buckets: List[float] = field(default_factory=lambda: list(DEFAULT_LATENCY_BUCKETS))  # seconds
+    token_buckets: List[int] = field(default_factory=lambda: list(DEFAULT_TOKEN_BUCKETS))
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "TelemetryConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+@dataclass
+class AttemptMetrics:
+    """Timings (seconds) and token usage of one HTTP attempt."""
+    connect: Optional[float] = None  # set only when a new connection was opened
+    connection_reused: bool = False
+    ttfb: Optional[float] = None  # until the response headers arrived
+    total: Optional[float] = None  # until the body was read or the stream closed
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    generation_seconds: Optional[float] = None  # provider-reported generation time (Ollama eval_duration)
+    usage_reported: bool = False  # False when token counts are estimates
+    _started: float = field(default_factory=time.monotonic, repr=False)
+    _connect_started: Optional[float] = field(default=None, repr=False)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def apply_usage(self, usage: Optional[Dict[str, Any]]):
+        """Merge provider-reported usage (from a response or stream event)."""
+        if not usage:
+            return
+        for key in ("prompt_tokens", "completion_tokens", "generation_seconds"):
+            if usage.get(key) is not None:
+                setattr(self, key, usage[key])
+        self.usage_reported = self.completion_tokens is not None
+
+
+async def _on_request_start(session, context, params):
+    metrics = context.trace_request_ctx
+    if isinstance(metrics, AttemptMetrics):
+        metrics._started = time.monotonic()
+
+
+async def _on_connection_create_start(session, context, params):
+    metrics = context.trace_request_ctx
+    if isinstance(metrics, AttemptMetrics):
+        metrics._connect_started = time.monotonic()
+
+
+async def _on_connection_create_end(session, context, params):
+    metrics = context.trace_request_ctx
+    if isinstance(metrics, AttemptMetrics) and metrics._connect_started is not None:
+        metrics.connect = time.monotonic() - metrics._connect_started
+
+
+async def _on_connection_reuseconn(session, context, params):
+    metrics = context.trace_request_ctx
+    if isinstance(metrics, AttemptMetrics):
+        metrics.connection_reused = True
+
+
+async def _on_request_end(session, context, params):
+    metrics = context.trace_request_ctx
+    if isinstance(metrics, AttemptMetrics):
+        metrics.ttfb = metrics.elapsed()
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """
+    Trace hooks filling the AttemptMetrics passed as a request's trace_request_ctx.
+
+    Requests without an AttemptMetrics context are ignored.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles."""
+
+    def __init__(self, buckets: List[float]):
+        self.bounds = sorted(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile (the max for the +Inf bucket)."""
+        if self.count == 0:
+            return None
+        rank = percentile * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {f"<={bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": buckets
+        }
+
+
+class ProviderTelemetry:
+    """Histograms and counters for one provider."""
+
+    def __init__(self, config: TelemetryConfig):
+        self.connect = Histogram(config.latency_buckets)
+        self.ttfb = Histogram(config.latency_buckets)
+        self.total = Histogram(config.latency_buckets)
+        self.prompt_tokens = Histogram(config.token_buckets)
+        self.completion_tokens = Histogram(config.token_buckets)
+        self.successes = 0
+        self.failures = 0
+        self.connections_reused = 0
+        self.estimated_usage = 0  # successes without provider-reported usage
+        self.hit_max_tokens = 0  # completions that used the whole max_tokens budget
+        self.prompt_token_total = 0
+        self.completion_token_total = 0
+        self.generation_seconds_total = 0.0
+        self.generated_token_total = 0  # completion tokens of attempts that reported generation time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "connections_reused": self.connections_reused,
+            "estimated_usage": self.estimated_usage,
+            "hit_max_tokens": self.hit_max_tokens,
+            "prompt_tokens_total": self.prompt_token_total,
+            "completion_tokens_total": self.completion_token_total,
+            "tokens_per_second": (
+                self.generated_token_total / self.generation_seconds_total
+                if self.generation_seconds_total else None
+            ),
+            "latency": {
+                "connect": self.connect.to_dict(),
+                "ttfb": self.ttfb.to_dict(),
+                "total": self.total.to_dict()
+            },
+            "tokens": {
+                "prompt": self.prompt_tokens.to_dict(),
+                "completion": self.completion_tokens.to_dict()
+            }
+        }
+
+
+class LLMTelemetry:
+    """Aggregates AttemptMetrics per provider."""
+
+    def __init__(self, config: TelemetryConfig = None):
+        self.config = config or TelemetryConfig()
+        self._lock = threading.Lock()
+        self._providers: Dict[str, ProviderTelemetry] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def _provider(self, provider_name: str) -> ProviderTelemetry:
+        """Get (or create) a provider's telemetry. Caller holds the lock."""
+        telemetry = self._providers.get(provider_name)
+        if telemetry is None:
+            telemetry = ProviderTelemetry(self.config)
+            self._providers[provider_name] = telemetry
+        return telemetry
+
+    def record(self, provider_name: str, metrics: AttemptMetrics, success: bool = True,
+               max_tokens: Optional[int] = None):
+        """Record one HTTP attempt."""
+        if not self.enabled:
+            return
+        with self._lock:
+            telemetry = self._provider(provider_name)
+            if metrics.connection_reused:
+                telemetry.connections_reused += 1
+            if metrics.connect is not None:
+                telemetry.connect.observe(metrics.connect)
+            if metrics.ttfb is not None:
+                telemetry.ttfb.observe(metrics.ttfb)
+            if not success:
+                telemetry.failures += 1
+                return
+
+            telemetry.successes += 1
+            if metrics.total is not None:
+                telemetry.total.observe(metrics.total)
+            if not metrics.usage_reported:
+                telemetry.estimated_usage += 1
+            if metrics.prompt_tokens is not None:
+                telemetry.prompt_tokens.observe(metrics.prompt_tokens)
+                telemetry.prompt_token_total += metrics.prompt_tokens
+            if metrics.completion_tokens is not None:
+                telemetry.completion_tokens.observe(metrics.completion_tokens)
+                telemetry.completion_token_total += metrics.completion_tokens
+                if max_tokens and metrics.completion_tokens >= max_tokens:
+                    telemetry.hit_max_tokens += 1
+                if metrics.generation_seconds and metrics.usage_reported:
+                    telemetry.generation_seconds_total += metrics.generation_seconds
+                    telemetry.generated_token_total += metrics.completion_tokens
+
+    def get_provider_stats(self, provider_name: str) -> Optional[Dict[str, Any]]:
+        """Get histograms and counters for one provider."""
+        with self._lock:
+            telemetry = self._providers.get(provider_name)
+            return telemetry.to_dict() if telemetry is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get telemetry for all providers."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "providers": {name: telemetry.to_dict() for name, telemetry in self._providers.items()}
+            }
@@ -0,0 +1,212 @@
+"""
+Micro-batching of small JSON generation requests.
+Requests arriving within a short window that share a system prompt are packed
+into one multi-item prompt answered with a JSON array, which is then split and
+validated per item. Items that cannot be recovered from the batch fall back to
+individual calls, so batching only ever saves requests.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, Awaitable, Hashable, List, Optional, Tuple
+
+from .token_estimator import estimate_tokens
+from .json_extractor import validate_schema
+from . import fast_json
+
+
+@dataclass
+class BatchingConfig:
+    """Configuration for micro-batching."""
+    enabled: bool = False
+    max_batch_size: int = 8  # items packed into one provider call
+    max_wait_ms: float = 20.0  # how long the first item waits for others
+    max_batch_tokens: int = 4000  # estimated prompt tokens per packed call
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "BatchingConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+# Set by batch_requests(); tasks started inside the block inherit it
+_batching_requested: contextvars.ContextVar = contextvars.ContextVar("llm_batching_requested", default=False)
+
+
+@contextmanager
+def batch_requests():
+    """Mark LLM requests made inside this block (and tasks it starts) as batchable."""
+    token = _batching_requested.set(True)
+    try:
+        yield
+    finally:
+        _batching_requested.reset(token)
+
+
+def batching_requested() -> bool:
+    """Whether the current context asked for batched requests."""
+    return _batching_requested.get()
+
+
+_BATCH_HEADER = (
+    "下面有{count}个相互独立的请求，请分别完成每一个请求。\n"
+    "只输出一个JSON数组，不要输出其他内容。数组中每个元素是对应请求要求的JSON对象，"
+    "并额外包含字段\"id\"，其值为请求编号（从0开始）。\n"
+)
+
+
+def pack_prompts(prompts: List[str]) -> str:
+    """Combine several prompts into one prompt asking for a JSON array."""
+    parts = [_BATCH_HEADER.format(count=len(prompts))]
+    for index, prompt in enumerate(prompts):
+        parts.append(f"\n### 请求 {index}\n{prompt}\n")
+    return "".join(parts)
+
+
+def split_batch_response(text: str, count: int,
+                         schema: Optional[Dict[str, Any]] = None) -> List[Optional[str]]:
+    """
+    Split a packed response into per-item JSON object texts.
+
+    Items are matched by their "id" field. An item is None when it is missing,
+    duplicated, not a JSON object with at least one field besides the id, or
+    (given a schema) fails validate_schema, so that it is re-issued on its own.
+    """
+    results: List[Optional[str]] = [None] * count
+    start = text.find("[")
+    if start < 0:
+        return results
+    try:
+        items, _ = json.JSONDecoder().raw_decode(text, start)
+    except ValueError:
+        return results
+    if not isinstance(items, list):
+        return results
+
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.pop("id", None)
+        if not isinstance(index, int) or not 0 <= index < count or index in seen or not item:
+            continue
+        seen.add(index)
+        if validate_schema(item, schema):
+            continue
+        results[index] = fast_json.dumps(item)
+    return results
+
+
+@dataclass
+class _PendingBatch:
+    """Items collected for one group while its window is open."""
+    items: List[Tuple[str, asyncio.Future]] = field(default_factory=list)
+    tokens: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Collects prompts per group and hands them to execute() in batches.
+
+    execute(group, prompts) returns one result per prompt; None (or an
+    exception, which fails the whole batch) tells the caller to fall back
+    to an individual request.
+    """
+
+    def __init__(self, config: BatchingConfig,
+                 execute: Callable[[Hashable, List[str]], Awaitable[List[Optional[str]]]]):
+        self.config = config
+        self.execute = execute
+        self.logger = logging.getLogger("micro_batcher")
+        self._lock = threading.Lock()
+        # Futures are bound to their event loop, so batches are keyed per loop
+        self._pending: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _PendingBatch] = {}
+        self._tasks = set()
+        self.batches = 0
+        self.batched_items = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    async def submit(self, group: Hashable, prompt: str) -> Optional[str]:
+        """Queue a prompt and wait for its batched result (None means fall back)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = estimate_tokens(prompt)
+        batch_key = (loop, group)
+
+        with self._lock:
+            batch = self._pending.get(batch_key)
+            if batch is not None and batch.tokens + tokens > self.config.max_batch_tokens:
+                self._flush_locked(batch_key, batch)
+                batch = None
+            if batch is None:
+                batch = _PendingBatch()
+                self._pending[batch_key] = batch
+                batch.timer = loop.call_later(
+                    self.config.max_wait_ms / 1000, self._flush, batch_key, batch
+                )
+            batch.items.append((prompt, future))
+            batch.tokens += tokens
+            if len(batch.items) >= self.config.max_batch_size:
+                self._flush_locked(batch_key, batch)
+
+        return await future
+
+    def _flush(self, batch_key: Tuple[asyncio.AbstractEventLoop, Hashable], batch: _PendingBatch):
+        with self._lock:
+            self._flush_locked(batch_key, batch)
+
+    def _flush_locked(self, batch_key: Tuple[asyncio.AbstractEventLoop, Hashable], batch: _PendingBatch):
+        """Close a batch and start executing it. Caller holds the lock."""
+        if self._pending.get(batch_key) is not batch:
+            return
+        del self._pending[batch_key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        loop, group = batch_key
+        task = loop.create_task(self._run(group, batch.items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Hashable, items: List[Tuple[str, asyncio.Future]]):
+        # Callers that were cancelled while waiting are dropped from the batch
+        live = [(prompt, future) for prompt, future in items if not future.done()]
+        if not live:
+            return
+
+        results: List[Optional[str]] = [None] * len(live)
+        if len(live) > 1:
+            try:
+                results = list(await self.execute(group, [prompt for prompt, _ in live]))
+            except Exception as e:
+                self.logger.warning(f"Batch of {len(live)} failed, falling back to single requests: {e}")
+            with self._lock:
+                self.batches += 1
+                self.batched_items += len(live)
+                self.fallbacks += sum(1 for result in results if result is None)
+
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics for monitoring."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "batches": self.batches,
+                "batched_items": self.batched_items,
+                "average_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+                "fallbacks": self.fallbacks
+            }
@@ -0,0 +1,64 @@
+"""
+Warm-up support for local Ollama models.
+Ollama unloads an idle model after its keep_alive expires (5 minutes by
+default), so the next request pays a multi-second load. These helpers decide
+which providers are Ollama-served and check whether a model is resident.
+"""
+
+import json
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from .response_adapters import resolve_api_format
+
+
+@dataclass
+class OllamaWarmupConfig:
+    """Configuration for preloading and keeping local models warm."""
+    enabled: bool = True
+    keep_alive: Optional[Any] = "30m"  # default for Ollama providers without their own keep_alive
+    warm_up_on_start: bool = True
+    keep_warm_interval: float = 240.0  # seconds between keep-warm pings
+    traffic_window: float = 1800.0  # keep pinging while the last request is at most this old
+    check_resident: bool = True  # health check requires the current Ollama model to be loaded
+    health_check_timeout: float = 5.0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "OllamaWarmupConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+def is_ollama_provider(config) -> bool:
+    """Whether a provider config is served by Ollama."""
+    return resolve_api_format(config) in ("ollama_generate", "ollama_chat")
+
+
+def ollama_base_url(api_endpoint: str) -> str:
+    """Server root for an Ollama endpoint such as http://host:11434/api/generate."""
+    base, separator, _ = api_endpoint.partition("/api/")
+    return base if separator else api_endpoint.rstrip("/")
+
+
+def model_resident(api_endpoint: str, model_name: str, timeout: float = 5.0) -> bool:
+    """
+    Check via /api/ps whether the model is currently loaded.
+
+    Blocking; meant for the health-check thread. Returns False if the server
+    cannot be reached.
+    """
+    try:
+        with urllib.request.urlopen(f"{ollama_base_url(api_endpoint)}/api/ps", timeout=timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return False
+
+    # Ollama reports "qwen3:4b"; a bare "qwen3" in config means "qwen3:latest"
+    wanted = {model_name, model_name if ":" in model_name else f"{model_name}:latest"}
+    return any(
+        model.get("name") in wanted or model.get("model") in wanted
+        for model in data.get("models") or []
+    )
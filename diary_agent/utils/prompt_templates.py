@@ -0,0 +1,189 @@
+"""
+Precompiled prompt templates for sub-agents.
+A user_prompt_template is parsed once into literal and placeholder segments
+and its placeholders are checked when the template is loaded, so rendering a
+prompt per event is a single join. Compiled templates are shared through a
+registry keyed by template hash.
+"""
+
+import hashlib
+import json
+import logging
+import string
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Dict, Any, List, Optional, Mapping
+
+from .data_models import PromptConfig
+
+# Variables BaseSubAgent provides when rendering a user prompt
+PROMPT_VARIABLES = frozenset({
+    "event_name", "event_type", "timestamp", "user_id",
+    "user_profile", "event_details", "environmental_context",
+    "social_context", "emotional_context", "temporal_context",
+    "now_date", "now_time"
+})
+
+_formatter = string.Formatter()
+
+
+def _root_name(field_name: str) -> str:
+    """Variable name of a placeholder such as "user_profile[name]" or "event.attr"."""
+    for index, char in enumerate(field_name):
+        if char in ".[":
+            return field_name[:index]
+    return field_name
+
+
+def _literal_field(field_name: str, conversion: Optional[str], format_spec: str) -> str:
+    """Rebuild the original text of a placeholder that is not a variable."""
+    text = "{" + field_name
+    if conversion:
+        text += "!" + conversion
+    if format_spec:
+        text += ":" + format_spec
+    return text + "}"
+
+
+def template_hash(template: str) -> str:
+    """Stable hash of a template string."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_config_hash(prompt_config: PromptConfig) -> str:
+    """Stable hash of a whole prompt configuration (used to share agents)."""
+    data = json.dumps(asdict(prompt_config), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+class CompiledTemplate:
+    """
+    A parsed user prompt template.
+
+    Placeholders whose name is not an identifier (such as {"title": ...} in a
+    JSON example written with single braces) are kept as literal text instead
+    of failing at render time. Unknown identifier placeholders are reported in
+    `errors` and raise KeyError when rendered.
+    """
+
+    def __init__(self, template: str, known_variables=PROMPT_VARIABLES):
+        self.template = template
+        self.hash = template_hash(template)
+        self.errors: List[str] = []
+        self.fields: List[str] = []
+        # Each segment is either literal text or a (field_name, conversion, format_spec) tuple
+        self._segments: Optional[List[Any]] = []
+
+        try:
+            parsed = list(_formatter.parse(template))
+        except ValueError as e:
+            self.errors.append(f"Unparseable template: {e}")
+            self._segments = None
+            return
+
+        literal = []
+        for literal_text, field_name, format_spec, conversion in parsed:
+            literal.append(literal_text)
+            if field_name is None:
+                continue
+            root = _root_name(field_name)
+            if not root.isidentifier():
+                literal.append(_literal_field(field_name, conversion, format_spec))
+                continue
+            if root not in known_variables:
+                self.errors.append(f"Unknown placeholder: {{{field_name}}}")
+            if literal:
+                self._segments.append("".join(literal))
+                literal = []
+            self._segments.append((field_name, conversion, format_spec or ""))
+            if root not in self.fields:
+                self.fields.append(root)
+        if literal:
+            self._segments.append("".join(literal))
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def uses(self, variable: str) -> bool:
+        """Whether the template references a variable."""
+        return variable in self.fields
+
+    def render(self, variables: Mapping[str, Any]) -> str:
+        """
+        Render the template.
+
+        Raises:
+            KeyError: If a placeholder has no value or the template could not be parsed
+        """
+        if self._segments is None:
+            raise KeyError(self.errors[0])
+        parts = []
+        for segment in self._segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            field_name, conversion, format_spec = segment
+            if field_name in variables:
+                value = variables[field_name]
+            else:
+                value, _ = _formatter.get_field(field_name, (), variables)
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            parts.append(format(value, format_spec))
+        return "".join(parts)
+
+
+class PromptTemplateRegistry:
+    """Compiles each distinct template once and shares the result."""
+
+    def __init__(self, max_templates: int = 256):
+        self.max_templates = max_templates  # least recently used templates are evicted beyond this
+        self._lock = threading.Lock()
+        self._templates: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self.hits = 0
+        self.compilations = 0
+        self.logger = logging.getLogger("prompt_templates")
+
+    def compile(self, template: str) -> CompiledTemplate:
+        """Get the compiled form of a template, compiling it on first use."""
+        key = template_hash(template)
+        with self._lock:
+            compiled = self._templates.get(key)
+            if compiled is not None and compiled.template == template:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return compiled
+
+        compiled = CompiledTemplate(template)
+        for error in compiled.errors:
+            self.logger.warning(f"Prompt template {compiled.hash}: {error}")
+        with self._lock:
+            self._templates[key] = compiled
+            self.compilations += 1
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return compiled
+
+    def validate(self, prompt_config: PromptConfig) -> List[str]:
+        """Compile a prompt configuration's template and return its placeholder errors."""
+        return list(self.compile(prompt_config.user_prompt_template).errors)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "compilations": self.compilations,
+                "hits": self.hits,
+                "invalid": sum(1 for compiled in self._templates.values() if not compiled.valid)
+            }
+
+
+# Global template registry shared by all agents
+template_registry = PromptTemplateRegistry()
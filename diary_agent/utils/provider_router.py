@@ -0,0 +1,141 @@
+"""
+Latency-aware provider routing for LLM requests.
+Tracks an EWMA of latency and error rate per provider and orders candidates by
+expected completion time, sending a small share of traffic to the others so
+their estimates stay fresh.
+"""
+
+import logging
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+
+@dataclass
+class RoutingConfig:
+    """Configuration for adaptive provider routing."""
+    enabled: bool = True
+    ewma_alpha: float = 0.3  # weight of the newest sample
+    exploration_rate: float = 0.05  # share of requests routed to a non-best provider
+    initial_latency: float = 10.0  # seconds assumed for providers without samples
+    max_error_rate: float = 0.95  # caps the retry penalty for failing providers
+    latency_window: int = 100  # successful latencies kept for percentile queries
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "RoutingConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+@dataclass
+class ProviderStats:
+    """Smoothed latency and error observations for one provider."""
+    ewma_latency: Optional[float] = None
+    ewma_error_rate: float = 0.0
+    samples: int = 0
+    failures: int = 0
+    recent_latencies: deque = field(default_factory=deque)
+
+
+class ProviderRouter:
+    """Orders providers by expected completion time with epsilon exploration."""
+
+    def __init__(self, config: RoutingConfig = None, rng: random.Random = None):
+        self.config = config or RoutingConfig()
+        self.logger = logging.getLogger("provider_router")
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, ProviderStats] = {}
+        self.explorations = 0
+
+    def record(self, provider_name: str, latency: float, success: bool):
+        """Record the outcome of one provider attempt."""
+        alpha = self.config.ewma_alpha
+        with self._lock:
+            stats = self.stats.get(provider_name)
+            if stats is None:
+                stats = ProviderStats(recent_latencies=deque(maxlen=self.config.latency_window))
+                self.stats[provider_name] = stats
+            stats.samples += 1
+            if success:
+                stats.recent_latencies.append(latency)
+            else:
+                stats.failures += 1
+            if stats.ewma_latency is None:
+                stats.ewma_latency = latency
+            else:
+                stats.ewma_latency = (1 - alpha) * stats.ewma_latency + alpha * latency
+            stats.ewma_error_rate = (1 - alpha) * stats.ewma_error_rate + alpha * (0.0 if success else 1.0)
+
+    def expected_completion_time(self, provider_name: str) -> float:
+        """
+        Expected seconds until a successful response from this provider.
+
+        Models failures as independent retries, so the latency estimate is
+        scaled by 1 / (1 - error_rate).
+        """
+        stats = self.stats.get(provider_name)
+        if stats is None or stats.ewma_latency is None:
+            return self.config.initial_latency
+        error_rate = min(stats.ewma_error_rate, self.config.max_error_rate)
+        return stats.ewma_latency / (1.0 - error_rate)
+
+    def latency_percentile(self, provider_name: str, percentile: float,
+                           min_samples: int = 1) -> Optional[float]:
+        """
+        Latency at the given percentile (0-1) of recent successful calls.
+
+        Returns None if fewer than min_samples successes have been recorded.
+        """
+        with self._lock:
+            stats = self.stats.get(provider_name)
+            if stats is None or len(stats.recent_latencies) < max(1, min_samples):
+                return None
+            ordered = sorted(stats.recent_latencies)
+        index = min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))
+        return ordered[index]
+
+    def rank(self, candidates: List[str]) -> List[str]:
+        """
+        Order candidate providers for one request.
+
+        Candidates are sorted by expected completion time, ties keeping their
+        incoming (priority) order. With probability exploration_rate a random
+        non-best provider is moved to the front.
+        """
+        if not self.config.enabled or len(candidates) < 2:
+            return list(candidates)
+
+        with self._lock:
+            ranked = sorted(candidates, key=self.expected_completion_time)
+
+            if self._rng.random() < self.config.exploration_rate:
+                explored = self._rng.choice(ranked[1:])
+                ranked.remove(explored)
+                ranked.insert(0, explored)
+                self.explorations += 1
+                self.logger.debug(f"Exploring provider {explored}")
+
+        return ranked
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-provider routing estimates for monitoring."""
+        with self._lock:
+            return {
+                "enabled": self.config.enabled,
+                "explorations": self.explorations,
+                "providers": {
+                    name: {
+                        "ewma_latency": stats.ewma_latency,
+                        "ewma_error_rate": stats.ewma_error_rate,
+                        "expected_completion_time": self.expected_completion_time(name),
+                        "samples": stats.samples,
+                        "failures": stats.failures
+                    }
+                    for name, stats in self.stats.items()
+                }
+            }
@@ -0,0 +1,244 @@
+"""
+Per-provider concurrency and rate limiting for LLM calls.
+Bounds in-flight requests with a FIFO queue and throttles requests/sec and
+tokens/min with token buckets. Excess callers wait up to a bounded time
+instead of failing immediately.
+
+State is guarded by a thread lock rather than asyncio primitives so that a
+single limiter stays valid when callers run on different event loops. Queued
+callers sleep until the bucket deficit is refilled or until they are woken
+(thread-safely, on their own loop) by a release or a change of queue head.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+
+# Seconds the current task has spent waiting for admission, across all limiters
+_queue_wait: contextvars.ContextVar = contextvars.ContextVar("rate_limit_queue_wait", default=0.0)
+
+
+def queue_wait_seconds() -> float:
+    """Total admission wait of the current task, to keep it out of provider latency."""
+    return _queue_wait.get()
+
+
+class RateLimitExceededError(Exception):
+    """Exception raised when a request cannot be admitted within its wait budget."""
+    pass
+
+
+@dataclass
+class RateLimitConfig:
+    """Rate limit configuration for one provider. Zero disables a limit."""
+    max_concurrent: int = 0
+    requests_per_second: float = 0.0
+    tokens_per_minute: int = 0
+    max_queue_wait: float = 30.0  # seconds a request may wait for admission
+    max_queue_size: int = 100
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "RateLimitConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Ticket:
+    """A queued caller and the event that wakes it on its own loop."""
+    __slots__ = ("loop", "wakeup")
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+    def notify(self):
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            # The caller's loop is closed; it is no longer waiting
+            pass
+
+
+class ProviderRateLimiter:
+    """Admission control for a single LLM provider."""
+
+    def __init__(self, name: str, config: RateLimitConfig = None):
+        self.name = name
+        self.config = config or RateLimitConfig()
+        self.logger = logging.getLogger(f"rate_limiter.{name}")
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self.in_flight = 0
+
+        self._request_bucket: Optional[TokenBucket] = None
+        if self.config.requests_per_second > 0:
+            self._request_bucket = TokenBucket(
+                self.config.requests_per_second,
+                max(1.0, self.config.requests_per_second)
+            )
+        self._token_bucket: Optional[TokenBucket] = None
+        if self.config.tokens_per_minute > 0:
+            self._token_bucket = TokenBucket(
+                self.config.tokens_per_minute / 60.0,
+                float(self.config.tokens_per_minute)
+            )
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait_time = 0.0
+
+    @asynccontextmanager
+    async def limit(self, tokens: int = 0):
+        """Hold an admission slot for the duration of the block."""
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait for admission in FIFO order.
+
+        Raises:
+            RateLimitExceededError: If the queue is full or the wait exceeds max_queue_wait
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.config.max_queue_wait
+        ticket = _Ticket()
+
+        with self._lock:
+            if len(self._queue) >= self.config.max_queue_size:
+                self.rejected += 1
+                raise RateLimitExceededError(f"Rate limiter {self.name} queue is full")
+            self._queue.append(ticket)
+
+        try:
+            while True:
+                with self._lock:
+                    # Cleared under the lock, so a wakeup sent after this check is not lost
+                    ticket.wakeup.clear()
+                    wait = self._try_admit(ticket, tokens)
+                    if wait == 0.0:
+                        waited = time.monotonic() - started_at
+                        self.total_wait_time += waited
+                        if waited > 0:
+                            self.queued += 1
+                        _queue_wait.set(_queue_wait.get() + waited)
+                        return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    _queue_wait.set(_queue_wait.get() + time.monotonic() - started_at)
+                    with self._lock:
+                        self.rejected += 1
+                    raise RateLimitExceededError(
+                        f"Rate limiter {self.name} could not admit request within "
+                        f"{self.config.max_queue_wait}s"
+                    )
+                try:
+                    await asyncio.wait_for(
+                        ticket.wakeup.wait(), remaining if wait is None else min(wait, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                if ticket in self._queue:
+                    was_head = self._queue[0] is ticket
+                    self._queue.remove(ticket)
+                    if was_head:
+                        self._notify_head()
+
+    def _try_admit(self, ticket: _Ticket, tokens: int) -> Optional[float]:
+        """
+        Admit the ticket if possible. Caller holds the lock.
+
+        Returns 0.0 when admitted, the seconds until the buckets refill, or None
+        when the ticket must wait to be woken (not at the head of the queue, or
+        all concurrency slots taken).
+        """
+        if self._queue[0] is not ticket:
+            return None
+        if self.config.max_concurrent > 0 and self.in_flight >= self.config.max_concurrent:
+            return None
+
+        now = time.monotonic()
+        wait = 0.0
+        if self._request_bucket is not None:
+            wait = max(wait, self._request_bucket.wait_time(1, now))
+        if self._token_bucket is not None and tokens > 0:
+            wait = max(wait, self._token_bucket.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+
+        if self._request_bucket is not None:
+            self._request_bucket.consume(1)
+        if self._token_bucket is not None and tokens > 0:
+            self._token_bucket.consume(tokens)
+        self._queue.popleft()
+        self.in_flight += 1
+        self.admitted += 1
+        self._notify_head()
+        return 0.0
+
+    def _notify_head(self):
+        """Wake the caller now at the head of the queue. Caller holds the lock."""
+        if self._queue:
+            self._queue[0].notify()
+
+    def release(self):
+        """Release an admission slot."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._notify_head()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics for monitoring."""
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": len(self._queue),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "average_wait": self.total_wait_time / self.admitted if self.admitted else 0.0,
+                "max_concurrent": self.config.max_concurrent,
+                "requests_per_second": self.config.requests_per_second,
+                "tokens_per_minute": self.config.tokens_per_minute
+            }
@@ -0,0 +1,289 @@
+"""
+Wire-format adapters for LLM providers.
+Each adapter maps a (prompt, system_prompt) pair onto one provider protocol
+and extracts the generated text from full and streamed responses, so a single
+HTTP client can serve every provider. New OpenAI-compatible endpoints (vLLM,
+Ollama's /api/chat, ...) only need an "api_format" entry in the config.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+
+@dataclass
+class RequestTemplate:
+    """Static parts of a provider request, built once per provider config."""
+    headers: Dict[str, str]
+    stream_headers: Dict[str, str]
+    skeleton: Dict[str, Any] = field(default_factory=dict)
+
+
+class ResponseAdapter:
+    """OpenAI chat-completions protocol; the base for the other adapters."""
+
+    stream_format = "sse"  # "sse" or "ndjson"
+
+    def build_template(self, config, output_schema: Optional[Dict[str, Any]] = None) -> RequestTemplate:
+        """
+        Prebuild headers and the payload fields that do not depend on the prompt.
+
+        With output_schema the template also constrains the reply to JSON.
+        """
+        headers = self.build_headers(config)
+        skeleton = self.build_skeleton(config)
+        if output_schema is not None:
+            skeleton = self.apply_structured_output(skeleton, output_schema)
+        return RequestTemplate(
+            headers=headers,
+            stream_headers=self.build_stream_headers(config, headers),
+            skeleton=skeleton
+        )
+
+    def build_headers(self, config) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {config.api_key}"
+        }
+
+    def build_stream_headers(self, config, headers: Dict[str, str]) -> Dict[str, str]:
+        return dict(headers, Accept="text/event-stream")
+
+    def build_skeleton(self, config) -> Dict[str, Any]:
+        return {
+            "model": config.model_name,
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature
+        }
+
+    def apply_structured_output(self, skeleton: Dict[str, Any], output_schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the fields that make the provider return a JSON object (JSON mode)."""
+        return dict(skeleton, response_format={"type": "json_object"})
+
+    @staticmethod
+    def build_messages(prompt: str, system_prompt: str) -> List[Dict[str, str]]:
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def build_payload(self, template: RequestTemplate, prompt: str, system_prompt: str,
+                      stream: bool) -> Dict[str, Any]:
+        payload = dict(template.skeleton)
+        payload["messages"] = self.build_messages(prompt, system_prompt)
+        if stream:
+            payload["stream"] = True
+            # Without this, OpenAI-compatible streams carry no token usage
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def build_preload_payload(self, template: RequestTemplate) -> Optional[Dict[str, Any]]:
+        """Payload that loads the model without generating, or None if the protocol has none."""
+        return None
+
+    def parse_response(self, data: Dict[str, Any]) -> str:
+        """Extract the generated text; KeyError/IndexError/TypeError signal a format error."""
+        return data["choices"][0]["message"]["content"].strip()
+
+    def parse_usage(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Token usage reported in a response or stream event, if any.
+
+        Returns a dict with prompt_tokens, completion_tokens and (when the
+        provider reports it) generation_seconds.
+        """
+        usage = data.get("usage")
+        if not usage:
+            return None
+        return {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens")
+        }
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        """Return (text delta, done) for one streamed event."""
+        choices = event.get("choices") or []
+        if not choices:
+            return None, False
+        delta = (choices[0].get("delta") or {}).get("content")
+        return delta, False
+
+
+class OllamaGenerateAdapter(ResponseAdapter):
+    """Ollama /api/generate: a single prompt string, NDJSON streaming."""
+
+    stream_format = "ndjson"
+
+    def build_headers(self, config) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+
+    def build_stream_headers(self, config, headers: Dict[str, str]) -> Dict[str, str]:
+        return headers
+
+    def build_skeleton(self, config) -> Dict[str, Any]:
+        skeleton = {
+            "model": config.model_name,
+            "options": {
+                "num_predict": config.max_tokens,
+                "temperature": config.temperature
+            }
+        }
+        if getattr(config, "keep_alive", None) is not None:
+            skeleton["keep_alive"] = config.keep_alive
+        return skeleton
+
+    def apply_structured_output(self, skeleton: Dict[str, Any], output_schema: Dict[str, Any]) -> Dict[str, Any]:
+        # A schema with properties is enforced as a grammar; otherwise plain JSON mode
+        return dict(skeleton, format=output_schema if output_schema.get("properties") else "json")
+
+    def build_payload(self, template: RequestTemplate, prompt: str, system_prompt: str,
+                      stream: bool) -> Dict[str, Any]:
+        # Combine system and user prompts for Ollama
+        full_prompt = prompt
+        if system_prompt:
+            full_prompt = f"{system_prompt}\n\nUser: {prompt}\nAssistant:"
+        payload = dict(template.skeleton)
+        payload["prompt"] = full_prompt
+        payload["stream"] = stream
+        return payload
+
+    def build_preload_payload(self, template: RequestTemplate) -> Optional[Dict[str, Any]]:
+        # A request without a prompt only loads the model
+        payload = {"model": template.skeleton["model"]}
+        if "keep_alive" in template.skeleton:
+            payload["keep_alive"] = template.skeleton["keep_alive"]
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> str:
+        return data["response"].strip()
+
+    def parse_usage(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Reported on the final (done) response; durations are in nanoseconds
+        if data.get("eval_count") is None:
+            return None
+        eval_duration = data.get("eval_duration")
+        return {
+            "prompt_tokens": data.get("prompt_eval_count"),
+            "completion_tokens": data["eval_count"],
+            "generation_seconds": eval_duration / 1e9 if eval_duration else None
+        }
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        if event.get("error"):
+            raise ValueError(event["error"])
+        return event.get("response"), bool(event.get("done"))
+
+
+class OllamaChatAdapter(OllamaGenerateAdapter):
+    """Ollama /api/chat: chat messages, NDJSON streaming."""
+
+    def build_payload(self, template: RequestTemplate, prompt: str, system_prompt: str,
+                      stream: bool) -> Dict[str, Any]:
+        payload = dict(template.skeleton)
+        payload["messages"] = self.build_messages(prompt, system_prompt)
+        payload["stream"] = stream
+        return payload
+
+    def build_preload_payload(self, template: RequestTemplate) -> Optional[Dict[str, Any]]:
+        payload = super().build_preload_payload(template)
+        payload["messages"] = []
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> str:
+        return data["message"]["content"].strip()
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        if event.get("error"):
+            raise ValueError(event["error"])
+        return (event.get("message") or {}).get("content"), bool(event.get("done"))
+
+
+class DashScopeAdapter(ResponseAdapter):
+    """DashScope native text-generation API (input/parameters/output shape)."""
+
+    def build_stream_headers(self, config, headers: Dict[str, str]) -> Dict[str, str]:
+        return dict(headers, Accept="text/event-stream", **{"X-DashScope-SSE": "enable"})
+
+    def build_skeleton(self, config) -> Dict[str, Any]:
+        return {
+            "model": config.model_name,
+            "parameters": {
+                "max_tokens": config.max_tokens,
+                "temperature": config.temperature,
+                "result_format": "message"
+            }
+        }
+
+    def apply_structured_output(self, skeleton: Dict[str, Any], output_schema: Dict[str, Any]) -> Dict[str, Any]:
+        parameters = dict(skeleton["parameters"], response_format={"type": "json_object"})
+        return dict(skeleton, parameters=parameters)
+
+    def build_payload(self, template: RequestTemplate, prompt: str, system_prompt: str,
+                      stream: bool) -> Dict[str, Any]:
+        payload = dict(template.skeleton)
+        payload["input"] = {"messages": self.build_messages(prompt, system_prompt)}
+        if stream:
+            payload["parameters"] = dict(payload["parameters"], incremental_output=True)
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> str:
+        output = data["output"]
+        if "choices" in output:
+            return output["choices"][0]["message"]["content"].strip()
+        return output["text"].strip()
+
+    def parse_usage(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        usage = data.get("usage")
+        if not usage:
+            return None
+        return {
+            "prompt_tokens": usage.get("input_tokens"),
+            "completion_tokens": usage.get("output_tokens")
+        }
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        output = event.get("output") or {}
+        choices = output.get("choices") or []
+        if choices:
+            return (choices[0].get("message") or {}).get("content"), False
+        return output.get("text"), False
+
+
+RESPONSE_ADAPTERS: Dict[str, ResponseAdapter] = {
+    "openai": ResponseAdapter(),
+    "ollama_generate": OllamaGenerateAdapter(),
+    "ollama_chat": OllamaChatAdapter(),
+    "dashscope": DashScopeAdapter(),
+}
+
+# Providers that predate the api_format setting
+_DEFAULT_FORMATS = {
+    "qwen": "openai",
+    "deepseek": "openai",
+    "zhipu": "openai",
+}
+
+
+def register_adapter(name: str, adapter: ResponseAdapter):
+    """Register an adapter for a custom api_format."""
+    RESPONSE_ADAPTERS[name] = adapter
+
+
+def resolve_api_format(config) -> Optional[str]:
+    """
+    Determine the wire format for a provider config.
+
+    An explicit api_format wins; otherwise it is inferred from the provider
+    name and endpoint. Returns None if it cannot be determined.
+    """
+    api_format = getattr(config, "api_format", None)
+    if api_format:
+        return api_format
+
+    provider_name = config.provider_name.lower()
+    if "ollama" in provider_name or getattr(config, "provider_type", "") == "ollama":
+        return "ollama_chat" if config.api_endpoint.rstrip("/").endswith("/api/chat") else "ollama_generate"
+    return _DEFAULT_FORMATS.get(provider_name)
+
+
+def get_adapter(api_format: str) -> ResponseAdapter:
+    """Look up the adapter for an api_format. Raises KeyError if unknown."""
+    return RESPONSE_ADAPTERS[api_format]
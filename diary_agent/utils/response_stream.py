@@ -0,0 +1,85 @@
+"""
+Incremental HTTP responses for long-running batch endpoints.
+Records are written as NDJSON lines (application/x-ndjson) or Server-Sent
+Events (text/event-stream) as soon as they are produced, so clients can render
+and persist results while the rest of the batch is still running.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Any, AsyncIterator, Callable, Iterator, Optional
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+SSE_MIMETYPE = "text/event-stream"
+
+# Headers that stop proxies (nginx) from buffering the stream
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+logger = logging.getLogger("response_stream")
+
+
+def wants_sse(accept_header: Optional[str], stream_format: Optional[str] = None) -> bool:
+    """Pick SSE when asked for explicitly (format=sse) or via the Accept header."""
+    if stream_format:
+        return stream_format.lower() == "sse"
+    return SSE_MIMETYPE in (accept_header or "")
+
+
+def format_record(record: Dict[str, Any], sse: bool = False) -> str:
+    """Serialize one record as an NDJSON line or an SSE event named after record['type']."""
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+    if sse:
+        return f"event: {record.get('type', 'message')}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+async def stream_records(records: AsyncIterator[Dict[str, Any]], sse: bool = False) -> AsyncIterator[bytes]:
+    """
+    Encode an async record generator as an ASGI streaming body.
+
+    An exception mid-stream ends the body with an error record; if the
+    client disconnects, the server cancels this generator and the records
+    generator is closed with it.
+    """
+    try:
+        async for record in records:
+            yield format_record(record, sse).encode("utf-8")
+    except Exception as e:
+        logger.error(f"Stream aborted: {e}")
+        yield format_record({"type": "error", "error": str(e)}, sse).encode("utf-8")
+    finally:
+        await records.aclose()
+
+
+def iterate_async(make_records: Callable[[], AsyncIterator[Dict[str, Any]]], sse: bool = False) -> Iterator[str]:
+    """
+    Drive an async record generator from a synchronous WSGI response body.
+
+    The generator runs on a private event loop owned by this iterator. If the
+    client disconnects, the WSGI server closes the iterator and the async
+    generator is closed too, cancelling whatever work it still has pending.
+    ASGI apps should return stream_records() instead.
+    """
+    loop = asyncio.new_event_loop()
+    records = make_records()
+    try:
+        while True:
+            try:
+                record = loop.run_until_complete(records.__anext__())
+            except StopAsyncIteration:
+                break
+            yield format_record(record, sse)
+    except Exception as e:
+        logger.error(f"Stream aborted: {e}")
+        yield format_record({"type": "error", "error": str(e)}, sse)
+    finally:
+        try:
+            loop.run_until_complete(records.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
@@ -0,0 +1,159 @@
+"""
+In-flight request coalescing ("single-flight") for async calls.
+Concurrent callers asking for the same key share one upstream execution and
+all receive its result (or its exception).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple
+
+
+@dataclass
+class SingleFlightConfig:
+    """Configuration for request coalescing."""
+    enabled: bool = True
+    max_tracked_keys: int = 1000  # bound on per-key metrics
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "SingleFlightConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+@dataclass
+class KeyStats:
+    """Per-key coalescing counters."""
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+    cancelled: int = 0
+
+
+class _Flight:
+    """A shared upstream execution and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Merges concurrent identical async calls into a single execution."""
+
+    def __init__(self, config: SingleFlightConfig = None):
+        self.config = config or SingleFlightConfig()
+        self.logger = logging.getLogger("single_flight")
+        self._lock = threading.Lock()
+        # Tasks are bound to their event loop, so flights are keyed per loop
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, str], _Flight] = {}
+        self._key_stats: "OrderedDict[str, KeyStats]" = OrderedDict()
+        self.total_calls = 0
+        self.total_executions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable key from request parts."""
+        payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func() once for all concurrent callers with the same key.
+
+        A caller that is cancelled stops waiting without affecting the others;
+        the upstream execution is only cancelled once every caller has gone.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+
+        with self._lock:
+            stats = self._stats_for(key)
+            stats.calls += 1
+            self.total_calls += 1
+
+            flight = self._flights.get(flight_key)
+            if flight is None:
+                flight = _Flight(loop.create_task(func()))
+                self._flights[flight_key] = flight
+                flight.task.add_done_callback(
+                    lambda _task, fk=flight_key, f=flight: self._forget(fk, f)
+                )
+                stats.executions += 1
+                self.total_executions += 1
+            else:
+                stats.coalesced += 1
+                self.logger.debug(f"Coalesced request onto in-flight call {key[:12]}")
+            flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.cancelled():
+                # This caller was cancelled, not the shared execution
+                with self._lock:
+                    stats.cancelled += 1
+                    abandon = flight.waiters == 1 and not flight.task.done()
+                if abandon:
+                    self._forget(flight_key, flight)
+                    flight.task.cancel()
+            raise
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+
+    def _forget(self, flight_key: Tuple[asyncio.AbstractEventLoop, str], flight: _Flight):
+        """Remove a finished or abandoned flight so later calls start fresh."""
+        with self._lock:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+
+    def _stats_for(self, key: str) -> KeyStats:
+        """Get (or create) the bounded per-key counters. Caller holds the lock."""
+        stats = self._key_stats.get(key)
+        if stats is None:
+            stats = KeyStats()
+            self._key_stats[key] = stats
+            while len(self._key_stats) > self.config.max_tracked_keys:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        return stats
+
+    def get_key_stats(self, key: str) -> Optional[KeyStats]:
+        """Get counters for a single key."""
+        return self._key_stats.get(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics for monitoring."""
+        with self._lock:
+            top_keys = sorted(
+                self._key_stats.items(), key=lambda item: item[1].coalesced, reverse=True
+            )[:10]
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._flights),
+                "total_calls": self.total_calls,
+                "total_executions": self.total_executions,
+                "coalesced": self.total_calls - self.total_executions,
+                "top_keys": {
+                    key[:12]: {
+                        "calls": stats.calls,
+                        "executions": stats.executions,
+                        "coalesced": stats.coalesced,
+                        "cancelled": stats.cancelled
+                    }
+                    for key, stats in top_keys
+                }
+            }
@@ -0,0 +1,238 @@
+"""
+Cold-start profiler for the API entry points.
+Imports an entry module in a fresh interpreter under ``python -X importtime``,
+times the import and the first build of selected container services, and
+reports per-module and per-package import cost. A StartupBudget turns the
+report into a pass/fail check for CI.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_BUDGET_PATH = PROJECT_ROOT / "config" / "startup_budget.json"
+
+# "import time:  self [us] | cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+_RESULT_MARKER = "STARTUP_PROFILE_RESULT "
+
+# Runs in the child interpreter; the entry module and services arrive via argv
+_CHILD_CODE = """
+import importlib, json, sys, time
+entry, services = sys.argv[1], sys.argv[2:]
+phases = {}
+started = time.perf_counter()
+importlib.import_module(entry)
+phases["import " + entry] = (time.perf_counter() - started) * 1000
+if services:
+    from diary_agent.core.service_container import get_container
+    container = get_container()
+    for name in services:
+        began = time.perf_counter()
+        container.get(name)
+        phases["init " + name] = (time.perf_counter() - began) * 1000
+phases["total"] = (time.perf_counter() - started) * 1000
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = None
+print("%s" + json.dumps({"phases": phases, "max_rss_kb": rss_kb}), flush=True)
+""" % _RESULT_MARKER
+
+
+@dataclass
+class ImportRecord:
+    """Import cost of one module as reported by -X importtime."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".", 1)[0]
+
+
+@dataclass
+class StartupReport:
+    """Timings of one cold start."""
+    entry: str
+    phases: Dict[str, float]  # milliseconds
+    imports: List[ImportRecord] = field(default_factory=list)
+    max_rss_kb: Optional[int] = None
+
+    @property
+    def import_ms(self) -> float:
+        return self.phases.get(f"import {self.entry}", 0.0)
+
+    @property
+    def total_ms(self) -> float:
+        return self.phases.get("total", 0.0)
+
+    def package_costs(self) -> Dict[str, float]:
+        """Self import time per top-level package in milliseconds, most expensive first."""
+        costs: Dict[str, float] = {}
+        for record in self.imports:
+            costs[record.package] = costs.get(record.package, 0.0) + record.self_us / 1000
+        return dict(sorted(costs.items(), key=lambda item: item[1], reverse=True))
+
+    def slowest_imports(self, limit: int = 15) -> List[ImportRecord]:
+        """Modules with the highest cumulative import time."""
+        return sorted(self.imports, key=lambda record: record.cumulative_us, reverse=True)[:limit]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entry": self.entry,
+            "phases_ms": {name: round(value, 1) for name, value in self.phases.items()},
+            "max_rss_kb": self.max_rss_kb,
+            "packages_ms": {name: round(value, 1) for name, value in list(self.package_costs().items())[:20]},
+            "slowest_imports": [
+                {"module": record.module, "cumulative_ms": round(record.cumulative_us / 1000, 1)}
+                for record in self.slowest_imports()
+            ]
+        }
+
+
+@dataclass
+class StartupBudget:
+    """Cold-start limits; 0 disables a limit."""
+    max_import_ms: float = 0.0
+    max_total_ms: float = 0.0
+    max_rss_mb: float = 0.0
+    # Packages that must not be imported at startup (e.g. optional subsystems)
+    forbidden_imports: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "StartupBudget":
+        """Build a budget from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+    def check(self, report: StartupReport) -> List[str]:
+        """Return budget violations (empty when within budget)."""
+        violations = []
+        if self.max_import_ms and report.import_ms > self.max_import_ms:
+            violations.append(f"import took {report.import_ms:.0f}ms (budget {self.max_import_ms:.0f}ms)")
+        if self.max_total_ms and report.total_ms > self.max_total_ms:
+            violations.append(f"startup took {report.total_ms:.0f}ms (budget {self.max_total_ms:.0f}ms)")
+        if self.max_rss_mb and report.max_rss_kb and report.max_rss_kb / 1024 > self.max_rss_mb:
+            violations.append(f"peak RSS {report.max_rss_kb / 1024:.0f}MB (budget {self.max_rss_mb:.0f}MB)")
+        imported = {record.module for record in report.imports}
+        for module in self.forbidden_imports:
+            if module in imported:
+                violations.append(f"{module} is imported at startup")
+        return violations
+
+
+def parse_importtime(text: str) -> List[ImportRecord]:
+    """Parse the stderr of ``python -X importtime``."""
+    records = []
+    for line in text.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), max(0, len(indent) - 1) // 2))
+    return records
+
+
+def profile_startup(entry: str = "simple_diary_api", services: Sequence[str] = (),
+                    python: str = sys.executable, cwd: Optional[str] = None,
+                    timeout: float = 300.0) -> StartupReport:
+    """
+    Cold-start an entry module in a fresh interpreter and time it.
+
+    Args:
+        entry: Module to import (e.g. "simple_diary_api")
+        services: Container services to build after the import
+        python: Interpreter to run
+        cwd: Working directory (defaults to the project root)
+        timeout: Seconds before the child is killed
+
+    Raises:
+        RuntimeError: If the child interpreter fails
+    """
+    cwd = cwd or str(PROJECT_ROOT)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [cwd, env.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", _CHILD_CODE, entry, *services],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout
+    )
+    result = None
+    for line in completed.stdout.splitlines():
+        if line.startswith(_RESULT_MARKER):
+            result = json.loads(line[len(_RESULT_MARKER):])
+    if completed.returncode != 0 or result is None:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Startup of {entry} failed: " + "\n".join(errors[-20:]))
+    return StartupReport(
+        entry=entry,
+        phases=result["phases"],
+        imports=parse_importtime(completed.stderr),
+        max_rss_kb=result.get("max_rss_kb")
+    )
+
+
+def load_budget(path: Optional[str] = None, entry: Optional[str] = None) -> StartupBudget:
+    """Load the budget for an entry point from the budget file (empty budget if missing)."""
+    path = Path(path) if path else DEFAULT_BUDGET_PATH
+    if not path.exists():
+        return StartupBudget()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return StartupBudget.from_dict(data.get(entry, data.get("default")))
+
+
+def format_report(report: StartupReport, top: int = 15) -> str:
+    """Human-readable summary of a startup report."""
+    lines = [f"Startup profile: {report.entry}"]
+    for name, value in report.phases.items():
+        lines.append(f"  {name:<40}{value:>10.1f} ms")
+    if report.max_rss_kb:
+        lines.append(f"  {'peak RSS':<40}{report.max_rss_kb / 1024:>10.1f} MB")
+    lines.append("Import cost by package (self time):")
+    for package, value in list(report.package_costs().items())[:top]:
+        lines.append(f"  {package:<40}{value:>10.1f} ms")
+    lines.append("Slowest imports (cumulative):")
+    for record in report.slowest_imports(top):
+        lines.append(f"  {record.module:<40}{record.cumulative_us / 1000:>10.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point; exits non-zero when the budget is exceeded."""
+    parser = argparse.ArgumentParser(description="Profile cold start of an API entry point")
+    parser.add_argument("--entry", default="simple_diary_api", help="Module to import")
+    parser.add_argument("--service", action="append", default=[],
+                        help="Container service to build after the import (repeatable)")
+    parser.add_argument("--budget", default=None, help=f"Budget file (default: {DEFAULT_BUDGET_PATH})")
+    parser.add_argument("--no-budget", action="store_true", help="Report only, do not enforce the budget")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile_startup(args.entry, args.service)
+    print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False) if args.json else format_report(report, args.top))
+
+    if args.no_budget:
+        return 0
+    violations = load_budget(args.budget, args.entry).check(report)
+    for violation in violations:
+        print(f"BUDGET EXCEEDED: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Streaming helpers for LLM responses.
+Decodes server-sent events (OpenAI-compatible APIs) and NDJSON (Ollama), and
+parses a JSON object incrementally so callers can act on fields as soon as
+they arrive and stop generation once the object is closed.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, AsyncIterable
+
+
+@dataclass
+class StreamingConfig:
+    """Configuration for streamed JSON generation."""
+    enabled: bool = False
+    early_stop: bool = True  # stop reading once the JSON object is complete
+    usage_drain_timeout: float = 2.0  # after an early stop, wait this long for the usage/done event
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "StreamingConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+async def iter_sse_data(lines: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Yield the data payloads of a server-sent event stream until [DONE]."""
+    async for raw_line in lines:
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield data
+
+
+async def iter_ndjson(lines: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one decoded object per non-empty line of an NDJSON stream."""
+    async for raw_line in lines:
+        line = raw_line.decode("utf-8").strip()
+        if line:
+            yield json.loads(line)
+
+
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for the first JSON object in streamed text.
+
+    Text before the opening brace (prose, code fences) is skipped, and so are
+    <think>...</think> blocks, whose reasoning may contain braces. Top-level
+    string fields are reported as soon as their closing quote arrives, and
+    complete becomes True when the object's closing brace is seen.
+    """
+
+    def __init__(self):
+        self._chars: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = True
+        self._current_key: Optional[str] = None
+        self._in_think = False
+        self._outer_tail = ""  # last characters before the object, to spot tags split across chunks
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+
+    @property
+    def document(self) -> Optional[str]:
+        """The JSON object text once complete, else None."""
+        return "".join(self._chars) if self.complete else None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of text.
+
+        Returns:
+            (key, value) pairs for top-level string fields completed by this chunk
+        """
+        completed: List[Tuple[str, Any]] = []
+        if self.complete:
+            return completed
+
+        for char in chunk:
+            if self._depth == 0:
+                self._outer_tail = (self._outer_tail + char)[-len(_THINK_CLOSE):]
+                if self._in_think:
+                    self._in_think = not self._outer_tail.endswith(_THINK_CLOSE)
+                    continue
+                if self._outer_tail.endswith(_THINK_OPEN):
+                    self._in_think = True
+                    continue
+                if char != "{":
+                    continue
+            self._chars.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._on_top_level_string(completed)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = len(self._chars) - 1
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    break
+            elif self._depth == 1:
+                if char == ",":
+                    self._expect_key = True
+                elif char == ":":
+                    self._expect_key = False
+
+        return completed
+
+    def _on_top_level_string(self, completed: List[Tuple[str, Any]]):
+        """Record a finished key or string value directly inside the object."""
+        try:
+            value = json.loads("".join(self._chars[self._string_start:]))
+        except ValueError:
+            return
+
+        if self._expect_key:
+            self._current_key = value
+        elif self._current_key is not None:
+            self.fields[self._current_key] = value
+            completed.append((self._current_key, value))
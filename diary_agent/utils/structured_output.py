@@ -0,0 +1,73 @@
+"""
+Structured (JSON) output for LLM requests.
+Requests that expect a JSON object ask the provider to constrain generation:
+OpenAI-compatible and DashScope endpoints get JSON mode and Ollama gets the
+expected JSON schema as its grammar-constrained `format`, so replies parse
+without a second round-trip to repair them.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Optional
+
+
+# Schema used when the caller only asks for "some JSON object"
+JSON_OBJECT_SCHEMA: Dict[str, Any] = {"type": "object"}
+
+# PromptConfig.output_format type names -> JSON schema fragments
+_FIELD_SCHEMAS = {
+    "string": {"type": "string"},
+    "str": {"type": "string"},
+    "list": {"type": "array", "items": {"type": "string"}},
+    "array": {"type": "array", "items": {"type": "string"}},
+    "int": {"type": "integer"},
+    "integer": {"type": "integer"},
+    "float": {"type": "number"},
+    "number": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "boolean": {"type": "boolean"},
+    "dict": {"type": "object"},
+    "object": {"type": "object"},
+}
+
+
+@dataclass
+class StructuredOutputConfig:
+    """Configuration for constrained JSON output."""
+    enabled: bool = True
+    use_schema: bool = True  # send the caller's schema where the protocol accepts one (Ollama)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "StructuredOutputConfig":
+        """Build a config from a settings dict, ignoring unknown keys."""
+        data = data or {}
+        known = {key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        return cls(**known)
+
+
+def schema_from_output_format(output_format: Optional[Dict[str, Any]],
+                              required: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build a JSON schema from a prompt's output_format.
+
+    output_format maps field names to type names, e.g.
+    {"title": "string", "emotion_tags": "list"}; unknown type names are
+    treated as strings. Every field is required unless required names the
+    ones that are; the others stay optional properties. Returns None for an
+    empty output_format.
+    """
+    if not output_format:
+        return None
+    properties = {
+        name: dict(_FIELD_SCHEMAS.get(str(type_name).lower(), _FIELD_SCHEMAS["string"]))
+        for name, type_name in output_format.items()
+    }
+    required = list(output_format) if required is None else [name for name in required if name in properties]
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def schema_key(schema: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Stable text form of a schema, for cache keys."""
+    if schema is None:
+        return None
+    return json.dumps(schema, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,30 @@
+"""
+Lightweight token estimation for mixed Chinese/English prompts.
+Used where an exact tokenizer is not available (rate limiting, budgeting).
+"""
+
+import re
+
+# CJK ideographs, CJK punctuation and full-width forms each count as roughly one token
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text.
+
+    Each CJK character counts as one token; the remaining text is split into
+    words and punctuation, with long words counted as one token per 4 chars.
+    """
+    if not text:
+        return 0
+
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    remainder = _CJK_PATTERN.sub(" ", text)
+
+    other_count = 0
+    for piece in _WORD_PATTERN.findall(remainder):
+        other_count += max(1, (len(piece) + 3) // 4)
+
+    return cjk_count + other_count
@@ -6,11 +6,14 @@ from datetime import datetime
 from typing import Dict, Any
 
 from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.json_extractor import extract_json_object
 
 
 class EventExtractionAgent:
-    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json") -> None:
-        self.llm_manager = LLMConfigManager(config_path=llm_config_path)
+    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json",
+                 llm_manager: LLMConfigManager = None) -> None:
+        # Reuse a shared manager when given (see diary_agent.core.service_container)
+        self.llm_manager = llm_manager or LLMConfigManager(config_path=llm_config_path)
         if prompt_path is None:
             prompt_path = Path(__file__).parent / "prompt.json"
         self.prompt = json.loads(Path(prompt_path).read_text(encoding="utf-8"))
@@ -24,9 +27,8 @@ class EventExtractionAgent:
             prompt=user_prompt,
             system_prompt=system_prompt
         )
-        try:
-            data = json.loads(text)
-        except Exception:
+        data = extract_json_object(text)
+        if data is None:
             data = {"summary": text.strip()[:50]}
 
         return {
@@ -6,11 +6,22 @@ from datetime import datetime
 from typing import Dict, Any, List
 
 from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.json_extractor import extract_json_object
+
+
+# Shape of the merge decision the prompt asks for
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {"merged": {"type": "boolean"}},
+    "required": ["merged"]
+}
 
 
 class EventUpdateAgent:
-    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json") -> None:
-        self.llm_manager = LLMConfigManager(config_path=llm_config_path)
+    def __init__(self, prompt_path: str = None, llm_config_path: str = "config/llm_configuration.json",
+                 llm_manager: LLMConfigManager = None) -> None:
+        # Reuse a shared manager when given (see diary_agent.core.service_container)
+        self.llm_manager = llm_manager or LLMConfigManager(config_path=llm_config_path)
         if prompt_path is None:
             prompt_path = Path(__file__).parent / "prompt.json"
         self.prompt = json.loads(Path(prompt_path).read_text(encoding="utf-8"))
@@ -78,9 +89,8 @@ class EventUpdateAgent:
             prompt=user_prompt,
             system_prompt=system_prompt
         )
-        try:
-            data = json.loads(text)
-        except Exception:
+        data = extract_json_object(text, DECISION_SCHEMA)
+        if data is None:
             data = {"merged": False, "merge_reason": text.strip()[:100]}
 
         return {
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+JSON extractor micro-benchmark.
+Times extract_json_object() on typical LLM reply shapes (clean JSON, code
+fences, <think> blocks, chatty prefixes, trailing commas, smart quotes) and
+compares it with the previous json.loads + find('{')/rfind('}') approach.
+
+Usage:
+    python scripts/json_extractor_benchmark.py --iterations 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from diary_agent.utils.json_extractor import extract_json_object
+from diary_agent.utils.structured_output import schema_from_output_format
+
+
+DIARY = '{"title": "晴天", "content": "今天和主人去公园散步，阳光暖暖的，心情特别好。", "emotion_tags": ["开心快乐"]}'
+THINKING = "<think>\n" + "主人想要一篇日记，我先想想今天发生了什么。" * 20 + "\n</think>\n"
+
+SAMPLES = {
+    "clean": DIARY,
+    "code_fence": "```json\n" + DIARY + "\n```",
+    "think_block": THINKING + DIARY,
+    "chatty": "好的，这是今天的日记：\n" + DIARY + "\n希望你喜欢！",
+    "trailing_comma": DIARY[:-1] + ",}",
+    "smart_quotes": DIARY.replace('"title"', "“title”"),
+}
+
+SCHEMA = schema_from_output_format({"title": "string", "content": "string", "emotion_tags": "list"})
+
+
+def legacy_extract(text):
+    """The json.loads + find/rfind fallback the agents used before."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    start, end = text.find('{'), text.rfind('}') + 1
+    if start != -1 and end != 0:
+        try:
+            return json.loads(text[start:end])
+        except ValueError:
+            pass
+    return None
+
+
+def time_per_call(function, text, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(text)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tolerant JSON extraction of LLM replies")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'sample':<16}{'extractor µs':>14}{'legacy µs':>12}  parsed (extractor / legacy)")
+    for name, text in SAMPLES.items():
+        extractor_us = time_per_call(lambda t: extract_json_object(t, SCHEMA), text, args.iterations)
+        legacy_us = time_per_call(legacy_extract, text, args.iterations)
+        parsed = extract_json_object(text, SCHEMA) is not None
+        legacy_parsed = legacy_extract(text) is not None
+        print(f"{name:<16}{extractor_us:>14.2f}{legacy_us:>12.2f}  {parsed} / {legacy_parsed}")
+
+
+if __name__ == "__main__":
+    main()
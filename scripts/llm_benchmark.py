@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Offline LLM pipeline benchmark.
+Starts the local LLM stand-in server, points LLMConfigManager at it and
+reports throughput and latency percentiles for concurrent requests.
+
+Usage:
+    python scripts/llm_benchmark.py --requests 200 --concurrency 20 --latency-mean 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.utils.llm_stub_server import LLMStubServer, StubServerConfig
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_benchmark(args):
+    stub_config = StubServerConfig(
+        latency_distribution=args.latency_distribution,
+        latency_mean=args.latency_mean,
+        latency_stddev=args.latency_stddev,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+
+    async with LLMStubServer(stub_config) as server:
+        config_data = {
+            "providers": {
+                "stub_primary": server.provider_config("stub_primary", args.api_format),
+                "stub_backup": server.provider_config("stub_backup", args.api_format)
+            },
+            "model_selection": {
+                "default_provider": "stub_primary",
+                "performance_settings": {
+                    "streaming": {"enabled": args.stream},
+                    "rate_limits": {"default": {"max_concurrent": 0, "requests_per_second": 0}}
+                }
+            }
+        }
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(config_data, f)
+            config_path = f.name
+
+        manager = LLMConfigManager(config_path)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        failures = 0
+
+        async def one_request(index):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await manager.generate_text_with_failover(
+                        f"请写一篇日记 #{index % args.distinct_prompts}",
+                        use_cache=False,
+                        response_format="json"
+                    )
+                    latencies.append(time.perf_counter() - started)
+                except Exception:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        await manager.close()
+        os.unlink(config_path)
+
+    print(f"requests:    {args.requests} (concurrency {args.concurrency}, {failures} failed)")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 0.5) * 1000:.1f} ms")
+        print(f"latency p95: {percentile(latencies, 0.95) * 1000:.1f} ms")
+        print(f"latency p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"stub server: {server.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLMConfigManager against a local stand-in server")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--distinct-prompts", type=int, default=100)
+    parser.add_argument("--api-format", default="openai", choices=["openai", "ollama_generate", "ollama_chat"])
+    parser.add_argument("--stream", action="store_true", help="Use streamed JSON generation")
+    parser.add_argument("--latency-distribution", default="lognormal",
+                        choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.2)
+    parser.add_argument("--latency-stddev", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Cold-start profile of an API entry point.
+Reports import and service init time per module/package and exits non-zero
+when config/startup_budget.json is exceeded, so CI can catch regressions.
+
+Usage:
+    python scripts/profile_startup.py --entry simple_diary_api
+    python scripts/profile_startup.py --entry simple_diary_api --service llm_manager --service bazi_agent
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from diary_agent.utils.startup_profiler import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
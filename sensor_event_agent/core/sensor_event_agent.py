@@ -20,9 +20,11 @@ sys.path.append(str(parent_dir))
 
 try:
     from core.llm_manager import LLMConfigManager
+    from utils.json_extractor import extract_json_object
 except ImportError:
     try:
         from diary_agent.core.llm_manager import LLMConfigManager
+        from diary_agent.utils.json_extractor import extract_json_object
     except ImportError as e:
         print(f"Failed to import LLMConfigManager: {e}")
         print(f"Diary agent path: {diary_agent_path}")
@@ -32,6 +34,14 @@ except ImportError:
 from .mqtt_handler import MQTTHandler
 
 
+# Shape of the JSON reply the sensor prompt asks for
+DESCRIPTION_SCHEMA = {
+    "type": "object",
+    "properties": {"description": {"type": "string"}},
+    "required": ["description"]
+}
+
+
 class SensorEventAgent:
     """
     Agent for translating sensor events to human language.
@@ -40,13 +50,15 @@ class SensorEventAgent:
     
     def __init__(self, 
                  prompt_config_path: str = None,
-                 llm_config_path: str = None):
+                 llm_config_path: str = None,
+                 llm_manager: LLMConfigManager = None):
         """
         Initialize Sensor Event Agent.
         
         Args:
             prompt_config_path: Path to prompt configuration file
             llm_config_path: Path to LLM configuration file
+            llm_manager: Shared LLM manager to use instead of creating one
         """
         self.logger = logging.getLogger(__name__)
         
@@ -60,7 +72,7 @@ class SensorEventAgent:
         self.prompt_config = self._load_prompt_config(prompt_config_path)
         
         # Initialize components
-        self.llm_manager = LLMConfigManager(config_path=str(llm_config_path))
+        self.llm_manager = llm_manager or LLMConfigManager(config_path=str(llm_config_path))
         self.mqtt_handler = MQTTHandler()
         
         self.logger.info("SensorEventAgent initialized successfully")
@@ -138,27 +150,12 @@ class SensorEventAgent:
             # Clean up the generated text
             clean_text = generated_text.strip()
             
-            # Remove <think> tags and extract actual response
-            if clean_text.startswith('<think>'):
-                thinking_parts = clean_text.split('\n')
-                # Look for JSON-like fragments with "description":
-                for line in thinking_parts:
-                    if '"description"' in line:
-                        json_start = line.find('{')
-                        json_end = line.rfind('}')
-                        if json_start != -1 and json_end != -1 and json_end > json_start:
-                            clean_text = line[json_start:json_end+1]
-                            break
-            
-            # Try various extraction methods
-            try:
-                # Try parsing as JSON
-                response = json.loads(clean_text)
-                description = response.get("description", "").strip()
+            # Extract the JSON reply, also when it only appears inside a <think> block
+            response = extract_json_object(clean_text, DESCRIPTION_SCHEMA)
+            if response is not None:
+                description = response["description"].strip()
                 if description:
                     return description
-            except json.JSONDecodeError:
-                pass
             
             # Look for description pattern
             if '"description"' in clean_text:
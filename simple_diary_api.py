@@ -8,6 +8,12 @@ Returns results only when conditions are met.
 
 import sys
 import os
+
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    # Profile a cold start in a child interpreter before importing anything heavy here
+    from diary_agent.utils.startup_profiler import main as profile_main
+    sys.exit(profile_main([arg for arg in sys.argv[1:] if arg != "--profile-startup"]))
+
 import json
 import asyncio
 import logging
@@ -15,10 +21,13 @@ import random
 import uuid
 import hashlib
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from quart import Quart, Response, request, jsonify, make_response
+from quart_cors import cors
 
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -68,20 +77,18 @@ auth_config = load_auth_config()
 
 # Import the actual agents and configurations
 from diary_agent.core.llm_manager import LLMConfigManager
+from diary_agent.core.service_container import get_container
 from diary_agent.utils.data_models import PromptConfig, EventData, DiaryEntry, DataReader, DiaryContextData
-from diary_agent.agents.interactive_agent import InteractiveAgent
-from diary_agent.agents.dialogue_agent import DialogueAgent
-from diary_agent.agents.neglect_agent import NeglectAgent
-from diary_agent.agents.weather_agent import WeatherAgent, SeasonalAgent
-from diary_agent.agents.trending_agent import TrendingAgent
-from diary_agent.agents.holiday_agent import HolidayAgent
-from diary_agent.agents.friends_agent import FriendsAgent
-from diary_agent.agents.same_frequency_agent import SameFrequencyAgent
-from diary_agent.agents.adoption_agent import AdoptionAgent
-from event_agents.extraction.agent import EventExtractionAgent
-from event_agents.update.agent import EventUpdateAgent
-from bazi_wuxing_agent import BaziWuxingAgent
-from sensor_event_agent.core.sensor_event_agent import SensorEventAgent
+from diary_agent.utils.prompt_templates import prompt_config_hash
+from diary_agent.utils.batch_runner import BatchRunConfig, iter_bounded, run_bounded
+from diary_agent.utils.micro_batcher import batch_requests
+from diary_agent.utils.response_stream import (
+    NDJSON_MIMETYPE, SSE_MIMETYPE, STREAM_HEADERS, stream_records, wants_sse
+)
+from diary_agent.utils.lazy_import import import_string
+from diary_agent.utils.event_catalog import EventCatalog, EventSpec, match_detail_template
+from diary_agent.utils.job_queue import JobQueue, JobQueueConfig, JobWorkerPool, PermanentJobError, watch_job
+from diary_agent.utils.idempotency import IdempotencyConfig, IdempotencyConflict, IdempotencyStore, StoredResponse
 
 # Configure logging
 logging.basicConfig(
@@ -94,9 +101,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
+# Initialize Quart app (ASGI); all views share the server's event loop
+app = cors(Quart(__name__), allow_origin="*")
+# Batch streams may legitimately run longer than Quart's 60s default
+app.config["RESPONSE_TIMEOUT"] = None
 
 class SimpleDataReader(DataReader):
     """Simple data reader for event processing."""
@@ -115,11 +123,230 @@ class SimpleDataReader(DataReader):
             temporal_context={"timestamp": event_data.timestamp.isoformat()}
         )
 
+# Detail templates per category as ordered (substring, details) rules; the
+# first substring found in the event name wins. Compiled once per catalogue
+# entry by EventCatalog.
+EVENT_DETAIL_RULES = {
+    "human_toy_interactive_function": [
+        ("liked_interaction_once", {
+            "interaction_type": "抚摸",
+            "duration": "5分钟",
+            "user_response": "positive",
+            "toy_emotion": "开心",
+            "location": "客厅"
+        }),
+        ("liked_interaction_3_to_5_times", {
+            "interaction_type": "摸摸头",
+            "count": 4,
+            "duration": "20分钟",
+            "user_response": "positive",
+            "toy_emotion": "平静"
+        }),
+        ("liked_interaction_over_5_times", {
+            "interaction_type": "喂食",
+            "count": 7,
+            "duration": "30分钟",
+            "user_response": "positive",
+            "toy_emotion": "开心快乐"
+        }),
+        ("disliked_interaction", {
+            "interaction_type": "拍打",
+            "duration": "2分钟",
+            "user_response": "negative",
+            "toy_emotion": "害怕"
+        }),
+        ("neutral_interaction", {
+            "interaction_type": "触摸",
+            "duration": "10分钟",
+            "user_response": "neutral",
+            "toy_emotion": "平静"
+        })
+    ],
+    "human_toy_talk": [
+        ("positive_emotional_dialogue", {
+            "dialogue_type": "开心对话",
+            "content": "主人今天心情很好",
+            "duration": "10分钟",
+            "toy_emotion": "开心快乐"
+        }),
+        ("negative_emotional_dialogue", {
+            "dialogue_type": "安慰对话",
+            "content": "主人需要安慰",
+            "duration": "15分钟",
+            "toy_emotion": "平静"
+        })
+    ],
+    "unkeep_interactive": [
+        ("neglect_1_day_no_dialogue", {
+            "neglect_duration": 1,
+            "neglect_type": "no_dialogue",
+            "disconnection_type": "无对话有互动",
+            "disconnection_days": 1,
+            "memory_status": "on"
+        }),
+        ("neglect_1_day_no_interaction", {
+            "neglect_duration": 1,
+            "neglect_type": "no_interaction",
+            "disconnection_type": "完全无互动",
+            "disconnection_days": 1,
+            "memory_status": "on"
+        }),
+        ("neglect_3_days", {
+            "neglect_duration": 3,
+            "neglect_type": "no_interaction",
+            "disconnection_type": "完全无互动",
+            "disconnection_days": 3,
+            "memory_status": "on"
+        }),
+        ("neglect_7_days", {
+            "neglect_duration": 7,
+            "neglect_type": "no_dialogue",
+            "disconnection_type": "无对话有互动",
+            "disconnection_days": 7,
+            "memory_status": "on"
+        }),
+        ("neglect_15_days", {
+            "neglect_duration": 15,
+            "neglect_type": "no_interaction",
+            "disconnection_type": "完全无互动",
+            "disconnection_days": 15,
+            "memory_status": "on"
+        }),
+        ("neglect_30_days", {
+            "neglect_duration": 30,
+            "neglect_type": "no_interaction",
+            "disconnection_type": "完全无互动",
+            "disconnection_days": 30,
+            "memory_status": "on"
+        })
+    ],
+    "weather_events": [
+        ("favorite_weather", {
+            "city": "北京",
+            "weather_type": "晴天",
+            "temperature": "22°C",
+            "user_preference": "喜欢",
+            "toy_emotion": "开心"
+        }),
+        ("dislike_weather", {
+            "city": "北京",
+            "weather_type": "雨天",
+            "temperature": "18°C",
+            "user_preference": "不喜欢",
+            "toy_emotion": "平静"
+        })
+    ],
+    "seasonal_events": [
+        ("favorite_season", {
+            "city": "北京",
+            "season": "春季",
+            "temperature": "20°C",
+            "user_preference": "喜欢",
+            "toy_emotion": "开心"
+        }),
+        ("dislike_season", {
+            "city": "北京",
+            "season": "冬季",
+            "temperature": "-5°C",
+            "user_preference": "不喜欢",
+            "toy_emotion": "平静"
+        })
+    ],
+    "trending_events": [
+        ("celebration", {
+            "event_type": "庆祝事件",
+            "impact_level": "positive",
+            "toy_emotion": "开心",
+            "description": "重大庆祝活动"
+        }),
+        ("disaster", {
+            "event_type": "灾难事件",
+            "impact_level": "negative",
+            "toy_emotion": "担心",
+            "description": "重大灾难事件"
+        })
+    ],
+    "holiday_events": [
+        ("approaching_holiday", {
+            "holiday_name": "春节",
+            "time_description": "春节前3天",
+            "festivity_level": "high",
+            "toy_emotion": "期待"
+        }),
+        ("during_holiday", {
+            "holiday_name": "春节",
+            "time_description": "春节第2天",
+            "festivity_level": "high",
+            "toy_emotion": "开心"
+        }),
+        ("holiday_ends", {
+            "holiday_name": "春节",
+            "time_description": "春节后1天",
+            "festivity_level": "medium",
+            "toy_emotion": "平静"
+        })
+    ],
+    "friends_function": [
+        ("made_new_friend", {
+            "friend_action": "新朋友",
+            "relationship_type": "new",
+            "toy_emotion": "开心",
+            "interaction_level": "high"
+        }),
+        ("friend_deleted", {
+            "friend_action": "删除朋友",
+            "relationship_type": "deleted",
+            "toy_emotion": "难过",
+            "interaction_level": "none"
+        }),
+        ("liked_single", {
+            "friend_action": "单次点赞",
+            "interaction_count": 1,
+            "toy_emotion": "开心",
+            "interaction_type": "like"
+        }),
+        ("liked_3_to_5", {
+            "friend_action": "多次点赞",
+            "interaction_count": 4,
+            "toy_emotion": "开心",
+            "interaction_type": "like"
+        }),
+        ("liked_5_plus", {
+            "friend_action": "大量点赞",
+            "interaction_count": 7,
+            "toy_emotion": "开心快乐",
+            "interaction_type": "like"
+        }),
+        ("disliked", {
+            "friend_action": "不喜欢",
+            "interaction_type": "dislike",
+            "toy_emotion": "难过",
+            "interaction_count": 1
+        })
+    ],
+    "same_frequency": [
+        ("close_friend_frequency", {
+            "frequency_type": "同频",
+            "friend_name": "好友",
+            "interaction_level": "high",
+            "toy_emotion": "开心"
+        })
+    ],
+    "adopted_function": [
+        ("toy_claimed", {
+            "claim_type": "绑定",
+            "owner_info": "新主人",
+            "toy_emotion": "开心",
+            "relationship_status": "claimed"
+        })
+    ]
+}
+
 class SimpleDiaryManager:
     """Simple diary manager that processes events from events.json."""
     
-    def __init__(self):
-        self.llm_config_manager = LLMConfigManager()
+    def __init__(self, llm_config_manager: LLMConfigManager = None):
+        self.llm_config_manager = llm_config_manager or LLMConfigManager()
         self.data_reader = SimpleDataReader()
         self.events_config = self._load_events_config()
         
@@ -140,68 +367,22 @@ class SimpleDiaryManager:
             }
         )
         
-        # Initialize agents
-        self.interactive_agent = InteractiveAgent(
-            agent_type="interactive_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.dialogue_agent = DialogueAgent(
-            agent_type="dialogue_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.neglect_agent = NeglectAgent(
-            agent_type="neglect_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        # Additional sub-agents
-        self.weather_agent = WeatherAgent(
-            agent_type="weather_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.season_agent = SeasonalAgent(
-            agent_type="season_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.trending_agent = TrendingAgent(
-            agent_type="trending_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.holiday_agent = HolidayAgent(
-            agent_type="holiday_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.friends_agent = FriendsAgent(
-            agent_type="friends_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.frequency_agent = SameFrequencyAgent(
-            agent_type="frequency_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
-        self.adopted_agent = AdoptionAgent(
-            agent_type="adoption_agent",
-            prompt_config=self.prompt_config,
-            llm_manager=self.llm_config_manager,
-            data_reader=self.data_reader
-        )
+        # Sub-agents are built on first use and shared by all requests
+        # (class path, agent_type); agent modules are imported with the agent
+        self.agent_classes = {
+            "interactive_agent": ("diary_agent.agents.interactive_agent:InteractiveAgent", "interactive_agent"),
+            "dialogue_agent": ("diary_agent.agents.dialogue_agent:DialogueAgent", "dialogue_agent"),
+            "neglect_agent": ("diary_agent.agents.neglect_agent:NeglectAgent", "neglect_agent"),
+            "weather_agent": ("diary_agent.agents.weather_agent:WeatherAgent", "weather_agent"),
+            "season_agent": ("diary_agent.agents.weather_agent:SeasonalAgent", "season_agent"),
+            "trending_agent": ("diary_agent.agents.trending_agent:TrendingAgent", "trending_agent"),
+            "holiday_agent": ("diary_agent.agents.holiday_agent:HolidayAgent", "holiday_agent"),
+            "friends_agent": ("diary_agent.agents.friends_agent:FriendsAgent", "friends_agent"),
+            "frequency_agent": ("diary_agent.agents.same_frequency_agent:SameFrequencyAgent", "frequency_agent"),
+            "adopted_agent": ("diary_agent.agents.adoption_agent:AdoptionAgent", "adoption_agent")
+        }
+        self._agents: Dict[str, Any] = {}
+        self._agents_lock = threading.Lock()
         
         # Event type mappings based on events.json
         self.event_type_mappings = {
@@ -216,6 +397,84 @@ class SimpleDiaryManager:
             "human_toy_talk": "dialogue_agent",
             "unkeep_interactive": "neglect_agent"
         }
+        
+        # events.json compiled once: (category, name) -> detail template and agent type
+        self.event_catalog = EventCatalog.compile(
+            self.events_config, EVENT_DETAIL_RULES, self.event_type_mappings
+        )
+        
+        # Agents built for custom prompts, keyed by (sub_agent, prompt hash) and reused across requests
+        self._custom_agents: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.max_custom_agents = 64
+        
+        # Fan-out and timeouts for /api/diary/batch-process
+        self.batch_config = BatchRunConfig.from_dict(
+            self.llm_config_manager.performance_settings.get("batch_processing")
+        )
+        
+        # Background jobs for /api/diary/jobs
+        self.job_config = JobQueueConfig.from_dict(
+            self.llm_config_manager.performance_settings.get("job_queue")
+        )
+        if not os.path.isabs(self.job_config.path):
+            self.job_config.path = os.path.join(os.path.dirname(os.path.abspath(__file__)), self.job_config.path)
+        
+        # Idempotency-Key handling for /api/diary/process and /api/diary/process-custom
+        self.idempotency_config = IdempotencyConfig.from_dict(
+            self.llm_config_manager.performance_settings.get("idempotency")
+        )
+        disk_path = self.idempotency_config.disk_path
+        if disk_path and not os.path.isabs(disk_path):
+            self.idempotency_config.disk_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), disk_path)
+    
+    def get_agent(self, agent_type: str):
+        """Get the shared sub-agent for an agent type, creating it on first use."""
+        if agent_type not in self.agent_classes:
+            # Use interactive agent as default
+            agent_type = "interactive_agent"
+        agent = self._agents.get(agent_type)
+        if agent is not None:
+            return agent
+        with self._agents_lock:
+            agent = self._agents.get(agent_type)
+            if agent is None:
+                class_path, agent_name = self.agent_classes[agent_type]
+                agent = import_string(class_path)(
+                    agent_type=agent_name,
+                    prompt_config=self.prompt_config,
+                    llm_manager=self.llm_config_manager,
+                    data_reader=self.data_reader
+                )
+                self._agents[agent_type] = agent
+            return agent
+    
+    def _get_custom_prompt_agent(self, sub_agent: str, prompt_config: PromptConfig):
+        """Get a cached agent for a custom prompt, creating it on first use."""
+        sub_agent_types = {
+            "interactive": "interactive_agent",
+            "dialogue": "dialogue_agent",
+            "neglect": "neglect_agent"
+        }
+        # Use interactive agent as default
+        agent_type = sub_agent_types.get(sub_agent, "interactive_agent")
+        class_path = self.agent_classes[agent_type][0]
+        
+        key = (agent_type, prompt_config_hash(prompt_config))
+        agent = self._custom_agents.get(key)
+        if agent is not None:
+            self._custom_agents.move_to_end(key)
+            return agent
+        
+        agent = import_string(class_path)(
+            agent_type=agent_type,
+            prompt_config=prompt_config,
+            llm_manager=self.llm_config_manager,
+            data_reader=self.data_reader
+        )
+        self._custom_agents[key] = agent
+        while len(self._custom_agents) > self.max_custom_agents:
+            self._custom_agents.popitem(last=False)
+        return agent
     
     def _load_events_config(self) -> Dict:
         """Load events configuration from events.json."""
@@ -233,10 +492,7 @@ class SimpleDiaryManager:
     
     def validate_event(self, event_category: str, event_name: str) -> bool:
         """Validate if event exists in events.json."""
-        if event_category not in self.events_config:
-            return False
-        
-        return event_name in self.events_config[event_category]
+        return (event_category, event_name) in self.event_catalog
     
     def should_generate_diary(self, event_category: str, event_name: str) -> bool:
         """Determine if diary should be generated for this event."""
@@ -245,258 +501,16 @@ class SimpleDiaryManager:
     
     def generate_event_details(self, event_category: str, event_name: str) -> Dict[str, Any]:
         """Auto-generate event details based on event category and name."""
-        base_details = {
-            "event_category": event_category,
-            "event_name": event_name,
-            "timestamp": datetime.now().isoformat(),
-            "auto_generated": True
-        }
-        
-        # Add specific details based on event category
-        if event_category == "human_toy_interactive_function":
-            if "liked_interaction_once" in event_name:
-                base_details.update({
-                    "interaction_type": "抚摸",
-                    "duration": "5分钟",
-                    "user_response": "positive",
-                    "toy_emotion": "开心",
-                    "location": "客厅"
-                })
-            elif "liked_interaction_3_to_5_times" in event_name:
-                base_details.update({
-                    "interaction_type": "摸摸头",
-                    "count": 4,
-                    "duration": "20分钟",
-                    "user_response": "positive",
-                    "toy_emotion": "平静"
-                })
-            elif "liked_interaction_over_5_times" in event_name:
-                base_details.update({
-                    "interaction_type": "喂食",
-                    "count": 7,
-                    "duration": "30分钟",
-                    "user_response": "positive",
-                    "toy_emotion": "开心快乐"
-                })
-            elif "disliked_interaction" in event_name:
-                base_details.update({
-                    "interaction_type": "拍打",
-                    "duration": "2分钟",
-                    "user_response": "negative",
-                    "toy_emotion": "害怕"
-                })
-            elif "neutral_interaction" in event_name:
-                base_details.update({
-                    "interaction_type": "触摸",
-                    "duration": "10分钟",
-                    "user_response": "neutral",
-                    "toy_emotion": "平静"
-                })
-        
-        elif event_category == "human_toy_talk":
-            if "positive_emotional_dialogue" in event_name:
-                base_details.update({
-                    "dialogue_type": "开心对话",
-                    "content": "主人今天心情很好",
-                    "duration": "10分钟",
-                    "toy_emotion": "开心快乐"
-                })
-            elif "negative_emotional_dialogue" in event_name:
-                base_details.update({
-                    "dialogue_type": "安慰对话",
-                    "content": "主人需要安慰",
-                    "duration": "15分钟",
-                    "toy_emotion": "平静"
-                })
-        
-        elif event_category == "unkeep_interactive":
-            if "neglect_1_day_no_dialogue" in event_name:
-                base_details.update({
-                    "neglect_duration": 1,
-                    "neglect_type": "no_dialogue",
-                    "disconnection_type": "无对话有互动",
-                    "disconnection_days": 1,
-                    "memory_status": "on"
-                })
-            elif "neglect_1_day_no_interaction" in event_name:
-                base_details.update({
-                    "neglect_duration": 1,
-                    "neglect_type": "no_interaction",
-                    "disconnection_type": "完全无互动",
-                    "disconnection_days": 1,
-                    "memory_status": "on"
-                })
-            elif "neglect_3_days" in event_name:
-                base_details.update({
-                    "neglect_duration": 3,
-                    "neglect_type": "no_interaction",
-                    "disconnection_type": "完全无互动",
-                    "disconnection_days": 3,
-                    "memory_status": "on"
-                })
-            elif "neglect_7_days" in event_name:
-                base_details.update({
-                    "neglect_duration": 7,
-                    "neglect_type": "no_dialogue",
-                    "disconnection_type": "无对话有互动",
-                    "disconnection_days": 7,
-                    "memory_status": "on"
-                })
-            elif "neglect_15_days" in event_name:
-                base_details.update({
-                    "neglect_duration": 15,
-                    "neglect_type": "no_interaction",
-                    "disconnection_type": "完全无互动",
-                    "disconnection_days": 15,
-                    "memory_status": "on"
-                })
-            elif "neglect_30_days" in event_name:
-                base_details.update({
-                    "neglect_duration": 30,
-                    "neglect_type": "no_interaction",
-                    "disconnection_type": "完全无互动",
-                    "disconnection_days": 30,
-                    "memory_status": "on"
-                })
-        
-        elif event_category == "weather_events":
-            if "favorite_weather" in event_name:
-                base_details.update({
-                    "city": "北京",
-                    "weather_type": "晴天",
-                    "temperature": "22°C",
-                    "user_preference": "喜欢",
-                    "toy_emotion": "开心"
-                })
-            elif "dislike_weather" in event_name:
-                base_details.update({
-                    "city": "北京",
-                    "weather_type": "雨天",
-                    "temperature": "18°C",
-                    "user_preference": "不喜欢",
-                    "toy_emotion": "平静"
-                })
-        
-        elif event_category == "seasonal_events":
-            if "favorite_season" in event_name:
-                base_details.update({
-                    "city": "北京",
-                    "season": "春季",
-                    "temperature": "20°C",
-                    "user_preference": "喜欢",
-                    "toy_emotion": "开心"
-                })
-            elif "dislike_season" in event_name:
-                base_details.update({
-                    "city": "北京",
-                    "season": "冬季",
-                    "temperature": "-5°C",
-                    "user_preference": "不喜欢",
-                    "toy_emotion": "平静"
-                })
-        
-        elif event_category == "trending_events":
-            if "celebration" in event_name:
-                base_details.update({
-                    "event_type": "庆祝事件",
-                    "impact_level": "positive",
-                    "toy_emotion": "开心",
-                    "description": "重大庆祝活动"
-                })
-            elif "disaster" in event_name:
-                base_details.update({
-                    "event_type": "灾难事件",
-                    "impact_level": "negative",
-                    "toy_emotion": "担心",
-                    "description": "重大灾难事件"
-                })
-        
-        elif event_category == "holiday_events":
-            if "approaching_holiday" in event_name:
-                base_details.update({
-                    "holiday_name": "春节",
-                    "time_description": "春节前3天",
-                    "festivity_level": "high",
-                    "toy_emotion": "期待"
-                })
-            elif "during_holiday" in event_name:
-                base_details.update({
-                    "holiday_name": "春节",
-                    "time_description": "春节第2天",
-                    "festivity_level": "high",
-                    "toy_emotion": "开心"
-                })
-            elif "holiday_ends" in event_name:
-                base_details.update({
-                    "holiday_name": "春节",
-                    "time_description": "春节后1天",
-                    "festivity_level": "medium",
-                    "toy_emotion": "平静"
-                })
-        
-        elif event_category == "friends_function":
-            if "made_new_friend" in event_name:
-                base_details.update({
-                    "friend_action": "新朋友",
-                    "relationship_type": "new",
-                    "toy_emotion": "开心",
-                    "interaction_level": "high"
-                })
-            elif "friend_deleted" in event_name:
-                base_details.update({
-                    "friend_action": "删除朋友",
-                    "relationship_type": "deleted",
-                    "toy_emotion": "难过",
-                    "interaction_level": "none"
-                })
-            elif "liked_single" in event_name:
-                base_details.update({
-                    "friend_action": "单次点赞",
-                    "interaction_count": 1,
-                    "toy_emotion": "开心",
-                    "interaction_type": "like"
-                })
-            elif "liked_3_to_5" in event_name:
-                base_details.update({
-                    "friend_action": "多次点赞",
-                    "interaction_count": 4,
-                    "toy_emotion": "开心",
-                    "interaction_type": "like"
-                })
-            elif "liked_5_plus" in event_name:
-                base_details.update({
-                    "friend_action": "大量点赞",
-                    "interaction_count": 7,
-                    "toy_emotion": "开心快乐",
-                    "interaction_type": "like"
-                })
-            elif "disliked" in event_name:
-                base_details.update({
-                    "friend_action": "不喜欢",
-                    "interaction_type": "dislike",
-                    "toy_emotion": "难过",
-                    "interaction_count": 1
-                })
-        
-        elif event_category == "same_frequency":
-            if "close_friend_frequency" in event_name:
-                base_details.update({
-                    "frequency_type": "同频",
-                    "friend_name": "好友",
-                    "interaction_level": "high",
-                    "toy_emotion": "开心"
-                })
-        
-        elif event_category == "adopted_function":
-            if "toy_claimed" in event_name:
-                base_details.update({
-                    "claim_type": "绑定",
-                    "owner_info": "新主人",
-                    "toy_emotion": "开心",
-                    "relationship_status": "claimed"
-                })
-        
-        return base_details
+        spec = self.event_catalog.get(event_category, event_name)
+        if spec is None:
+            # Events outside the catalogue still get rule-based details
+            spec = EventSpec(
+                category=event_category,
+                name=event_name,
+                agent_type=self.event_type_mappings.get(event_category, "interactive_agent"),
+                detail_template=match_detail_template(EVENT_DETAIL_RULES, event_category, event_name)
+            )
+        return spec.details()
     
     def clean_llm_output(self, content: str) -> str:
         """Clean LLM output - minimal cleaning to preserve diary content."""
@@ -532,31 +546,9 @@ class SimpleDiaryManager:
             )
             
             # Select appropriate agent based on event category
-            agent_type = self.event_type_mappings.get(event_category, "interactive_agent")
-            
-            if agent_type == "interactive_agent":
-                agent = self.interactive_agent
-            elif agent_type == "dialogue_agent":
-                agent = self.dialogue_agent
-            elif agent_type == "neglect_agent":
-                agent = self.neglect_agent
-            elif agent_type == "weather_agent":
-                agent = self.weather_agent
-            elif agent_type == "season_agent":
-                agent = self.season_agent
-            elif agent_type == "trending_agent":
-                agent = self.trending_agent
-            elif agent_type == "holiday_agent":
-                agent = self.holiday_agent
-            elif agent_type == "friends_agent":
-                agent = self.friends_agent
-            elif agent_type == "frequency_agent":
-                agent = self.frequency_agent
-            elif agent_type == "adopted_agent":
-                agent = self.adopted_agent
-            else:
-                # Use interactive agent as default
-                agent = self.interactive_agent
+            spec = self.event_catalog.get(event_category, event_name)
+            agent_type = spec.agent_type if spec else self.event_type_mappings.get(event_category, "interactive_agent")
+            agent = self.get_agent(agent_type)
             
             # Generate diary entry
             diary_entry = await agent.process_event(event_data)
@@ -572,6 +564,55 @@ class SimpleDiaryManager:
             logger.error(f"Error generating diary for event {event_name}: {e}")
             return None
 
+    async def process_batch_event(self, index: int, event_category: str, event_name: str) -> Dict[str, Any]:
+        """Process one event of a batch request and describe the outcome."""
+        result = {
+            "event_index": index,
+            "event_category": event_category,
+            "event_name": event_name
+        }
+        
+        # Validate event exists
+        spec = self.event_catalog.get(event_category, event_name)
+        if spec is None:
+            result.update(status="invalid", reason=f"Event '{event_name}' not found in category '{event_category}'")
+            return result
+        
+        # Check if diary should be generated
+        if not self.should_generate_diary(event_category, event_name):
+            result.update(status="no_diary", reason="Random condition not met")
+            return result
+        
+        # Auto-generate event details and generate diary entry
+        event_details = spec.details()
+        diary_entry = await self.generate_diary_for_event(event_category, event_name, event_details)
+        
+        if diary_entry:
+            result.update(status="diary_generated", diary_entry={
+                "entry_id": diary_entry.entry_id,
+                "title": diary_entry.title,
+                "content": diary_entry.content,
+                "emotion_tags": [tag.value for tag in diary_entry.emotion_tags] if diary_entry.emotion_tags else [],
+                "timestamp": diary_entry.timestamp.isoformat(),
+                "agent_type": diary_entry.agent_type,
+                "llm_provider": diary_entry.llm_provider
+            })
+        else:
+            result.update(status="generation_failed", reason="Diary generation failed")
+        return result
+
+    async def run_diary_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Background job handler: generate the diary for one queued event."""
+        result = await self.process_batch_event(
+            payload.get("event_index", 0), payload["event_category"], payload["event_name"]
+        )
+        if result["status"] == "invalid":
+            raise PermanentJobError(result["reason"])
+        if result["status"] == "generation_failed":
+            # Retried with backoff by the job queue
+            raise RuntimeError(result["reason"])
+        return result
+
     async def generate_diary_with_custom_prompt(self, event_category: str, event_name: str, event_details: Dict, custom_prompt: Dict, sub_agent: str = "interactive", additional_data: Dict = None) -> Dict:
         """Generate diary entry with custom prompt configuration."""
         try:
@@ -599,36 +640,8 @@ class SimpleDiaryManager:
             logger.info(f"Using custom prompt - System: {custom_prompt_config.system_prompt[:100]}...")
             logger.info(f"Using custom prompt - User template: {custom_prompt_config.user_prompt_template[:100]}...")
             
-            # Create agent with custom prompt
-            if sub_agent == "interactive":
-                agent = InteractiveAgent(
-                    agent_type="interactive_agent",
-                    prompt_config=custom_prompt_config,
-                    llm_manager=self.llm_config_manager,
-                    data_reader=self.data_reader
-                )
-            elif sub_agent == "dialogue":
-                agent = DialogueAgent(
-                    agent_type="dialogue_agent",
-                    prompt_config=custom_prompt_config,
-                    llm_manager=self.llm_config_manager,
-                    data_reader=self.data_reader
-                )
-            elif sub_agent == "neglect":
-                agent = NeglectAgent(
-                    agent_type="neglect_agent",
-                    prompt_config=custom_prompt_config,
-                    llm_manager=self.llm_config_manager,
-                    data_reader=self.data_reader
-                )
-            else:
-                # Use interactive agent as default
-                agent = InteractiveAgent(
-                    agent_type="interactive_agent",
-                    prompt_config=custom_prompt_config,
-                    llm_manager=self.llm_config_manager,
-                    data_reader=self.data_reader
-                )
+            # Reuse the agent built for an identical custom prompt
+            agent = self._get_custom_prompt_agent(sub_agent, custom_prompt_config)
             
             # Generate diary entry with custom prompt
             diary_entry = await agent.process_event(event_data)
@@ -674,22 +687,56 @@ class SimpleDiaryManager:
                 "data": {}
             }
 
-# Initialize the simple diary manager
-diary_manager = SimpleDiaryManager()
-extraction_agent = EventExtractionAgent()
-update_agent = EventUpdateAgent()
-bazi_agent = BaziWuxingAgent()
-sensor_agent = SensorEventAgent()
+# Shared services: one LLM manager (and connection pool) for the whole worker;
+# the event, BaZi and sensor agents are built on first request
+container = get_container()
+container.register("simple_diary_manager", lambda c: SimpleDiaryManager(llm_config_manager=c.llm_manager))
+diary_manager = container.get("simple_diary_manager")
+# Durable job queue (shared by all worker processes through the SQLite file)
+# and this worker's share of the job runners
+container.register("job_queue", lambda c: JobQueue(c.get("simple_diary_manager").job_config))
+container.register("job_worker_pool", lambda c: JobWorkerPool(
+    c.get("job_queue"), {"diary_event": c.get("simple_diary_manager").run_diary_job}
+))
+container.register("idempotency_store", lambda c: IdempotencyStore(c.get("simple_diary_manager").idempotency_config))
+
+@app.before_serving
+async def startup():
+    """Warm up local models and start job workers once the worker's event loop is running."""
+    try:
+        await container.start()
+    except Exception as e:
+        logger.warning(f"LLM manager start-up failed: {e}")
+    if diary_manager.job_config.enabled:
+        try:
+            await container.get("job_worker_pool").start()
+        except Exception as e:
+            logger.error(f"Job workers failed to start: {e}")
+
+@app.after_serving
+async def shutdown():
+    """Stop job workers and close pooled provider sessions before the worker's event loop stops."""
+    if container.is_built("job_worker_pool"):
+        # Jobs still running are redelivered to another worker once their lease expires
+        await container.get("job_worker_pool").stop()
+    if container.is_built("job_queue"):
+        container.get("job_queue").close()
+    if container.is_built("idempotency_store"):
+        container.get("idempotency_store").close()
+    try:
+        await container.close()
+    except Exception as e:
+        logger.warning(f"LLM manager shutdown failed: {e}")
 
 # API Routes
 
 # ===== Authentication Endpoints =====
 
 @app.route('/api/auth/login', methods=['POST'])
-def auth_login():
+async def auth_login():
     """Login endpoint."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -729,7 +776,7 @@ def auth_login():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
-def auth_logout():
+async def auth_logout():
     """Logout endpoint."""
     return jsonify({
         "success": True,
@@ -737,10 +784,10 @@ def auth_logout():
     })
 
 @app.route('/api/auth/verify', methods=['POST'])
-def auth_verify():
+async def auth_verify():
     """Verify password endpoint."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -773,10 +820,10 @@ def auth_verify():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/auth/change-password', methods=['POST'])
-def auth_change_password():
+async def auth_change_password():
     """Change password endpoint."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -825,10 +872,10 @@ def auth_change_password():
 # ===== Prompt Management Endpoints =====
 
 @app.route('/api/prompts/save', methods=['POST'])
-def prompts_save():
+async def prompts_save():
     """Save prompt configuration to backend files."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -893,7 +940,7 @@ def prompts_save():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/prompts/templates', methods=['GET'])
-def prompts_templates():
+async def prompts_templates():
     """Get available prompt templates."""
     try:
         templates = []
@@ -935,7 +982,7 @@ def prompts_templates():
 # ===== LLM Configuration Endpoints =====
 
 @app.route('/api/llm-config', methods=['GET'])
-def llm_config_get():
+async def llm_config_get():
     """Get LLM configuration."""
     try:
         config_path = 'config/llm_configuration.json'
@@ -959,10 +1006,10 @@ def llm_config_get():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/llm-config', methods=['POST'])
-def llm_config_save():
+async def llm_config_save():
     """Save LLM configuration."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -997,10 +1044,10 @@ def llm_config_save():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/llm-config/test', methods=['POST'])
-def llm_config_test():
+async def llm_config_test():
     """Test LLM configuration."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -1048,10 +1095,10 @@ def llm_config_test():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/llm-config/check-local', methods=['POST'])
-def llm_config_check_local():
+async def llm_config_check_local():
     """Check if local Ollama model is running."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data:
             return jsonify({
                 "success": False,
@@ -1072,8 +1119,8 @@ def llm_config_check_local():
             import requests
             ollama_url = "http://localhost:11434"
             
-            # Check if Ollama is running
-            response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+            # Check if Ollama is running (off the event loop, requests is blocking)
+            response = await asyncio.to_thread(requests.get, f"{ollama_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 models = response.json().get('models', [])
                 model_names = [model['name'] for model in models]
@@ -1111,7 +1158,7 @@ def llm_config_check_local():
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
 @app.route('/api/health', methods=['GET'])
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return jsonify({
         "success": True,
@@ -1126,7 +1173,7 @@ def health_check():
     })
 
 @app.route('/api/events', methods=['GET'])
-def get_events():
+async def get_events():
     """Get all available events from events.json."""
     return jsonify({
         "success": True,
@@ -1138,9 +1185,9 @@ def get_events():
 # ===== Event Agents (Extraction / Update) =====
 
 @app.route('/api/event/extract', methods=['POST'])
-def event_extract():
+async def event_extract():
     try:
-        payload = request.get_json() or {}
+        payload = await request.get_json() or {}
         required = ["chat_uuid", "chat_event_uuid", "memory_uuid", "dialogue"]
         missing = [k for k in required if k not in payload]
         if missing:
@@ -1150,7 +1197,7 @@ def event_extract():
                 "error": "Invalid request"
             }), 400
 
-        result = asyncio.run(extraction_agent.run(payload))
+        result = await container.get("event_extraction_agent").run(payload)
         return jsonify({
             "success": True,
             "message": "Extraction completed",
@@ -1163,9 +1210,9 @@ def event_extract():
 
 
 @app.route('/api/event/update', methods=['POST'])
-def event_update():
+async def event_update():
     try:
-        body = request.get_json() or {}
+        body = await request.get_json() or {}
         extraction_result = body.get("extraction_result")
         related_events = body.get("related_events", [])
         if not isinstance(related_events, list):
@@ -1173,7 +1220,7 @@ def event_update():
         if not isinstance(extraction_result, dict):
             return jsonify({"success": False, "message": "extraction_result must be an object"}), 400
 
-        result = asyncio.run(update_agent.run(extraction_result, related_events))
+        result = await container.get("event_update_agent").run(extraction_result, related_events)
         return jsonify({
             "success": True,
             "message": "Update completed",
@@ -1186,10 +1233,10 @@ def event_update():
 
 
 @app.route('/api/bazi_wuxing/calc', methods=['POST'])
-def bazi_wuxing_calc():
+async def bazi_wuxing_calc():
     """Calculate BaZi and WuXing from birth info using BaziWuxingAgent."""
     try:
-        body = request.get_json() or {}
+        body = await request.get_json() or {}
         required = ["birth_year", "birth_month", "birth_day", "birth_hour", "birthplace"]
         missing = [k for k in required if k not in body]
         if missing:
@@ -1199,7 +1246,7 @@ def bazi_wuxing_calc():
                 "error": "Invalid request"
             }), 400
 
-        result = asyncio.run(bazi_agent.run(body))
+        result = await container.get("bazi_agent").run(body)
         return jsonify({
             "success": True,
             "message": "BaZi/WuXing calculated",
@@ -1212,10 +1259,10 @@ def bazi_wuxing_calc():
 
 
 @app.route('/api/sensor/translate', methods=['POST'])
-def translate_sensor_event():
+async def translate_sensor_event():
     """Translate sensor event to human-readable description."""
     try:
-        request_data = request.get_json()
+        request_data = await request.get_json()
         
         if not request_data:
             return jsonify({
@@ -1245,7 +1292,7 @@ def translate_sensor_event():
         }
         
         # Translate sensor event
-        result = asyncio.run(sensor_agent.translate_sensor_event(mqtt_message))
+        result = await container.get("sensor_agent").translate_sensor_event(mqtt_message)
         
         return jsonify({
             "success": True,
@@ -1264,9 +1311,9 @@ def translate_sensor_event():
 
 
 @app.route('/api/event/pipeline', methods=['POST'])
-def event_pipeline():
+async def event_pipeline():
     try:
-        body = request.get_json() or {}
+        body = await request.get_json() or {}
         dialogue_payload = body.get("dialogue_payload") or {}
         related_events = body.get("related_events", [])
         required = ["chat_uuid", "chat_event_uuid", "memory_uuid", "dialogue"]
@@ -1279,8 +1326,8 @@ def event_pipeline():
         if not isinstance(related_events, list):
             return jsonify({"success": False, "message": "related_events must be a list"}), 400
 
-        extraction = asyncio.run(extraction_agent.run(dialogue_payload))
-        update = asyncio.run(update_agent.run(extraction, related_events))
+        extraction = await container.get("event_extraction_agent").run(dialogue_payload)
+        update = await container.get("event_update_agent").run(extraction, related_events)
         return jsonify({
             "success": True,
             "message": "Pipeline completed",
@@ -1291,12 +1338,61 @@ def event_pipeline():
         logger.error(f"Error in event_pipeline: {e}")
         return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
 
+def _idempotency_error(message, error, status):
+    return jsonify({
+        "success": False,
+        "message": message,
+        "error": error
+    }), status
+
+async def _idempotent(endpoint, handler):
+    """
+    Run a POST handler once per Idempotency-Key header.
+    
+    Retries with the same key attach to the computation still in flight or get
+    the stored response (marked with Idempotent-Replayed: true). Requests
+    without a key always run, unless the opt-in fingerprint fallback is on and
+    the client identifies itself with the configured client id header. 5xx
+    responses are not stored.
+    """
+    request_data = await request.get_json(silent=True)
+    store = container.get("idempotency_store")
+    key = request.headers.get('Idempotency-Key')
+    if key is not None and not 0 < len(key) <= 255:
+        return _idempotency_error("Idempotency-Key must be 1-255 characters", "Invalid Idempotency-Key", 400)
+    scope = store.scope(endpoint, request_data, key, request.headers.get(store.config.client_id_header))
+    if scope is None:
+        return await handler(request_data)
+    scoped_key, fingerprint, ttl = scope
+    
+    async def compute():
+        response = await make_response(await handler(request_data))
+        return StoredResponse(await response.get_json(), response.status_code)
+    
+    try:
+        stored, replayed = await store.execute(scoped_key, fingerprint, compute, ttl)
+    except IdempotencyConflict:
+        return _idempotency_error(
+            "Idempotency-Key was already used for a different request",
+            "Idempotency key reuse", 422
+        )
+    
+    response = jsonify(stored.body)
+    response.status_code = stored.status
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    if key is not None:
+        response.headers['Idempotency-Key'] = key
+    return response
+
 @app.route('/api/diary/process', methods=['POST'])
 async def process_event():
     """Process a single event and generate diary if conditions are met."""
+    return await _idempotent('/api/diary/process', _process_event)
+
+async def _process_event(request_data):
+    """Handle /api/diary/process for a parsed request body."""
     try:
-        request_data = request.get_json()
-        
         if not request_data:
             return jsonify({
                 "success": False,
@@ -1317,9 +1413,6 @@ async def process_event():
         event_category = request_data['event_category']
         event_name = request_data['event_name']
         
-        # Auto-generate event details based on event name
-        event_details = diary_manager.generate_event_details(event_category, event_name)
-        
         # Validate event exists in events.json
         if not diary_manager.validate_event(event_category, event_name):
             return jsonify({
@@ -1331,6 +1424,9 @@ async def process_event():
                 }
             }), 400
         
+        # Auto-generate event details based on event name
+        event_details = diary_manager.generate_event_details(event_category, event_name)
+        
         # Check if diary should be generated
         should_generate = diary_manager.should_generate_diary(event_category, event_name)
         
@@ -1390,9 +1486,11 @@ async def process_event():
 @app.route('/api/diary/process-custom', methods=['POST'])
 async def process_event_with_custom_prompt():
     """Process a single event with custom prompt configuration."""
+    return await _idempotent('/api/diary/process-custom', _process_event_with_custom_prompt)
+
+async def _process_event_with_custom_prompt(request_data):
+    """Handle /api/diary/process-custom for a parsed request body."""
     try:
-        request_data = request.get_json()
-        
         if not request_data:
             return jsonify({
                 "success": False,
@@ -1422,9 +1520,6 @@ async def process_event_with_custom_prompt():
                 "error": "Custom prompt must contain system_prompt"
             }), 400
         
-        # Auto-generate event details based on event name
-        event_details = diary_manager.generate_event_details(event_category, event_name)
-        
         # Validate event exists in events.json
         if not diary_manager.validate_event(event_category, event_name):
             return jsonify({
@@ -1436,6 +1531,9 @@ async def process_event_with_custom_prompt():
                 }
             }), 400
         
+        # Auto-generate event details based on event name
+        event_details = diary_manager.generate_event_details(event_category, event_name)
+        
         # Check if diary should be generated
         should_generate = diary_manager.should_generate_diary(event_category, event_name)
         
@@ -1487,131 +1585,331 @@ async def process_event_with_custom_prompt():
             "error": str(e)
         }), 500
 
+def _parse_batch_request(request_data):
+    """Validate a batch request; returns (events, batch_config, error_response)."""
+    if not request_data:
+        return None, None, (jsonify({
+            "success": False,
+            "message": "No JSON data provided",
+            "error": "Missing request body"
+        }), 400)
+    
+    # Validate required fields
+    if 'events' not in request_data:
+        return None, None, (jsonify({
+            "success": False,
+            "message": "Missing events in request",
+            "error": "events field is required"
+        }), 400)
+    
+    if not isinstance(request_data['events'], list):
+        return None, None, (jsonify({
+            "success": False,
+            "message": "Events must be a list",
+            "error": "Invalid events format"
+        }), 400)
+    
+    events = request_data['events']
+    
+    # Validate each event (only event_category and event_name needed) before starting any work
+    required_fields = ['event_category', 'event_name']
+    for i, event_data in enumerate(events):
+        for field in required_fields:
+            if not isinstance(event_data, dict) or field not in event_data:
+                return None, None, (jsonify({
+                    "success": False,
+                    "message": f"Missing required field '{field}' in event {i}",
+                    "error": "Invalid event data"
+                }), 400)
+    
+    # Optional per-request fan-out and timeouts, bounded by the server configuration
+    try:
+        batch_config = diary_manager.batch_config.with_overrides(
+            max_concurrency=request_data.get('max_concurrency'),
+            item_timeout=request_data.get('item_timeout'),
+            deadline=request_data.get('timeout')
+        )
+    except (TypeError, ValueError):
+        return None, None, (jsonify({
+            "success": False,
+            "message": "max_concurrency, item_timeout and timeout must be numbers",
+            "error": "Invalid batch options"
+        }), 400)
+    
+    return events, batch_config, None
+
+def _batch_jobs(events):
+    """One job per event for the batch runner."""
+    return [
+        lambda i=i, event_data=event_data: diary_manager.process_batch_event(
+            i, event_data['event_category'], event_data['event_name']
+        )
+        for i, event_data in enumerate(events)
+    ]
+
+def _batch_result(i, event_data, outcome):
+    """Result record for one batch event, including timed-out and failed ones."""
+    if outcome.ok:
+        return outcome.value
+    return {
+        "event_index": i,
+        "event_category": event_data['event_category'],
+        "event_name": event_data['event_name'],
+        "status": outcome.status,
+        "reason": outcome.error
+    }
+
 @app.route('/api/diary/batch-process', methods=['POST'])
 async def batch_process_events():
     """Process multiple events and generate diaries for those that meet conditions."""
     try:
-        request_data = request.get_json()
+        events, batch_config, error_response = _parse_batch_request(await request.get_json())
+        if error_response:
+            return error_response
         
-        if not request_data:
-            return jsonify({
-                "success": False,
-                "message": "No JSON data provided",
-                "error": "Missing request body"
-            }), 400
+        # Process events concurrently; outcomes come back in input order. Their LLM
+        # requests may be packed into shared provider calls (when batching is enabled)
+        with batch_requests():
+            outcomes = await run_bounded(_batch_jobs(events), batch_config)
         
-        # Validate required fields
-        if 'events' not in request_data:
-            return jsonify({
-                "success": False,
-                "message": "Missing events in request",
-                "error": "events field is required"
-            }), 400
-        
-        if not isinstance(request_data['events'], list):
-            return jsonify({
-                "success": False,
-                "message": "Events must be a list",
-                "error": "Invalid events format"
-            }), 400
+        results = [_batch_result(i, event_data, outcome) for i, (event_data, outcome) in enumerate(zip(events, outcomes))]
+        generated_diaries = [result["diary_entry"] for result in results if result["status"] == "diary_generated"]
+        incomplete = sum(1 for outcome in outcomes if not outcome.ok)
         
-        # Process each event
-        results = []
-        generated_diaries = []
+        return jsonify({
+            "success": True,
+            "message": f"Processed {len(events)} events",
+            "data": {
+                "total_events": len(events),
+                "diaries_generated": len(generated_diaries),
+                "incomplete_events": incomplete,
+                "partial": incomplete > 0,
+                "results": results,
+                "generated_diaries": generated_diaries
+            },
+            "timestamp": datetime.now().isoformat()
+        })
         
-        for i, event_data in enumerate(request_data['events']):
-            # Validate each event (only event_category and event_name needed)
-            required_fields = ['event_category', 'event_name']
-            for field in required_fields:
-                if field not in event_data:
-                    return jsonify({
-                        "success": False,
-                        "message": f"Missing required field '{field}' in event {i}",
-                        "error": "Invalid event data"
-                    }), 400
-            
-            event_category = event_data['event_category']
-            event_name = event_data['event_name']
-            
-            # Auto-generate event details
-            event_details = diary_manager.generate_event_details(event_category, event_name)
-            
-            # Validate event exists
+    except Exception as e:
+        logger.error(f"Error in batch_process_events endpoint: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error",
+            "error": str(e)
+        }), 500
+
+@app.route('/api/diary/batch-process/stream', methods=['POST'])
+async def batch_process_events_stream():
+    """
+    Streaming variant of batch-process.
+    
+    Emits one result record per event as soon as it finishes (in completion
+    order, with event_index), then a summary record. NDJSON by default; SSE
+    when the client sends Accept: text/event-stream or format=sse.
+    """
+    try:
+        request_data = await request.get_json()
+        events, batch_config, error_response = _parse_batch_request(request_data)
+        if error_response:
+            return error_response
+        sse = wants_sse(request.headers.get('Accept'), request_data.get('format'))
+    except Exception as e:
+        logger.error(f"Error in batch_process_events_stream endpoint: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error",
+            "error": str(e)
+        }), 500
+    
+    async def records():
+        started = time.monotonic()
+        generated = incomplete = 0
+        # The event tasks are created inside this block, so they inherit batch_requests()
+        with batch_requests():
+            async for i, outcome in iter_bounded(_batch_jobs(events), batch_config):
+                result = _batch_result(i, events[i], outcome)
+                generated += result["status"] == "diary_generated"
+                incomplete += not outcome.ok
+                yield {"type": "result", **result}
+        yield {
+            "type": "summary",
+            "success": True,
+            "message": f"Processed {len(events)} events",
+            "total_events": len(events),
+            "diaries_generated": generated,
+            "incomplete_events": incomplete,
+            "partial": incomplete > 0,
+            "elapsed": round(time.monotonic() - started, 3),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return Response(
+        stream_records(records(), sse),
+        mimetype=SSE_MIMETYPE if sse else NDJSON_MIMETYPE,
+        headers=STREAM_HEADERS
+    )
+
+# ===== Background Jobs =====
+
+def _jobs_unavailable():
+    """Response for job endpoints when the job queue is disabled."""
+    return jsonify({
+        "success": False,
+        "message": "Background jobs are disabled",
+        "error": "job_queue.enabled is false in the performance settings"
+    }), 503
+
+def _job_data(job):
+    """Public view of a job."""
+    data = job.to_dict()
+    data["status_url"] = f"/api/diary/jobs/{job.job_id}"
+    return data
+
+@app.route('/api/diary/jobs', methods=['POST'])
+async def submit_diary_jobs():
+    """
+    Queue events for background diary generation.
+    
+    Accepts a single event (event_category, event_name) or {"events": [...]}.
+    Responds 202 at once with one job per valid event; poll
+    /api/diary/jobs/<job_id> or subscribe to /api/diary/jobs/<job_id>/events.
+    """
+    if not diary_manager.job_config.enabled:
+        return _jobs_unavailable()
+    try:
+        request_data = await request.get_json()
+        if request_data and 'events' not in request_data and 'event_category' in request_data:
+            request_data = {"events": [request_data]}
+        events, _, error_response = _parse_batch_request(request_data)
+        if error_response:
+            return error_response
+        
+        queue = container.get("job_queue")
+        jobs, rejected = [], []
+        for i, event_data in enumerate(events):
+            event_category, event_name = event_data['event_category'], event_data['event_name']
             if not diary_manager.validate_event(event_category, event_name):
-                results.append({
+                rejected.append({
                     "event_index": i,
                     "event_category": event_category,
                     "event_name": event_name,
-                    "status": "invalid",
                     "reason": f"Event '{event_name}' not found in category '{event_category}'"
                 })
                 continue
-            
-            # Check if diary should be generated
-            should_generate = diary_manager.should_generate_diary(event_category, event_name)
-            
-            if should_generate:
-                # Generate diary entry
-                diary_entry = await diary_manager.generate_diary_for_event(
-                    event_category, event_name, event_details
-                )
-                
-                if diary_entry:
-                    diary_data = {
-                        "entry_id": diary_entry.entry_id,
-                        "title": diary_entry.title,
-                        "content": diary_entry.content,
-                        "emotion_tags": [tag.value for tag in diary_entry.emotion_tags] if diary_entry.emotion_tags else [],
-                        "timestamp": diary_entry.timestamp.isoformat(),
-                        "agent_type": diary_entry.agent_type,
-                        "llm_provider": diary_entry.llm_provider
-                    }
-                    
-                    generated_diaries.append(diary_data)
-                    results.append({
-                        "event_index": i,
-                        "event_category": event_category,
-                        "event_name": event_name,
-                        "status": "diary_generated",
-                        "diary_entry": diary_data
-                    })
-                else:
-                    results.append({
-                        "event_index": i,
-                        "event_category": event_category,
-                        "event_name": event_name,
-                        "status": "generation_failed",
-                        "reason": "Diary generation failed"
-                    })
-            else:
-                results.append({
-                    "event_index": i,
-                    "event_category": event_category,
-                    "event_name": event_name,
-                    "status": "no_diary",
-                    "reason": "Random condition not met"
-                })
+            job = await asyncio.to_thread(queue.enqueue, "diary_event", {
+                "event_index": i,
+                "event_category": event_category,
+                "event_name": event_name
+            })
+            jobs.append({"event_index": i, **_job_data(job)})
+        
+        if not jobs:
+            return jsonify({
+                "success": False,
+                "message": "No valid events to queue",
+                "error": "Invalid event",
+                "data": {"rejected": rejected}
+            }), 400
         
         return jsonify({
             "success": True,
-            "message": f"Processed {len(request_data['events'])} events",
-            "data": {
-                "total_events": len(request_data['events']),
-                "diaries_generated": len(generated_diaries),
-                "results": results,
-                "generated_diaries": generated_diaries
-            },
+            "message": f"Queued {len(jobs)} events",
+            "data": {"jobs": jobs, "rejected": rejected},
             "timestamp": datetime.now().isoformat()
-        })
+        }), 202
         
     except Exception as e:
-        logger.error(f"Error in batch_process_events endpoint: {e}")
+        logger.error(f"Error in submit_diary_jobs endpoint: {e}")
         return jsonify({
             "success": False,
             "message": "Internal server error",
             "error": str(e)
         }), 500
 
+@app.route('/api/diary/jobs', methods=['GET'])
+async def list_diary_jobs():
+    """List recent jobs (filter with ?status=queued|running|succeeded|dead) and queue counts."""
+    if not diary_manager.job_config.enabled:
+        return _jobs_unavailable()
+    queue = container.get("job_queue")
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    jobs = await asyncio.to_thread(queue.list_jobs, status, limit)
+    return jsonify({
+        "success": True,
+        "message": f"{len(jobs)} jobs",
+        "data": {
+            "stats": await asyncio.to_thread(queue.stats),
+            "jobs": [_job_data(job) for job in jobs]
+        },
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/diary/jobs/<job_id>', methods=['GET'])
+async def get_diary_job(job_id):
+    """Poll a job; the diary is in data.result once status is succeeded."""
+    if not diary_manager.job_config.enabled:
+        return _jobs_unavailable()
+    job = await asyncio.to_thread(container.get("job_queue").get, job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "message": f"Job '{job_id}' not found",
+            "error": "Unknown job"
+        }), 404
+    return jsonify({
+        "success": True,
+        "message": f"Job is {job.status}",
+        "data": _job_data(job),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/diary/jobs/<job_id>/events', methods=['GET'])
+async def watch_diary_job(job_id):
+    """
+    Subscribe to a job: one record per status change until it succeeds or is
+    dead-lettered. NDJSON by default; SSE with Accept: text/event-stream or ?format=sse.
+    """
+    if not diary_manager.job_config.enabled:
+        return _jobs_unavailable()
+    queue = container.get("job_queue")
+    if await asyncio.to_thread(queue.get, job_id) is None:
+        return jsonify({
+            "success": False,
+            "message": f"Job '{job_id}' not found",
+            "error": "Unknown job"
+        }), 404
+    sse = wants_sse(request.headers.get('Accept'), request.args.get('format'))
+    
+    async def records():
+        async for job in watch_job(queue, job_id, diary_manager.job_config.poll_interval):
+            yield {"type": "job", **_job_data(job)}
+    
+    return Response(
+        stream_records(records(), sse),
+        mimetype=SSE_MIMETYPE if sse else NDJSON_MIMETYPE,
+        headers=STREAM_HEADERS
+    )
+
+@app.route('/api/diary/jobs/<job_id>/retry', methods=['POST'])
+async def retry_diary_job(job_id):
+    """Requeue a dead-lettered job."""
+    if not diary_manager.job_config.enabled:
+        return _jobs_unavailable()
+    queue = container.get("job_queue")
+    if not await asyncio.to_thread(queue.retry_dead, job_id):
+        return jsonify({
+            "success": False,
+            "message": f"Job '{job_id}' is not in the dead-letter queue",
+            "error": "Job not retryable"
+        }), 409
+    return jsonify({
+        "success": True,
+        "message": "Job requeued",
+        "data": _job_data(await asyncio.to_thread(queue.get, job_id)),
+        "timestamp": datetime.now().isoformat()
+    }), 202
+
 @app.route('/api/diary/test', methods=['POST'])
 async def test_diary_generation():
     """Test diary generation with sample events from events.json."""
@@ -1667,7 +1965,7 @@ async def test_diary_generation():
         }), 500
 
 @app.errorhandler(404)
-def not_found(error):
+async def not_found(error):
     """Handle 404 errors."""
     return jsonify({
         "success": False,
@@ -1677,7 +1975,7 @@ def not_found(error):
     }), 404
 
 @app.errorhandler(405)
-def method_not_allowed(error):
+async def method_not_allowed(error):
     """Handle 405 errors."""
     return jsonify({
         "success": False,
@@ -1687,7 +1985,7 @@ def method_not_allowed(error):
     }), 405
 
 @app.errorhandler(500)
-def internal_error(error):
+async def internal_error(error):
     """Handle 500 errors."""
     return jsonify({
         "success": False,
@@ -1696,17 +1994,27 @@ def internal_error(error):
         "timestamp": datetime.now().isoformat()
     }), 500
 
-def run_simple_api_server(host='0.0.0.0', port=5003, debug=False):
-    """Run the simple diary API server."""
+def run_simple_api_server(host='0.0.0.0', port=5003, debug=False, workers=1):
+    """Run the simple diary API server under uvicorn (ASGI)."""
+    import uvicorn
+    
+    # Reloading needs a single process
+    if debug:
+        workers = 1
+    
     print(f"🚀 Starting Simple Diary API Server")
     print(f"📍 Server running on http://{host}:{port}")
     print(f"🔧 Debug mode: {debug}")
+    print(f"👷 Workers: {workers}")
     print("=" * 60)
     print("Available Simple API Endpoints:")
     print("  GET  /api/health              - Health check")
     print("  GET  /api/events              - Get all events from events.json")
     print("  POST /api/diary/process        - Process single event")
     print("  POST /api/diary/batch-process  - Process multiple events")
+    print("  POST /api/diary/batch-process/stream - Stream batch results (NDJSON/SSE)")
+    print("  POST /api/diary/jobs           - Queue events for background generation")
+    print("  GET  /api/diary/jobs/<job_id>  - Poll a background job (/events to subscribe)")
     print("  POST /api/diary/test          - Test with sample events")
     print("  POST /api/bazi_wuxing/calc    - Calculate BaZi and WuXing")
     print("=" * 60)
@@ -1714,7 +2022,16 @@ def run_simple_api_server(host='0.0.0.0', port=5003, debug=False):
     print("📋 Processes events only if conditions are met!")
     print("=" * 60)
     
-    app.run(host=host, port=port, debug=debug)
+    # Each worker process runs one long-lived event loop; multiple workers and
+    # reloading need an import string, a single worker reuses this module's app
+    uvicorn.run(
+        "simple_diary_api:app" if workers > 1 or debug else app,
+        host=host,
+        port=port,
+        workers=workers,
+        reload=debug,
+        log_level="debug" if debug else "info"
+    )
 
 if __name__ == "__main__":
     import argparse
@@ -1723,7 +2040,11 @@ if __name__ == "__main__":
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
     parser.add_argument('--port', type=int, default=5003, help='Port to bind to')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
-    
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)),
+                        help='Number of worker processes (default: $WEB_CONCURRENCY or 2)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report cold-start import/init cost and check config/startup_budget.json, then exit')
+
     args = parser.parse_args()
     
-    run_simple_api_server(host=args.host, port=args.port, debug=args.debug)
+    run_simple_api_server(host=args.host, port=args.port, debug=args.debug, workers=args.workers)